@@ -0,0 +1,74 @@
+"""
+async_pipeline.py
+======================
+SCADAFaultAnalyzer için asyncio tabanlı analiz hattı:
+ - yükle → özetle → üret → kaydet adımlarını birçok kayıt için aynı anda çalıştırır
+ - eşzamanlı kayıt sayısını bir semafor ile sınırlar (Ollama OLLAMA_NUM_PARALLEL ile uyumlu)
+ - 5xx yanıtlarında ve zaman aşımlarında üstel bekleme ile yeniden dener
+ - sonuçları giriş sırasıyla, analysis_<stem>_<timestamp>.txt adlandırmasıyla döndürür
+"""
+
+import asyncio
+import logging
+
+import requests
+
+from ollama_client import OllamaStallError
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 2.0  # saniye
+
+
+def is_retryable(error):
+    """Hatanın yeniden denemeye uygun olup olmadığını döndürür (5xx veya zaman aşımı)"""
+    if isinstance(error, (requests.exceptions.Timeout, OllamaStallError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+class AsyncSCADAFaultAnalyzer:
+    def __init__(self, analyzer, concurrency=DEFAULT_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE):
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+    async def _generate_with_retry(self, file_path, data_summary, summary=None):
+        """LLM raporunu üretir, geçici hatalarda üstel bekleme ile yeniden dener"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.to_thread(self.analyzer.generate_report, file_path, data_summary,
+                                               raise_errors=True, summary=summary)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff_base * (2 ** attempt)
+                logger.warning(f"Ollama geçici hata ({file_path}): {str(e)}; "
+                               f"{delay:.1f}s sonra yeniden denenecek ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def run_analysis(self, file_path, semaphore):
+        """Tek bir kayıt için tam analiz sürecini çalıştırır"""
+        outcome = {'file': file_path, 'output_path': None, 'results': None, 'error': None}
+        async with semaphore:
+            logger.info(f"Analiz başlıyor: {file_path}")
+            try:
+                summary, data_summary = await asyncio.to_thread(self.analyzer.build_summary, file_path)
+                outcome['output_path'], outcome['results'] = await self._generate_with_retry(file_path, data_summary,
+                                                                                             summary)
+            except Exception as e:
+                logger.error(f"Analiz hatası: {file_path}: {str(e)}")
+                outcome['error'] = str(e)
+        return outcome
+
+    async def run_many(self, file_paths):
+        """Kayıtları sınırlı eşzamanlılıkla analiz eder, sonuçları giriş sırasıyla döndürür"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # gather sonuçları görevlerin verildiği sırayla döndürür
+        return await asyncio.gather(*(self.run_analysis(file_path, semaphore) for file_path in file_paths))
@@ -0,0 +1,75 @@
+"""
+batch.py
+======================
+Paralel toplu analiz çalıştırıcısı:
+ - CSV/COMTRADE ayrıştırma ve arıza analizini çekirdek sayısı kadar süreçte çalıştırır; işçiye
+   analizörün tamamı değil yalnızca dosya yolu, yükleyici seçenekleri ve metrik kaydedici gönderilir
+ - LLM metin özeti ana süreçte, önceki yanıtlardan öğrenilen güncel token düzeltme katsayısıyla
+   bütçeye sığdırılır (işçi süreçlerdeki kopyalar katsayı güncellemelerini görmez)
+ - Ollama isteklerini ayrı, eşzamanlılığı sınırlı bir iş parçacığı havuzuna gönderir
+   (CPU yoğun pandas işi ile LLM beklemesi üst üste biner)
+ - her dosyanın hatasını ayrı yakalar; tek bir bozuk dosya tüm işi durdurmaz
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import data_cache
+import fault_engine
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_LLM_CONCURRENCY = 2
+
+
+def analyze_file(file_path, use_data_cache, metrics):
+    """Kaydı yükleyip arıza motoruyla analiz eder (işçi süreçte); analiz özetini döndürür"""
+    with metrics.stage(file_path, 'load') as extra:
+        df = data_cache.load_scada_frame(file_path, use_cache=use_data_cache)
+        extra['rows'] = len(df)
+    logger.info(f"Veri yüklendi: {file_path}, {len(df)} satır")
+    with metrics.stage(file_path, 'analyze'):
+        return fault_engine.analyze_fault_scenarios(df)
+
+
+def run_batch(analyzer, file_paths, workers=None, llm_concurrency=DEFAULT_LLM_CONCURRENCY):
+    """Dosyaları paralel analiz eder, sonuçları giriş sırasıyla döndürür"""
+    file_paths = list(file_paths)
+    workers = workers or os.cpu_count() or 1
+    outcomes = {file_path: {'file': file_path, 'output_path': None, 'results': None, 'error': None}
+                for file_path in file_paths}
+    logger.info(f"Toplu analiz: {len(file_paths)} dosya, {workers} süreç, {llm_concurrency} eşzamanlı LLM isteği")
+
+    with ProcessPoolExecutor(max_workers=workers) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=llm_concurrency) as llm_pool:
+        prepare_futures = {
+            cpu_pool.submit(analyze_file, file_path, analyzer.use_data_cache, analyzer.metrics): file_path
+            for file_path in file_paths
+        }
+        llm_futures = {}
+
+        # Özeti hazır olan dosyayı hemen LLM aşamasına gönder
+        for future in as_completed(prepare_futures):
+            file_path = prepare_futures[future]
+            try:
+                summary = future.result()
+                data_summary = analyzer.fit_summary(file_path, summary)
+            except Exception as e:
+                logger.error(f"Özet hazırlanamadı: {file_path}: {str(e)}")
+                outcomes[file_path]['error'] = str(e)
+                continue
+            llm_futures[llm_pool.submit(analyzer.generate_report, file_path, data_summary,
+                                        summary=summary)] = file_path
+
+        for future in as_completed(llm_futures):
+            file_path = llm_futures[future]
+            try:
+                outcomes[file_path]['output_path'], outcomes[file_path]['results'] = future.result()
+            except Exception as e:
+                logger.error(f"LLM analizi başarısız: {file_path}: {str(e)}")
+                outcomes[file_path]['error'] = str(e)
+
+    failed = sum(1 for outcome in outcomes.values() if outcome['error'])
+    logger.info(f"Toplu analiz tamamlandı: {len(file_paths) - failed} başarılı, {failed} hatalı")
+    return [outcomes[file_path] for file_path in file_paths]
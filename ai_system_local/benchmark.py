@@ -0,0 +1,285 @@
+"""
+benchmark.py
+======================
+SCADA analiz sıcak yolları için performans ölçüm aracı:
+ - yapılandırılabilir örnekleme hızı, süre ve kanal sayısıyla sentetik üç fazlı kayıt üretir
+ - arıza enjekte eder (akım artışı → PICK UP → TRIP → KESICI ACIK)
+ - kaydı hem CSV hem BINARY COMTRADE (.cfg/.dat) olarak yazar
+ - load_scada_data, analyze_fault_scenarios, generate_data_summary ve (isteğe bağlı)
+   MLProjectAnalyzer.run adımlarını süre, örnek/s ve tepe bellek açısından ölçer
+ - --startup: cli.py alt komutlarının yeni bir süreçte açılıp kapanma süresini ölçer (--help ve,
+   --workdir verilirse, kayıtları güncel bir klasörde analyze --resume)
+ - sonuçları karşılaştırma için benchmarks/ altına JSON olarak kaydeder
+
+Kullanım:
+    python benchmark.py --rates 1600 4800 --durations 2 60 --repeat 3
+    python benchmark.py --startup --workdir /srv/scada --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+
+PICKUP_COLUMN = "67-1 (faz asiri akim) PICK UP"
+TRIP_COLUMN = "67-1 (faz asiri akim) TRIP"
+GROUND_PICKUP_COLUMN = "67-N1 (toprak yonlu koruma) PICK UP"
+GROUND_TRIP_COLUMN = "67-N1 (toprak yonlu koruma) TRIP"
+
+# Başlangıç süresi ölçülen cli.py komutları
+STARTUP_COMMANDS = [
+    ["--help"],
+    ["analyze", "--help"],
+    ["serve", "--help"],
+    ["results", "--help"],
+    ["ml", "--help"],
+    ["finetuned", "--help"],
+]
+
+
+def generate_recording(sample_rate=1600, duration=2.0, frequency=50.0, nominal_current=5.0,
+                       fault_start=0.5, fault_multiplier=8.0, pickup_delay=0.005, trip_delay=0.1,
+                       breaker_delay=0.05, ground_fault=True, extra_analog=0, extra_digital=0, seed=42):
+    """Enjekte edilmiş arızalı sentetik üç fazlı kayıt üretir (ham CSV sütun adlarıyla)"""
+    rng = np.random.default_rng(seed)
+    n = int(round(sample_rate * duration))
+    t = np.arange(n) / sample_rate
+    omega = 2 * np.pi * frequency
+
+    pickup_time = fault_start + pickup_delay
+    trip_time = pickup_time + trip_delay
+    open_time = trip_time + breaker_delay
+    in_fault = (t >= fault_start) & (t < open_time)
+    breaker_open = t >= open_time
+
+    # Faz akımları: arızada A fazı (ve toprak arızasında nötr) büyür, kesici açılınca sıfırlanır
+    scale = np.where(in_fault, fault_multiplier, 1.0)
+    columns = {'time': t}
+    for i, name in enumerate(['IL1', 'IL2', 'IL3']):
+        amplitude = nominal_current * (scale if i == 0 else 1.0)
+        current = amplitude * np.sin(omega * t - i * 2 * np.pi / 3) + rng.normal(0, 0.05, n)
+        columns[name] = np.where(breaker_open, 0.0, current)
+    residual = columns['IL1'] + columns['IL2'] + columns['IL3']
+    columns['Io'] = residual if ground_fault else rng.normal(0, 0.05, n)
+
+    for i, name in enumerate(['U1', 'U2', 'U3']):
+        sag = np.where(in_fault & (i == 0), 0.4, 1.0)
+        voltage = 100.0 * sag * np.sin(omega * t - i * 2 * np.pi / 3)
+        columns[name] = np.where(breaker_open, 0.0, voltage)
+    columns['Uo'] = (columns['U1'] + columns['U2'] + columns['U3']) / 3
+
+    for i in range(extra_analog):
+        columns[f"A{i + 1}"] = rng.normal(0, 1, n)
+
+    pickup = ((t >= pickup_time) & (t < open_time)).astype(np.int64)
+    trip = ((t >= trip_time) & (t < open_time)).astype(np.int64)
+    columns[PICKUP_COLUMN] = pickup
+    columns[TRIP_COLUMN] = trip
+    columns[GROUND_PICKUP_COLUMN] = pickup if ground_fault else np.zeros(n, dtype=np.int64)
+    columns[GROUND_TRIP_COLUMN] = trip if ground_fault else np.zeros(n, dtype=np.int64)
+    columns["KESICI ACIK"] = breaker_open.astype(np.int64)
+    columns["KESICI KAPALI"] = (~breaker_open).astype(np.int64)
+
+    for i in range(extra_digital):
+        columns[f"D{i + 1}"] = np.zeros(n, dtype=np.int64)
+
+    import pandas as pd
+
+    return pd.DataFrame(columns)
+
+
+def write_comtrade(df, cfg_path, sample_rate, frequency=50.0):
+    """Kaydı BINARY COMTRADE (.cfg/.dat) olarak yazar"""
+    cfg_path = Path(cfg_path)
+    analog = [col for col in df.columns if col != 'time' and df[col].dtype.kind == 'f']
+    digital = [col for col in df.columns if col != 'time' and col not in analog]
+
+    lines = ["BENCH,SYNTHETIC,1999", f"{len(analog) + len(digital)},{len(analog)}A,{len(digital)}D"]
+    raw = np.empty((len(df), len(analog)), dtype='<i2')
+    for i, col in enumerate(analog):
+        values = df[col].to_numpy(dtype=float)
+        a = max(float(np.abs(values).max()), 1e-9) / 32000
+        raw[:, i] = np.round(values / a)
+        lines.append(f"{i + 1},{col},,,A,{a!r},0,0,-32767,32767,1,1,P")
+    for i, col in enumerate(digital):
+        lines.append(f"{i + 1},{col},,,0")
+    lines += [f"{frequency:g}", "1", f"{sample_rate:g},{len(df)}",
+              "01/01/2025,00:00:00.000000", "01/01/2025,00:00:00.000000", "BINARY", "1"]
+    cfg_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    word_count = (len(digital) + 15) // 16
+    record = np.dtype([('n', '<u4'), ('timestamp', '<i4'),
+                       ('analog', '<i2', (len(analog),)), ('digital', '<u2', (word_count,))])
+    data = np.zeros(len(df), dtype=record)
+    data['n'] = np.arange(1, len(df) + 1)
+    data['timestamp'] = np.round(df['time'].to_numpy() * 1e6)
+    data['analog'] = raw
+    if digital:
+        bits = np.zeros((len(df), word_count * 16), dtype=np.uint8)
+        bits[:, :len(digital)] = df[digital].to_numpy() != 0
+        data['digital'] = np.packbits(bits, axis=1, bitorder='little').view('<u2')
+    data.tofile(cfg_path.with_suffix('.dat'))
+
+
+def measure(func, *args, repeat=1):
+    """Fonksiyonu ölçer: en iyi duvar/CPU süresi ve (ayrı bir çalıştırmada) tepe bellek"""
+    best_wall, best_cpu = float('inf'), float('inf')
+    result = None
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = func(*args)
+        best_wall = min(best_wall, time.perf_counter() - wall_start)
+        best_cpu = min(best_cpu, time.process_time() - cpu_start)
+
+    # tracemalloc süreyi bozduğu için bellek ayrı ölçülür
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {'wall_s': round(best_wall, 6), 'cpu_s': round(best_cpu, 6), 'peak_mb': round(peak / 2 ** 20, 3)}
+
+
+def measure_startup(command, repeat=3, cwd=None):
+    """Komutun yeni bir Python sürecinde başlayıp bitme süresini (en iyi) ölçer"""
+    best, completed = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, *command], cwd=cwd, capture_output=True)
+        best = min(best, time.perf_counter() - started)
+    return {'wall_s': round(best, 4), 'returncode': completed.returncode}
+
+
+def run_startup(repeat, workdir=None):
+    """Yorumlayıcı ve cli.py alt komutlarının başlangıç sürelerini ölçer"""
+    cli_path = str(Path(__file__).resolve().parent / "cli.py")
+    results = {'python -c pass': measure_startup(["-c", "pass"], repeat)}
+    for command in STARTUP_COMMANDS:
+        results["cli.py " + " ".join(command)] = measure_startup([cli_path, *command], repeat)
+    if workdir:
+        # Tüm kayıtları analiz edilmiş bir klasörde: içerik özeti kontrolü, pandas/LLM yok
+        results["cli.py analyze --resume"] = measure_startup([cli_path, "analyze", "--resume"], repeat, cwd=workdir)
+    return results
+
+
+def run_scenario(analyzer, work_dir, sample_rate, duration, extra_analog, extra_digital, repeat, with_ml):
+    """Tek bir (örnekleme hızı, süre) senaryosunu ölçer"""
+    df = generate_recording(sample_rate=sample_rate, duration=duration,
+                            extra_analog=extra_analog, extra_digital=extra_digital)
+    samples = len(df)
+    stem = f"bench_{int(sample_rate)}hz_{duration:g}s"
+    csv_path = work_dir / f"{stem}.csv"
+    cfg_path = work_dir / f"{stem}.cfg"
+    df.to_csv(csv_path, index=False)
+    write_comtrade(df, cfg_path, sample_rate)
+
+    stages = {}
+    analyzer.use_data_cache = False
+    loaded, stages['load_csv'] = measure(analyzer.load_scada_data, csv_path, repeat=repeat)
+    _, stages['load_comtrade'] = measure(analyzer.load_scada_data, cfg_path, repeat=repeat)
+    analyzer.use_data_cache = True
+    analyzer.load_scada_data(csv_path)  # önbelleği ısıt
+    _, stages['load_cached'] = measure(analyzer.load_scada_data, csv_path, repeat=repeat)
+    summary, stages['analyze_fault_scenarios'] = measure(analyzer.analyze_fault_scenarios, loaded, repeat=repeat)
+    _, stages['generate_data_summary'] = measure(analyzer.generate_data_summary, summary, repeat=repeat)
+
+    if with_ml:
+        from ml import MLProjectAnalyzer
+        ml_dir = work_dir / f"{stem}_ml"
+        (ml_dir / "data").mkdir(parents=True, exist_ok=True)
+        df.to_csv(ml_dir / "data" / f"{stem}.csv", index=False)
+        ml = MLProjectAnalyzer(data_dir=str(ml_dir / "data"), report_dir=str(ml_dir / "reports"))
+        _, stages['ml_run'] = measure(ml.run, repeat=1)
+
+    for metrics in stages.values():
+        metrics['samples_per_s'] = round(samples / metrics['wall_s'], 1) if metrics['wall_s'] > 0 else None
+
+    return {
+        'sample_rate': sample_rate,
+        'duration_s': duration,
+        'samples': samples,
+        'channels': len(df.columns) - 1,
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SCADA analiz performans ölçümü")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1600.0], help="Örnekleme hızları (Hz)")
+    parser.add_argument("--durations", type=float, nargs="+", default=[2.0], help="Kayıt süreleri (s)")
+    parser.add_argument("--extra-analog", type=int, default=0, help="Ek analog kanal sayısı")
+    parser.add_argument("--extra-digital", type=int, default=0, help="Ek dijital kanal sayısı")
+    parser.add_argument("--repeat", type=int, default=3, help="Her adım için tekrar sayısı (en iyisi alınır)")
+    parser.add_argument("--ml", action="store_true", help="MLProjectAnalyzer.run adımını da ölç")
+    parser.add_argument("--output-dir", default="benchmarks", help="JSON sonuçlarının kaydedileceği klasör")
+    parser.add_argument("--startup", action="store_true", help="Yalnızca cli.py başlangıç sürelerini ölç")
+    parser.add_argument("--workdir", help="--startup ile analyze --resume ölçümünün yapılacağı çalışma klasörü")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    if args.startup:
+        startup = run_startup(args.repeat, args.workdir)
+        output_dir.mkdir(exist_ok=True)
+        output_path = output_dir / f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'python': sys.version.split()[0],
+                       'platform': platform.platform(), 'repeat': args.repeat, 'commands': startup},
+                      f, indent=2, ensure_ascii=False)
+
+        print("\n=== ⏱ BAŞLANGIÇ SÜRELERİ ===")
+        for command, metrics in startup.items():
+            status = "" if metrics['returncode'] == 0 else f"  (çıkış kodu {metrics['returncode']})"
+            print(f"  {command:<28} {metrics['wall_s'] * 1000:>9.1f} ms{status}")
+        print(f"\n[INFO] Sonuçlar kaydedildi: {output_path}")
+        return
+
+    from main import SCADAFaultAnalyzer
+    analyzer = SCADAFaultAnalyzer()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="scada_bench_") as tmp:
+        for sample_rate in args.rates:
+            for duration in args.durations:
+                print(f"[INFO] Senaryo: {sample_rate:g} Hz, {duration:g} s")
+                results.append(run_scenario(analyzer, Path(tmp), sample_rate, duration, args.extra_analog,
+                                            args.extra_digital, args.repeat, args.ml))
+
+    import pandas as pd
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'scenarios': results,
+    }
+
+    output_dir.mkdir(exist_ok=True)
+    output_path = output_dir / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("\n=== 📊 PERFORMANS ÖLÇÜMÜ ===")
+    for scenario in results:
+        print(f"\n{scenario['sample_rate']:g} Hz × {scenario['duration_s']:g} s "
+              f"({scenario['samples']} örnek, {scenario['channels']} kanal)")
+        for stage, metrics in scenario['stages'].items():
+            print(f"  {stage:<26} {metrics['wall_s'] * 1000:>10.2f} ms  "
+                  f"{metrics['samples_per_s'] or 0:>14,.0f} örnek/s  {metrics['peak_mb']:>8.2f} MB")
+    print(f"\n[INFO] Sonuçlar kaydedildi: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
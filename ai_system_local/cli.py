@@ -0,0 +1,58 @@
+"""
+cli.py
+======================
+Analiz giriş noktaları için tek, hızlı açılan komut satırı:
+ - alt komutun modülü yalnızca o alt komut çağrıldığında içe aktarılır; cli.py --help yalnızca
+   standart kütüphaneyi yükler
+ - pandas, scikit-learn, torch / transformers gibi ağır bağımlılıklar alt komut onlara gerçekten
+   ihtiyaç duyduğunda yüklenir (ör. analyze --resume güncel kayıtlarda pandas'ı hiç yüklemez)
+ - alt komuttan sonraki argümanlar olduğu gibi modülün main() fonksiyonuna iletilir
+
+Kullanım:
+    python cli.py analyze --resume
+    python cli.py serve --port 8000
+    python cli.py results query --signal "67-N1 TRIP"
+    python cli.py ml --workers 0
+    python cli.py benchmark --startup
+"""
+
+import sys
+import argparse
+import importlib
+
+# alt komut: (modül, açıklama)
+COMMANDS = {
+    'analyze': ('main', "SCADA arıza analizi, output/ (toplu, --follow, --resume, --async)"),
+    'analyze-new': ('new_main', "Aynı analiz, new_output/ klasörüne"),
+    'serve': ('service', "React arayüzü için yerel HTTP analiz servisi"),
+    'results': ('results_store', "Sonuç deposu: TXT raporları içe aktar / sorgula"),
+    'ml': ('ml', "scikit-learn anomali, regresyon ve sınıflandırma raporu"),
+    'finetuned': ('run_finetuned', "Yerel ince ayarlı model ile analiz (torch / transformers)"),
+    'prepare-dataset': ('prepare_dataset', "Eğitim verisini tokenize edip paketle"),
+    'merge': ('merge', "LoRA adaptörünü temel modelle birleştir"),
+    'benchmark': ('benchmark', "Performans ve başlangıç süresi ölçümü"),
+}
+
+
+def build_parser():
+    commands = "\n".join(f"  {name:<16} {description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="SCADA arıza analizi komut satırı",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"Alt komutlar:\n{commands}\n\nAlt komutun seçenekleri için: python cli.py <alt komut> --help")
+    parser.add_argument("command", choices=COMMANDS, metavar="<alt komut>", help="Çalıştırılacak alt komut")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Alt komuta iletilen argümanlar")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    module_name = COMMANDS[args.command][0]
+    # Modüllerin argparse ayrıştırıcıları sys.argv'yi okur; yardım metninde alt komut adı görünsün
+    sys.argv = [f"cli.py {args.command}"] + args.args
+    importlib.import_module(module_name).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+comtrade.py
+======================
+IEEE C37.111 COMTRADE (.cfg/.dat) okuyucu:
+ - .cfg dosyasından kanal adlarını, ölçekleme katsayılarını ve örnekleme hızlarını okur
+ - BINARY / BINARY32 / FLOAT32 .dat dosyalarını np.memmap ile kopyasız açar
+ - ASCII .dat dosyalarını doğrudan NumPy dizisine ayrıştırır
+ - sonucu CSV dönüşümüyle aynı sütun adlarına sahip bir DataFrame olarak döndürür
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+COMTRADE_SUFFIXES = ('.cfg', '.dat')
+
+# Binary formatlarda analog kanal tipi ve "eksik veri" işareti
+_ANALOG_DTYPES = {
+    'BINARY': ('<i2', -32768),
+    'BINARY32': ('<i4', -2147483648),
+    'FLOAT32': ('<f4', None),
+}
+
+
+def find_sibling(path, suffix):
+    """Aynı isimli .cfg/.dat eşini bulur (büyük/küçük harf duyarsız)"""
+    for candidate in (path.with_suffix(suffix), path.with_suffix(suffix.upper())):
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(f"COMTRADE dosyası bulunamadı: {path.with_suffix(suffix)}")
+
+
+def read_cfg(cfg_path):
+    """COMTRADE .cfg dosyasını okur ve kanal/örnekleme bilgilerini döndürür"""
+    with open(cfg_path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    def fields(index):
+        return [field.strip() for field in lines[index].split(',')]
+
+    header = fields(0)
+    counts = fields(1)
+    analog_count = int(counts[1].rstrip('Aa'))
+    digital_count = int(counts[2].rstrip('Dd'))
+
+    analogs = []
+    for i in range(analog_count):
+        row = fields(2 + i)
+        analogs.append({
+            'name': row[1],
+            'unit': row[4],
+            'a': float(row[5]),
+            'b': float(row[6]),
+        })
+
+    digitals = []
+    for i in range(digital_count):
+        row = fields(2 + analog_count + i)
+        digitals.append({'name': row[1]})
+
+    pos = 2 + analog_count + digital_count
+    line_frequency = float(fields(pos)[0] or 0)
+    nrates = int(fields(pos + 1)[0])
+    pos += 2
+
+    # nrates = 0 olsa bile bir "samp,endsamp" satırı bulunur
+    sample_rates = []
+    for i in range(max(nrates, 1)):
+        samp, endsamp = fields(pos + i)[:2]
+        sample_rates.append((float(samp), int(float(endsamp))))
+    pos += max(nrates, 1)
+
+    start_time = lines[pos]
+    trigger_time = lines[pos + 1]
+    file_type = fields(pos + 2)[0].upper()
+    time_multiplier = 1.0
+    if len(lines) > pos + 3:
+        try:
+            time_multiplier = float(fields(pos + 3)[0])
+        except ValueError:
+            pass
+
+    return {
+        'station_name': header[0],
+        'rev_year': header[2] if len(header) > 2 else '1991',
+        'analogs': analogs,
+        'digitals': digitals,
+        'line_frequency': line_frequency,
+        'nrates': nrates,
+        'sample_rates': sample_rates,
+        'start_time': start_time,
+        'trigger_time': trigger_time,
+        'file_type': file_type,
+        'time_multiplier': time_multiplier,
+    }
+
+
+def _read_binary(dat_path, cfg):
+    """Binary .dat dosyasını memmap üzerinden okur"""
+    analog_type, missing = _ANALOG_DTYPES[cfg['file_type']]
+    analog_count = len(cfg['analogs'])
+    word_count = (len(cfg['digitals']) + 15) // 16
+
+    fields = [('n', '<u4'), ('timestamp', '<i4')]
+    if analog_count:
+        fields.append(('analog', analog_type, (analog_count,)))
+    if word_count:
+        fields.append(('digital', '<u2', (word_count,)))
+    record = np.dtype(fields)
+
+    if Path(dat_path).stat().st_size < record.itemsize:
+        raise ValueError(f"COMTRADE veri dosyası boş: {dat_path}")
+    data = np.memmap(dat_path, dtype=record, mode='r', shape=(Path(dat_path).stat().st_size // record.itemsize,))
+
+    timestamps = data['timestamp'].astype(np.float64)
+    analog = np.empty((len(data), 0), dtype=np.float64)
+    if analog_count:
+        raw = data['analog']
+        analog = raw.astype(np.float64)
+        if missing is not None:
+            analog[raw == missing] = np.nan
+
+    digital = np.empty((len(data), 0), dtype=np.uint8)
+    if word_count:
+        # Her 16-bitlik kelimede bit 0 ilk kanaldır (little-endian)
+        words = np.ascontiguousarray(data['digital'], dtype='<u2')
+        bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder='little')
+        digital = bits[:, :len(cfg['digitals'])]
+
+    return timestamps, analog, digital
+
+
+def _read_ascii(dat_path, cfg):
+    """ASCII .dat dosyasını NumPy dizisine ayrıştırır"""
+    import pandas as pd
+
+    analog_count = len(cfg['analogs'])
+    raw = pd.read_csv(dat_path, header=None, skipinitialspace=True).to_numpy(dtype=np.float64)
+    timestamps = raw[:, 1]
+    analog = raw[:, 2:2 + analog_count]
+    digital = raw[:, 2 + analog_count:2 + analog_count + len(cfg['digitals'])].astype(np.uint8)
+    return timestamps, analog, digital
+
+
+def _sample_times(cfg, timestamps):
+    """Örnek zamanlarını saniye cinsinden hesaplar"""
+    rates = [(samp, endsamp) for samp, endsamp in cfg['sample_rates'] if samp > 0]
+    if not rates:
+        # Sabit örnekleme hızı yoksa zaman damgaları (mikrosaniye) kullanılır
+        return timestamps * cfg['time_multiplier'] * 1e-6
+
+    times = np.empty(len(timestamps), dtype=np.float64)
+    start_index, start_time = 0, 0.0
+    for samp, endsamp in rates:
+        end_index = min(endsamp, len(times))
+        steps = np.arange(end_index - start_index, dtype=np.float64)
+        times[start_index:end_index] = start_time + steps / samp
+        if end_index > start_index:
+            start_time = times[end_index - 1] + 1.0 / samp
+        start_index = end_index
+    if start_index < len(times):
+        # Son hız segmenti dosya sonuna kadar devam eder
+        samp = rates[-1][0]
+        steps = np.arange(len(times) - start_index, dtype=np.float64)
+        times[start_index:] = start_time + steps / samp
+    return times
+
+
+def load_comtrade(file_path):
+    """COMTRADE kaydını (.cfg veya .dat yolu) DataFrame olarak yükler"""
+    import pandas as pd
+
+    path = Path(file_path)
+    cfg_path = find_sibling(path, '.cfg')
+    dat_path = find_sibling(path, '.dat')
+    cfg = read_cfg(cfg_path)
+
+    if cfg['file_type'] == 'ASCII':
+        timestamps, analog, digital = _read_ascii(dat_path, cfg)
+    elif cfg['file_type'] in _ANALOG_DTYPES:
+        timestamps, analog, digital = _read_binary(dat_path, cfg)
+    else:
+        raise ValueError(f"Desteklenmeyen COMTRADE dosya tipi: {cfg['file_type']}")
+
+    # Ölçekleme: değer = a * ham + b
+    scale = np.array([ch['a'] for ch in cfg['analogs']], dtype=np.float64)
+    offset = np.array([ch['b'] for ch in cfg['analogs']], dtype=np.float64)
+    analog = analog * scale + offset
+
+    columns = {'time': _sample_times(cfg, timestamps)}
+    for i, channel in enumerate(cfg['analogs']):
+        columns[channel['name']] = analog[:, i]
+    for i, channel in enumerate(cfg['digitals']):
+        columns[channel['name']] = digital[:, i]
+
+    return pd.DataFrame(columns)
@@ -0,0 +1,184 @@
+"""
+data_cache.py
+======================
+Ayrıştırılmış SCADA kayıtları için sütunsal (NPY) önbellek:
+ - CSV / COMTRADE kaydını bir kez okur, sütun adlarını temizler ve zamana göre sıralar
+ - sütunları otomatik sınıflandırır: yalnızca 0/1 içeren dijital kanallar (PICK UP, TRIP, KESICI)
+   uint8, hassasiyetin izin verdiği analog kanallar float32 olarak tutulur; zaman float64 kalır
+ - sonucu kaynağın yanında data/.cache/<dosya adı>/ altında sütun başına bir .npy olarak saklar;
+   dijital kanallar önbellekte bit düzeyinde paketlenir (örnek başına 1 bit)
+ - önbellek kaynağın mtime ve boyutu ile anahtarlanır; kaynak değişirse yeniden üretilir
+ - main.py, ml.py ve run_finetuned.py aynı yükleyiciyi kullanır
+"""
+
+import os
+import json
+import shutil
+import logging
+from pathlib import Path
+
+import numpy as np
+
+import comtrade
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+CACHE_DIR_NAME = ".cache"
+CACHE_VERSION = 2
+FLOAT64_COLUMNS = ('time',)  # örnekleme hızı zaman farklarından bulunur, hassasiyet korunur
+FLOAT32_TOLERANCE = 1e-4  # float32 yuvarlama hatası kanalın tepe-tepe genliğinin bu oranını aşmamalı
+
+
+def clean_column_name(col):
+    """Sütun adındaki boşluk ve özel karakterleri temizler"""
+    return col.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_')
+
+
+def clean_columns(df):
+    """Sütun adlarını temizler ve veriyi zamana göre sıralar"""
+    import pandas as pd
+
+    # Sütun adlarını düzelt (boşluk ve özel karakterleri temizle)
+    df.columns = [clean_column_name(col) for col in df.columns]
+
+    # Zaman sütununu numeric olarak tut (sıralama için)
+    if 'time' in df.columns:
+        df['time'] = pd.to_numeric(df['time'], errors='coerce')
+        df = df.sort_values('time')
+    return df
+
+
+def is_digital(values):
+    """Sütun yalnızca 0 ve 1 değerlerinden oluşuyorsa (eksik değer yoksa) True döndürür"""
+    if values.dtype == bool:
+        return True
+    if not np.issubdtype(values.dtype, np.number) or not len(values):
+        return False
+    return bool(((values == 0) | (values == 1)).all())
+
+
+def _fits_float32(values):
+    """float32'ye çevirmenin kanalın genliğine göre ihmal edilebilir hata verip vermediğini döndürür"""
+    with np.errstate(invalid='ignore', over='ignore'):
+        error = np.abs(values - values.astype(np.float32))
+    finite = np.isfinite(values)
+    if not finite.any():
+        return True
+    if not np.isfinite(error[finite]).all():
+        return False  # float32 aralığı dışında değer var
+    span = np.ptp(values[finite])
+    return bool(error[finite].max() <= FLOAT32_TOLERANCE * span)
+
+
+def compact_dtypes(df):
+    """Dijital kanalları uint8'e, uygun analog kanalları float32'ye çevirir (yerinde)"""
+    # bool yerine uint8: select_dtypes(np.number) ve karışık sütunlu to_numpy() sayısal kalır
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if is_digital(values):
+            if values.dtype != np.uint8:
+                df[name] = values.astype(np.uint8)
+        elif values.dtype == np.float64 and name not in FLOAT64_COLUMNS and _fits_float32(values):
+            df[name] = values.astype(np.float32)
+    return df
+
+
+def read_source(file_path):
+    """Kaynak kaydı (CSV veya COMTRADE) ham haliyle okur"""
+    if Path(file_path).suffix.lower() in comtrade.COMTRADE_SUFFIXES:
+        return comtrade.load_comtrade(file_path)
+    # pandas ilk ayrıştırmada yüklenir; --help / --resume gibi veri okumayan yollar beklemez
+    import pandas as pd
+    return pd.read_csv(file_path)
+
+
+def source_files(path):
+    """Önbellek anahtarına giren kaynak dosyaları döndürür (COMTRADE için .cfg + .dat)"""
+    if path.suffix.lower() in comtrade.COMTRADE_SUFFIXES:
+        return [comtrade.find_sibling(path, '.cfg'), comtrade.find_sibling(path, '.dat')]
+    return [path]
+
+
+def _signature(path):
+    """Kaynağın mtime ve boyut imzasını döndürür"""
+    signature = []
+    for source in source_files(path):
+        stat = source.stat()
+        signature.append([source.name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def cache_path(file_path):
+    """Kaydın önbellek klasörünü döndürür"""
+    path = Path(file_path)
+    return path.parent / CACHE_DIR_NAME / path.name
+
+
+def _read_cache(directory, signature):
+    import pandas as pd
+
+    meta_path = directory / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION or meta.get('signature') != signature:
+        return None
+
+    packed = set(meta['packed'])
+    columns = {}
+    for i, name in enumerate(meta['columns']):
+        values = np.load(directory / f"{i}.npy")
+        if i in packed:
+            values = np.unpackbits(values, count=meta['rows'])
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def _write_cache(directory, signature, df):
+    tmp_dir = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    packed = []
+    for i, name in enumerate(df.columns):
+        values = df[name].to_numpy()
+        if values.dtype == object:
+            # Metin sütunları pickle gerektirmeden saklanabilsin
+            values = values.astype(str)
+        elif values.dtype == np.uint8 and is_digital(values):
+            # 0/1 kanalları bit düzeyinde paketle: okuma unpackbits ile yine uint8 verir
+            values = np.packbits(values)
+            packed.append(i)
+        np.save(tmp_dir / f"{i}.npy", values, allow_pickle=False)
+
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'signature': signature, 'columns': list(df.columns),
+                   'rows': len(df), 'packed': packed}, f, ensure_ascii=False)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def load_scada_frame(file_path, use_cache=True):
+    """Temizlenmiş, zamana göre sıralı kaydı döndürür; mümkünse önbellekten okur"""
+    path = Path(file_path)
+    if not use_cache:
+        return compact_dtypes(clean_columns(read_source(path)).reset_index(drop=True))
+
+    directory = cache_path(path)
+    signature = _signature(path)
+    try:
+        df = _read_cache(directory, signature)
+        if df is not None:
+            logger.info(f"Ayrıştırılmış veri önbellekten okundu: {directory}")
+            return df
+    except Exception as e:
+        logger.warning(f"Önbellek okunamadı, kaynak yeniden ayrıştırılacak: {directory}: {str(e)}")
+
+    df = compact_dtypes(clean_columns(read_source(path)).reset_index(drop=True))
+    try:
+        _write_cache(directory, signature, df)
+    except Exception as e:
+        logger.warning(f"Önbellek yazılamadı: {directory}: {str(e)}")
+    return df
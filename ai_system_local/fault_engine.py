@@ -0,0 +1,264 @@
+"""
+fault_engine.py
+======================
+SCADA arıza senaryosu motoru (NumPy tabanlı):
+ - PICK UP / TRIP sinyallerini tüm dizi üzerinde tek seferde sayar
+ - IL1/IL2/IL3 > 10A ve Io > 5A eşiklerini anlık örneklere değil, periyot bazlı temel bileşen
+   RMS değerlerine uygular (bkz. signal_features.py); her dalga tepesi ayrı olay sayılmaz
+ - kritik olayları eşik aşımının sürdüğü bölümler (başlangıç/bitiş, tepe RMS, I0/I1/I2) olarak üretir
+ - koruma ve kesici sinyallerinin yükselen/düşen kenarlarını tek geçişte bulup
+   başlangıç/bitiş/süre içeren aralıklara ve PICK UP → TRIP → kesici açma dizilerine dönüştürür
+"""
+
+import numpy as np
+
+import signal_features
+
+# Kritik olay eşikleri
+PHASE_CURRENT_THRESHOLD = 10  # Faz akımı (A)
+NEUTRAL_CURRENT_THRESHOLD = 5  # Nötr akımı (A)
+PHASE_COLUMNS = ['IL1', 'IL2', 'IL3']
+NEUTRAL_COLUMN = 'Io'
+BREAKER_OPEN_COLUMN = 'KESICI_ACIK'
+BREAKER_CLOSED_COLUMN = 'KESICI_KAPALI'
+
+
+def signal_columns(columns):
+    """67 koruma fonksiyonlarına ait PICK UP ve TRIP sütunlarını döndürür"""
+    pickup_columns = [col for col in columns if 'PICK_UP' in col and '67' in col]
+    trip_columns = [col for col in columns if 'TRIP' in col and '67' in col]
+    return pickup_columns, trip_columns
+
+
+def event_columns(columns):
+    """Kenar analizine girecek koruma (PICK UP/TRIP) ve kesici sütunlarını döndürür"""
+    protection = [col for col in columns if 'PICK_UP' in col or 'TRIP' in col]
+    breaker = [col for col in (BREAKER_OPEN_COLUMN, BREAKER_CLOSED_COLUMN) if col in columns]
+    return protection + breaker
+
+
+def _signal_kind(col):
+    if col in (BREAKER_OPEN_COLUMN, BREAKER_CLOSED_COLUMN):
+        return 'breaker'
+    return 'pickup' if 'PICK_UP' in col else 'trip'
+
+
+def signal_intervals(df, columns=None):
+    """Sinyallerin aktif (== 1) olduğu aralıkları tüm sütunlarda tek vektörel geçişte bulur"""
+    columns = event_columns(df.columns) if columns is None else columns
+    if not columns or not len(df):
+        return []
+
+    times = df['time'].to_numpy(dtype=float)
+    active = (df[columns].to_numpy() == 1).astype(np.int8)
+    # Başa ve sona 0 satırı ekleyerek kayıt sınırındaki aktif durumları da kenar say
+    padded = np.pad(active, ((1, 1), (0, 0)))
+    edges = np.diff(padded, axis=0)
+    rise_rows, rise_cols = np.nonzero(edges == 1)
+    fall_rows, fall_cols = np.nonzero(edges == -1)
+
+    # Her sütunda yükselen ve düşen kenarlar sırayla eşleşir: önce sütuna, sonra satıra göre sırala
+    rise_order = np.lexsort((rise_rows, rise_cols))
+    fall_order = np.lexsort((fall_rows, fall_cols))
+    rise_rows, rise_cols = rise_rows[rise_order], rise_cols[rise_order]
+    fall_rows = fall_rows[fall_order]
+
+    n = len(times)
+    ongoing = fall_rows >= n
+    start_times = times[rise_rows]
+    end_times = times[np.minimum(fall_rows, n - 1)]
+
+    intervals = []
+    for i in np.argsort(start_times, kind='stable'):
+        col = columns[rise_cols[i]]
+        intervals.append({
+            'signal': col,
+            'kind': _signal_kind(col),
+            'start': float(start_times[i]),
+            'end': float(end_times[i]),
+            'duration_ms': float((end_times[i] - start_times[i]) * 1000),
+            'samples': int(fall_rows[i] - rise_rows[i]),
+            'ongoing': bool(ongoing[i]),
+        })
+    return intervals
+
+
+def _breaker_open_times(intervals):
+    """Kesicinin açıldığı anları döndürür (KESICI_ACIK yükselişi, yoksa KESICI_KAPALI düşüşü)"""
+    opens = [iv['start'] for iv in intervals if iv['signal'] == BREAKER_OPEN_COLUMN]
+    if opens:
+        return sorted(opens)
+    return sorted(iv['end'] for iv in intervals if iv['signal'] == BREAKER_CLOSED_COLUMN and not iv['ongoing'])
+
+
+def fault_sequences(intervals):
+    """Her PICK UP aralığını eşleşen TRIP ve kesici açma anıyla birleştirir, gecikmeleri hesaplar"""
+    trips = [iv for iv in intervals if iv['kind'] == 'trip']
+    opens = _breaker_open_times(intervals)
+    sequences = []
+    for pickup in (iv for iv in intervals if iv['kind'] == 'pickup'):
+        trip_signal = pickup['signal'].replace('PICK_UP', 'TRIP')
+        trip = next((iv for iv in trips if iv['signal'] == trip_signal
+                     and pickup['start'] <= iv['start'] <= pickup['end']), None)
+        reference = trip['start'] if trip else pickup['start']
+        breaker_open = next((t for t in opens if t >= reference), None)
+
+        sequences.append({
+            'pickup_signal': pickup['signal'],
+            'pickup_time': pickup['start'],
+            'pickup_duration_ms': pickup['duration_ms'],
+            'trip_signal': trip['signal'] if trip else None,
+            'trip_time': trip['start'] if trip else None,
+            'breaker_open_time': breaker_open,
+            'pickup_to_trip_ms': (trip['start'] - pickup['start']) * 1000 if trip else None,
+            'trip_to_open_ms': (breaker_open - trip['start']) * 1000 if trip and breaker_open is not None else None,
+            'pickup_to_open_ms': (breaker_open - pickup['start']) * 1000 if breaker_open is not None else None,
+        })
+    return sequences
+
+
+def _current_magnitudes(df, features):
+    """Eşik karşılaştırmasında kullanılan akım büyüklüklerini döndürür (temel bileşen RMS)"""
+    if features is None:
+        # Örnekleme hızı belirlenemiyor: anlık değerlerin mutlak değeri kullanılır
+        return {col: np.abs(df[col].to_numpy(dtype=float))
+                for col in PHASE_COLUMNS + [NEUTRAL_COLUMN] if col in df.columns}
+    magnitudes = {col: np.abs(phasor) for col, phasor in features['phasor'].items()
+                  if col in PHASE_COLUMNS + [NEUTRAL_COLUMN]}
+    if NEUTRAL_COLUMN not in magnitudes and 'I0' in features['sequence']:
+        magnitudes[NEUTRAL_COLUMN] = 3 * features['sequence']['I0']
+    return magnitudes
+
+
+def critical_mask(df, features=None, magnitudes=None):
+    """Faz veya nötr akımının temel bileşen RMS değeri eşiği aştığı satırlar için maske döndürür"""
+    if magnitudes is None:
+        if features is None:
+            features = signal_features.compute_features(df)
+        magnitudes = _current_magnitudes(df, features)
+
+    mask = np.zeros(len(df), dtype=bool)
+    # NaN (ilk periyot) karşılaştırmaları False verir
+    with np.errstate(invalid='ignore'):
+        for phase in PHASE_COLUMNS:
+            if phase in magnitudes:
+                mask |= magnitudes[phase] > PHASE_CURRENT_THRESHOLD
+        if NEUTRAL_COLUMN in magnitudes:
+            mask |= magnitudes[NEUTRAL_COLUMN] > NEUTRAL_CURRENT_THRESHOLD
+    return mask
+
+
+def _segments(mask):
+    """Maskenin True olduğu ardışık bölümlerin [başlangıç, bitiş) satırlarını döndürür"""
+    edges = np.diff(np.pad(mask.astype(np.int8), 1))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _reduce_segments(ufunc, values, starts, ends):
+    """ufunc'u her [başlangıç, bitiş) bölümüne tek reduceat çağrısıyla uygular"""
+    # Bitiş indeksi dizi uzunluğuna eşit olabilir; reduceat için bir satır eklenir
+    padded = np.concatenate([values, values[-1:]])
+    indices = np.column_stack([starts, ends]).ravel()
+    return ufunc.reduceat(padded, indices, axis=0)[::2]
+
+
+def _segment_max(values, starts, ends):
+    """Her bölümdeki en büyük değeri döndürür (NaN'lar yok sayılır)"""
+    filled = np.where(np.isnan(values), -np.inf, values)
+    peaks = _reduce_segments(np.maximum, filled, starts, ends)
+    return np.where(np.isinf(peaks), 0.0, peaks)
+
+
+def _active_signal_lists(df, columns, starts, ends):
+    """Her [başlangıç, bitiş) bölümünde en az bir kez aktif (== 1) olan sinyal adlarının listelerini döndürür"""
+    if not columns or not len(starts):
+        return [[] for _ in range(len(starts))]
+
+    active = _reduce_segments(np.logical_or, df[columns].to_numpy() == 1, starts, ends)
+    # Aynı sinyal kombinasyonu tekrar tekrar görüldüğü için benzersiz desenler üzerinden çalış
+    patterns, inverse = np.unique(active, axis=0, return_inverse=True)
+    names = [[columns[j] for j in np.flatnonzero(pattern)] for pattern in patterns]
+    return [list(names[k]) for k in inverse.ravel()]
+
+
+def analyze_fault_scenarios(df, lookback=0, instantaneous_fallback=True):
+    """Arıza senaryolarını vektörel olarak analiz eder
+
+    lookback: baştaki bu kadar satır yalnızca periyot pencerelerini doldurmak için kullanılır (artımlı
+    izlemede önceki parçanın son örnekleri); özet ve olaylar kalan satırlar için üretilir.
+    instantaneous_fallback: örnekleme hızı belirlenemezse anlık değerlerle eşik karşılaştırması yapılır.
+    """
+    context = df
+    df = df.iloc[lookback:]
+    summary = {
+        'total_records': len(df),
+        'time_range': f"{df['time'].min():.6f} - {df['time'].max():.6f} saniye",
+        'time_start': float(df['time'].min()),
+        'time_end': float(df['time'].max()),
+        'pickup_events': {},
+        'trip_events': {},
+        'critical_events': [],
+        'signal_intervals': [],
+        'fault_sequences': [],
+        'features': None
+    }
+
+    pickup_columns, trip_columns = signal_columns(df.columns)
+
+    # Sinyal aralıkları ve PICK UP → TRIP → kesici açma dizileri
+    summary['signal_intervals'] = signal_intervals(df)
+    summary['fault_sequences'] = fault_sequences(summary['signal_intervals'])
+    times = df['time'].to_numpy()
+
+    # PICK UP ve TRIP sinyallerini analiz et
+    for columns, key in ((pickup_columns, 'pickup_events'), (trip_columns, 'trip_events')):
+        for col in columns:
+            active = df[col].to_numpy() == 1
+            active_count = int(active.sum())
+            if active_count > 0:
+                summary[key][col] = {
+                    'count': active_count,
+                    'times': times[active][:3].tolist()  # İlk 3 zaman damgası
+                }
+
+    # Periyot bazlı RMS / fazör / simetrili bileşen özellikleri
+    features = signal_features.compute_features(context)
+    if features is not None and lookback:
+        features = signal_features.trim_features(features, lookback)
+    summary['features'] = signal_features.feature_summary(features, times)
+
+    # Kritik olayları tespit et (yüksek akım): eşik aşımının sürdüğü her bölüm bir olaydır
+    if features is None and not instantaneous_fallback:
+        return summary
+    magnitudes = _current_magnitudes(df, features)
+    starts, ends = _segments(critical_mask(df, magnitudes=magnitudes))
+    if not len(starts):
+        return summary
+
+    n = len(df)
+    peaks = {col: _segment_max(magnitudes[col], starts, ends) if col in magnitudes else np.zeros(len(starts))
+             for col in PHASE_COLUMNS + [NEUTRAL_COLUMN]}
+    sequence = {name: _segment_max(values, starts, ends)
+                for name, values in (features['sequence'].items() if features else ()) if name.startswith('I')}
+    # Bölüm boyunca herhangi bir anda aktif olan koruma sinyalleri
+    pickups = _active_signal_lists(df, pickup_columns, starts, ends)
+    trips = _active_signal_lists(df, trip_columns, starts, ends)
+
+    summary['critical_events'] = [
+        {
+            'time': float(times[start]),
+            'end': float(times[min(end, n - 1)]),
+            'duration_ms': float((times[min(end, n - 1)] - times[start]) * 1000),
+            'IL1': float(peaks['IL1'][i]),
+            'IL2': float(peaks['IL2'][i]),
+            'IL3': float(peaks['IL3'][i]),
+            'Io': float(peaks['Io'][i]),
+            **{name: float(values[i]) for name, values in sequence.items()},
+            'pickup_signals': pickups[i],
+            'trip_signals': trips[i],
+            'ongoing': bool(end >= n)
+        }
+        for i, (start, end) in enumerate(zip(starts, ends))
+    ]
+
+    return summary
@@ -1,24 +1,36 @@
 import torch
-from datasets import load_dataset
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
     BitsAndBytesConfig,
-    TrainingArguments,
 )
 from peft import LoraConfig
-from trl import SFTTrainer
+from trl import SFTConfig, SFTTrainer
 import os
 
+from prepare_dataset import (
+    attention_implementation,
+    block_diagonal_collator,
+    build_packed_dataset,
+    check_transformers_version,
+    packed_collator,
+)
+
 # --- Model ve Veri Seti Ayarları ---
 base_model_name = "meta-llama/Llama-3.2-3B-Instruct"
 new_model_name = "enerjisa-scada-analyzer-v1"
 dataset_path = "fault_analysis_dataset.jsonl"
+max_seq_length = 2048  # paketlenmiş dizi uzunluğu
 
-# --- Veri Setini Yükleme ---
+# --- Veri Setinin Varlığını Kontrol Etme ---
 if not os.path.exists(dataset_path):
     raise FileNotFoundError(f"'{dataset_path}' dosyası bulunamadı. Lütfen proje klasöründe olduğundan emin olun.")
-dataset = load_dataset("json", data_files=dataset_path, split="train")
+
+# Paketlenmiş örneklerin birbirine dikkat etmemesi için: flash-attention 2 position_ids ile sınırları
+# korur; yoksa sdpa blok köşegen maskeyle çalışır
+check_transformers_version()
+attn_implementation = attention_implementation()
+print(f"Dikkat uygulaması: {attn_implementation}")
 
 # --- Model Quantization ---
 bnb_config = BitsAndBytesConfig(
@@ -34,7 +46,9 @@ model = AutoModelForCausalLM.from_pretrained(
     base_model_name,
     quantization_config=bnb_config,
     device_map="auto",
-    trust_remote_code=True
+    trust_remote_code=True,
+    attn_implementation=attn_implementation,
+    torch_dtype=torch.bfloat16,
 )
 model.config.use_cache = False
 
@@ -43,6 +57,10 @@ tokenizer = AutoTokenizer.from_pretrained(base_model_name, trust_remote_code=Tru
 tokenizer.pad_token = tokenizer.eos_token
 tokenizer.padding_side = "right"
 
+# --- Veri Setini Yükleme (tokenize edilmiş + paketlenmiş, önbellekten) ---
+# Biçimlendirme ve tokenizasyon yalnızca veri seti değiştiğinde yapılır (bkz. prepare_dataset.py)
+packed_dataset = build_packed_dataset(dataset_path, tokenizer, max_seq_length)
+
 # --- LoRA Konfigürasyonu ---
 peft_config = LoraConfig(
     lora_alpha=16,
@@ -53,7 +71,7 @@ peft_config = LoraConfig(
 )
 
 # --- Eğitim Argümanları ---
-training_arguments = TrainingArguments(
+training_arguments = SFTConfig(
     output_dir="./results",
     num_train_epochs=1,
     per_device_train_batch_size=1,
@@ -68,21 +86,19 @@ training_arguments = TrainingArguments(
     max_grad_norm=0.3,
     max_steps=-1,
     warmup_ratio=0.03,
-    group_by_length=True,
     lr_scheduler_type="constant",
+    # Diziler zaten sabit uzunlukta ve tokenize edilmiş: SFTTrainer yeniden işlemesin
+    dataset_kwargs={"skip_prepare_dataset": True},
+    remove_unused_columns=False,
 )
 
-# --- Veri Setini Formatlama (En Güncel Yöntem) ---
-def format_dataset_entry(entry):
-    return {"text": f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\n### Talimat:\n{entry['instruction']}\n\n### Veri Özeti:\n{entry['input']}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n{entry['output']}<|eot_id|>"}
-
-formatted_dataset = dataset.map(format_dataset_entry)
-
 # --- Trainer'ı Oluşturma (En Güncel Kütüphanelerle Uyumlu Argümanlar) ---
 trainer = SFTTrainer(
     model=model,
     processing_class=tokenizer,
-    train_dataset=formatted_dataset,
+    train_dataset=packed_dataset,
+    data_collator=packed_collator if attn_implementation == "flash_attention_2"
+    else block_diagonal_collator(torch.bfloat16),
     peft_config=peft_config,
     args=training_arguments,
 )
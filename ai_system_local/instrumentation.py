@@ -0,0 +1,140 @@
+"""
+instrumentation.py
+======================
+SCADAFaultAnalyzer için adım bazlı ölçüm:
+ - her run_analysis adımı (yükle, analiz, özet, LLM) için duvar süresi, CPU süresi ve tepe RSS
+ - LLM adımında Ollama'nın eval_count / eval_duration alanlarından token sayıları ve süreler
+ - kayıtları yapılandırılmış JSON satırları olarak dosyaya ekler (süreç havuzu işçileri dahil)
+ - main() sonunda adım bazlı yüzdelik dilim özeti üretir
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+PERCENTILES = (50, 90, 99)
+
+
+def peak_rss_mb():
+    """Sürecin şu ana kadarki tepe bellek kullanımını (MB) döndürür"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux'ta KB, macOS'ta byte cinsindendir
+        return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024, 2)
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows
+        return round(psutil.Process().memory_info().peak_wset / 2 ** 20, 2)
+    except Exception:
+        return None
+
+
+class StageRecorder:
+    def __init__(self, metrics_path, run_id=None):
+        self.metrics_path = Path(metrics_path)
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        """Kaydı JSON satırı olarak metrik dosyasına ekler"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            # Tek write çağrısı: süreçler arası eklemeler satır ortasında karışmaz
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    @contextmanager
+    def stage(self, file_path, name):
+        """Bir adımı ölçer; çağıran, dönen sözlüğe ek alanlar (ör. LLM metrikleri) ekleyebilir"""
+        extra = {}
+        if not self.enabled:
+            yield extra
+            return
+
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        status = 'ok'
+        try:
+            yield extra
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            # Ölçülen alanlar çağıranın sözlüğüne de yazılır (ör. sonuç deposu için)
+            measured = {
+                'status': status,
+                'wall_s': round(time.perf_counter() - wall_start, 6),
+                'cpu_s': round(time.thread_time() - cpu_start, 6),
+                'peak_rss_mb': peak_rss_mb(),
+            }
+            self.write({
+                'run_id': self.run_id,
+                'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+                'pid': os.getpid(),
+                'file': Path(file_path).name,
+                'stage': name,
+                **measured,
+                **extra,
+            })
+            extra.update(measured)
+
+    def load_run(self):
+        """Bu çalıştırmaya ait kayıtları okur"""
+        if not self.metrics_path.exists():
+            return []
+        records = []
+        with open(self.metrics_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('run_id') == self.run_id:
+                    records.append(record)
+        return records
+
+    def summarize(self):
+        """Adım bazlı yüzdelik dilim özetini metin olarak döndürür"""
+        records = self.load_run()
+        if not records:
+            return "Ölçüm kaydı yok"
+
+        fields = [('wall_s', 's'), ('cpu_s', 's'), ('eval_count', 'token'), ('tokens_per_second', 'token/s')]
+        lines = [f"Adım süreleri (run_id={self.run_id}, {len(records)} kayıt):"]
+        for stage in dict.fromkeys(record['stage'] for record in records):
+            stage_records = [record for record in records if record['stage'] == stage]
+            errors = sum(1 for record in stage_records if record['status'] != 'ok')
+            lines.append(f"- {stage} (n={len(stage_records)}, hata={errors})")
+            for field, unit in fields:
+                values = [record[field] for record in stage_records if record.get(field) is not None]
+                if not values:
+                    continue
+                points = np.percentile(values, PERCENTILES)
+                text = ", ".join(f"p{p}={v:.3f}" for p, v in zip(PERCENTILES, points))
+                lines.append(f"    {field}: {text}, max={max(values):.3f} {unit}")
+            peaks = [record['peak_rss_mb'] for record in stage_records if record.get('peak_rss_mb') is not None]
+            if peaks:
+                lines.append(f"    peak_rss_mb: max={max(peaks):.1f} MB")
+        return "\n".join(lines)
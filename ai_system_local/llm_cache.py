@@ -0,0 +1,114 @@
+"""
+llm_cache.py
+======================
+Ollama analizleri için içerik adresli disk önbelleği:
+ - anahtar = SHA-256(işlenmiş prompt + model adı + model seçenekleri)
+ - her kayıt önbellek klasöründe ayrı bir JSON dosyası olarak tutulur
+ - yaş (max_age_seconds) ve toplam boyut (max_bytes) sınırına göre eski kayıtları siler
+ - isabet/ıskalama sayaçlarını log'a yazar
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600  # 30 gün
+
+
+class AnalysisCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt, model, options):
+        """Prompt, model ve seçeneklerden önbellek anahtarı üretir"""
+        payload = json.dumps({'prompt': prompt, 'model': model, 'options': options},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Önbellekteki yanıtı döndürür; yoksa veya süresi dolmuşsa None"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                age = time.time() - path.stat().st_mtime
+                if age > self.max_age_seconds:
+                    path.unlink()
+                    raise FileNotFoundError(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    response = json.load(f)['response']
+                os.utime(path)  # Son kullanım zamanını güncelle (LRU)
+                self.hits += 1
+                logger.info(f"Önbellek isabeti: {key[:12]} (isabet={self.hits}, ıskalama={self.misses})")
+                return response
+            except (FileNotFoundError, KeyError, ValueError):
+                self.misses += 1
+                logger.info(f"Önbellek ıskalaması: {key[:12]} (isabet={self.hits}, ıskalama={self.misses})")
+                return None
+
+    def put(self, key, response, metadata=None):
+        """Yanıtı önbelleğe yazar ve sınırları aşan kayıtları siler"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'response': response, 'created': time.time(), **(metadata or {})}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Yaşı veya toplam boyutu aşan kayıtları en eskiden başlayarak siler"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.max_age_seconds:
+                    path.unlink(missing_ok=True)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            if removed:
+                logger.info(f"Önbellekten {removed} kayıt silindi (boyut sınırı)")
+
+    def stats(self):
+        """İsabet/ıskalama özetini döndürür"""
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return f"Önbellek: {self.hits} isabet, {self.misses} ıskalama (isabet oranı %{ratio * 100:.0f})"
@@ -1,23 +1,37 @@
-import os
-import pandas as pd
-import numpy as np
+import argparse
 import requests  # ollama kütüphanesi yerine requests kullanıyoruz
 import datetime
 import logging
 from pathlib import Path
 
-# Logging ayarları
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("scada_fault_analysis.log"),
-        logging.StreamHandler()
-    ]
-)
+import async_pipeline
+import batch
+import data_cache
+import fault_engine
+import instrumentation
+import llm_cache
+import manifest
+import ollama_client
+import prompt_budget
+import results_store
+import signature_index
+import tail_mode
+
 logger = logging.getLogger("SCADA_Analyzer")
 
 
+def setup_logging():
+    """Logging ayarları; içe aktarmada değil giriş noktasında çağrılır (--help log dosyası açmaz)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("scada_fault_analysis.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+
 class SCADAFaultAnalyzer:
     def __init__(self):
         # Dizin yapısını oluştur
@@ -44,6 +58,37 @@ class SCADAFaultAnalyzer:
             'repeat_penalty': 1.1
         }
 
+        # Veri özeti, prompt num_ctx penceresine (yanıt payı ayrılarak) sığacak şekilde oluşturulur;
+        # token tahmini düzeltme katsayısı LLM önbelleğinin yanında saklanır
+        self.prompt_budget = prompt_budget.PromptBudget(
+            self.model_options['num_ctx'], state_path=self.base_dir / "cache" / "prompt_calibration.json",
+            model=self.ollama_model)
+
+        # Ayrıştırılmış veri önbelleği (data/.cache)
+        self.use_data_cache = True
+
+        # Ollama yanıt önbelleği (prompt + model + seçenekler ile anahtarlanır)
+        self.use_cache = True
+        self.cache = llm_cache.AnalysisCache(self.base_dir / "cache" / "ollama")
+
+        # Bağlantı havuzlu, akışlı Ollama istemcisi
+        self.client = ollama_client.OllamaClient(self.ollama_host)
+
+        # Tamamlanan analizlerin kalıcı listesi (içerik özeti + model + prompt sürümü), --resume için
+        self.prompt_version = manifest.prompt_version(self.fault_analysis_prompt)
+        self.manifest = manifest.BatchManifest(self.output_dir / "manifest.json")
+
+        # Yapılandırılmış özet, olaylar ve LLM metni için indeksli sonuç deposu (SQLite)
+        self.results_store = results_store.ResultsStore(self.base_dir / "results.db")
+
+        # Benzer arıza imzalı kayıtlar için önceki analizin yeniden kullanımı (LLM çağrısı yapılmaz);
+        # uyarlanmış analiz kayda özgü değildir, bu yüzden yalnızca açıkça istenirse (--signature-reuse)
+        self.use_signature_index = False
+        self.signature_index = signature_index.SignatureIndex(self.base_dir / "cache" / "signatures")
+
+        # Adım bazlı süre/kaynak ölçümleri (JSON satırları)
+        self.metrics = instrumentation.StageRecorder(self.base_dir / "scada_metrics.jsonl")
+
     def _create_directories(self):
         """Gerekli dizinleri oluşturur"""
         for directory in [self.prompts_dir, self.data_dir, self.output_dir]:
@@ -63,20 +108,11 @@ class SCADAFaultAnalyzer:
     def load_scada_data(self, file_path):
         """SCADA verisini yükler ve temizler"""
         try:
-            # CSV dosyasını yükle
-            df = pd.read_csv(file_path)
+            # CSV / COMTRADE kaydını yükle; sütun adları temizlenmiş ve zamana göre sıralı gelir.
+            # Aynı kayıt daha önce ayrıştırıldıysa sütunsal önbellekten okunur.
+            df = data_cache.load_scada_frame(file_path, use_cache=self.use_data_cache)
             logger.info(f"Veri yüklendi: {file_path}, {len(df)} satır")
 
-            # Sütun adlarını düzelt (boşluk ve özel karakterleri temizle)
-            df.columns = [col.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_')
-                          for col in df.columns]
-
-            # Zaman sütununu numeric olarak tut (sıralama için)
-            if 'time' in df.columns:
-                df['time'] = pd.to_numeric(df['time'], errors='coerce')
-                df = df.sort_values('time')
-                logger.info("Zaman sütunu sıralandı")
-
             return df
         except Exception as e:
             logger.error(f"Veri yüklenirken hata: {str(e)}")
@@ -84,157 +120,358 @@ class SCADAFaultAnalyzer:
 
     def analyze_fault_scenarios(self, df):
         """Arıza senaryolarını analiz eder"""
-        summary = {
-            'total_records': len(df),
-            'time_range': f"{df['time'].min():.6f} - {df['time'].max():.6f} saniye",
-            'pickup_events': {},
-            'trip_events': {},
-            'critical_events': []
-        }
-
-        # PICK UP sinyallerini analiz et
-        pickup_columns = [col for col in df.columns if 'PICK_UP' in col and '67' in col]
-        for col in pickup_columns:
-            active_count = df[df[col] == 1].shape[0]
-            if active_count > 0:
-                summary['pickup_events'][col] = {
-                    'count': active_count,
-                    'times': df[df[col] == 1]['time'].tolist()[:3]  # İlk 3 zaman damgası
-                }
-
-        # TRIP sinyallerini analiz et
-        trip_columns = [col for col in df.columns if 'TRIP' in col and '67' in col]
-        for col in trip_columns:
-            active_count = df[df[col] == 1].shape[0]
-            if active_count > 0:
-                summary['trip_events'][col] = {
-                    'count': active_count,
-                    'times': df[df[col] == 1]['time'].tolist()[:3]  # İlk 3 zaman damgası
-                }
-
-        # Kritik olayları tespit et (yüksek akım)
-        for idx, row in df.iterrows():
-            # Yüksek akım kontrolü (normal işletme akımından çok daha yüksek)
-            high_current = False
-            for phase in ['IL1', 'IL2', 'IL3']:
-                if phase in df.columns and abs(row[phase]) > 10:  # 10A üzerinde yüksek akım
-                    high_current = True
-
-            # Nötr akımı kontrolü
-            neutral_high = False
-            if 'Io' in df.columns and abs(row['Io']) > 5:  # 5A üzerinde nötr akımı
-                neutral_high = True
-
-            if high_current or neutral_high:
-                summary['critical_events'].append({
-                    'time': row['time'],
-                    'IL1': row.get('IL1', 0),
-                    'IL2': row.get('IL2', 0),
-                    'IL3': row.get('IL3', 0),
-                    'Io': row.get('Io', 0),
-                    'pickup_signals': [col for col in pickup_columns if row[col] == 1],
-                    'trip_signals': [col for col in trip_columns if row[col] == 1]
-                })
-
-        return summary
+        # Satır döngüsü yerine NumPy tabanlı motoru kullan
+        return fault_engine.analyze_fault_scenarios(df)
+
+    def _format_signal_events(self, signal, data, intervals, max_intervals=3):
+        """Sinyali aktif olduğu aralıklarla (aralık bilgisi yoksa örnek sayısıyla) biçimlendirir"""
+        signal_intervals = [iv for iv in intervals if iv['signal'] == signal]
+        if not signal_intervals:
+            return f"- {signal}: {data['count']} kez tetiklendi, İlk zamanlar: {', '.join([f'{t:.4f}' for t in data['times']])}\n"
+
+        sample_text = f", {data['count']} örnek" if data else ""
+        text = f"- {signal}: {len(signal_intervals)} kez aktif oldu{sample_text}\n"
+        for iv in signal_intervals[:max_intervals]:  # İlk aralıklar
+            end = "kayıt sonuna kadar" if iv['ongoing'] else f"{iv['end']:.4f}s"
+            text += f"    {iv['start']:.4f}s → {end} ({iv['duration_ms']:.1f} ms)\n"
+        if len(signal_intervals) > max_intervals:
+            text += f"    ... ve {len(signal_intervals) - max_intervals} aralık daha\n"
+        return text
+
+    def _signal_section(self, summary, title, key, kind):
+        """PICK UP / TRIP bölümünün tam, kısa ve yalnızca sinyal adlı biçimlerini döndürür"""
+        intervals = summary.get('signal_intervals', [])
+        signals = list(dict.fromkeys(list(summary[key]) + [iv['signal'] for iv in intervals if iv['kind'] == kind]))
+        if not signals:
+            return [f"{title} Sinyalleri:\n- Hiç {title} sinyali yok\n\n"]
+
+        variants = []
+        for max_intervals in (3, 1):
+            text = f"{title} Sinyalleri:\n"
+            for signal in signals:
+                text += self._format_signal_events(signal, summary[key].get(signal), intervals, max_intervals)
+            variants.append(text + "\n")
+        variants.append(f"{title} Sinyalleri:\n- {len(signals)} sinyal aktif oldu: {', '.join(signals)}\n\n")
+        return variants
+
+    def _breaker_section(self, summary):
+        """Kesici durum geçişleri bölümünün biçimlerini döndürür"""
+        breaker_intervals = [iv for iv in summary.get('signal_intervals', []) if iv['kind'] == 'breaker']
+        if not breaker_intervals:
+            return [""]
+
+        def lines(ivs):
+            text = ""
+            for iv in ivs:
+                end = "kayıt sonuna kadar" if iv['ongoing'] else f"{iv['end']:.4f}s"
+                text += f"- {iv['signal']} = 1: {iv['start']:.4f}s → {end} ({iv['duration_ms']:.1f} ms)\n"
+            return text
+
+        full = "Kesici Durumu:\n" + lines(breaker_intervals) + "\n"
+        if len(breaker_intervals) <= 2:
+            return [full, ""]
+        compact = (f"Kesici Durumu ({len(breaker_intervals)} aralık, ilk ve son):\n"
+                   + lines([breaker_intervals[0], breaker_intervals[-1]]) + "\n")
+        return [full, compact, ""]
+
+    def _sequence_section(self, summary):
+        """PICK UP → TRIP → kesici açma dizileri bölümünün biçimlerini döndürür"""
+        sequences = summary.get('fault_sequences')
+        if not sequences:
+            return [""]
+
+        variants = []
+        for limit in (5, 2, 1):
+            text = "Arıza Sırası (PICK UP → TRIP → Kesici Açma):\n"
+            for i, seq in enumerate(sequences[:limit]):
+                text += f"{i + 1}. {seq['pickup_signal']} @ {seq['pickup_time']:.4f}s"
+                if seq['trip_signal']:
+                    text += f" → {seq['trip_signal']} @ {seq['trip_time']:.4f}s ({seq['pickup_to_trip_ms']:.1f} ms)"
+                else:
+                    text += " → TRIP yok"
+                if seq['breaker_open_time'] is not None:
+                    latency = seq['trip_to_open_ms'] if seq['trip_to_open_ms'] is not None else seq['pickup_to_open_ms']
+                    text += f" → Kesici açma @ {seq['breaker_open_time']:.4f}s ({latency:.1f} ms)\n"
+                else:
+                    text += " → Kesici açılmadı\n"
+            if len(sequences) > limit and limit < 5:
+                text += f"... ve {len(sequences) - limit} dizi daha\n"
+            variants.append(text + "\n")
+        return variants
+
+    def _feature_section(self, summary):
+        """Periyot bazlı RMS / simetrili bileşen özellikleri bölümünün biçimlerini döndürür"""
+        features = summary.get('features')
+        if not features:
+            return [""]
+
+        sequence = features['sequence']
+        sequence_text = ", ".join(f"{name}={sequence[name]['max']:.2f}A"
+                                  for name in ('I1', 'I2', 'I0') if name in sequence)
+        if features['I2_I1_max'] is not None:
+            sequence_text += f", I2/I1={features['I2_I1_max']:.2f}"
+        compact = "Simetrili Bileşenler (maks.): " + sequence_text + "\n\n" if sequence_text else ""
+
+        text = f"Ölçüm Özellikleri (temel bileşen RMS, {features['samples_per_cycle']} örnek/periyot):\n"
+        for channel, values in features['channels'].items():
+            unit = 'A' if channel.startswith('I') else 'V'
+            pre = f"{values['pre']:.2f}{unit}" if values['pre'] is not None else "-"
+            # Gerilimlerde çökme (minimum), akımlarda artış (maksimum) belirleyicidir
+            low = f"min. {values['min']:.2f}{unit}, " if unit == 'V' else ""
+            text += f"- {channel}: başlangıç {pre}, {low}maks. {values['max']:.2f}{unit}\n"
+        if sequence_text:
+            text += f"- Simetrili bileşenler (maks.): {sequence_text}\n"
+        if 'U1' in sequence and sequence['U1']['min'] is not None:
+            text += f"- Pozitif bileşen gerilimi U1: min. {sequence['U1']['min']:.2f}V\n"
+        return [text + "\n", compact, ""]
+
+    def _critical_section(self, summary):
+        """Kritik olaylar bölümünün biçimlerini döndürür"""
+        events = summary['critical_events']
+        if not events:
+            return ["Kritik Olaylar:\n- Kritik olay tespit edilmedi\n"]
+
+        variants = []
+        for limit in (5, 2):  # İlk 5 olayı göster
+            text = "Kritik Olaylar (akım eşiğinin aşıldığı bölümler):\n"
+            for i, event in enumerate(events[:limit]):
+                text += f"{i + 1}. Zaman: {event['time']:.4f}s → {event['end']:.4f}s ({event['duration_ms']:.1f} ms)\n"
+                text += f"   Akımlar (RMS maks.): IL1={event['IL1']:.2f}A, IL2={event['IL2']:.2f}A, IL3={event['IL3']:.2f}A, Io={event['Io']:.2f}A\n"
+                if 'I1' in event:
+                    text += f"   Bileşenler: I1={event['I1']:.2f}A, I2={event['I2']:.2f}A, I0={event['I0']:.2f}A\n"
+                text += f"   PICK UP: {', '.join(event['pickup_signals']) if event['pickup_signals'] else 'Yok'}\n"
+                text += f"   TRIP: {', '.join(event['trip_signals']) if event['trip_signals'] else 'Yok'}\n\n"
+            if len(events) > limit:
+                text += f"... ve {len(events) - limit} olay daha\n\n"
+            variants.append(text)
+        variants.append(f"Kritik Olaylar:\n- {len(events)} kritik olay, ilki {events[0]['time']:.4f}s\n")
+        return variants
+
+    def summary_sections(self, summary):
+        """Veri özeti bölümlerini tanı değerine göre önceliklendirilmiş olarak döndürür"""
+        header = f"Toplam Kayıt Sayısı: {summary['total_records']}\n"
+        header += f"Zaman Aralığı: {summary['time_range']}\n\n"
+        # Öncelik küçüldükçe tanı değeri artar; bütçe aşılırsa en büyük öncelikli bölüm önce kısaltılır
+        return [
+            {'name': 'Özet', 'priority': 0, 'variants': [header]},
+            {'name': 'Ölçüm Özellikleri', 'priority': 2, 'variants': self._feature_section(summary)},
+            {'name': 'PICK UP', 'priority': 2, 'variants': self._signal_section(summary, "PICK UP", 'pickup_events', 'pickup')},
+            {'name': 'TRIP', 'priority': 2, 'variants': self._signal_section(summary, "TRIP", 'trip_events', 'trip')},
+            {'name': 'Kesici Durumu', 'priority': 3, 'variants': self._breaker_section(summary)},
+            {'name': 'Arıza Sırası', 'priority': 1, 'variants': self._sequence_section(summary)},
+            {'name': 'Kritik Olaylar', 'priority': 4, 'variants': self._critical_section(summary)},
+        ]
 
     def generate_data_summary(self, summary):
-        """Veri özetini metin formatında oluşturur"""
-        summary_text = f"Toplam Kayıt Sayısı: {summary['total_records']}\n"
-        summary_text += f"Zaman Aralığı: {summary['time_range']}\n\n"
-
-        # PICK UP olayları
-        summary_text += "PICK UP Sinyalleri:\n"
-        if summary['pickup_events']:
-            for signal, data in summary['pickup_events'].items():
-                summary_text += f"- {signal}: {data['count']} kez tetiklendi, İlk zamanlar: {', '.join([f'{t:.4f}' for t in data['times']])}\n"
-        else:
-            summary_text += "- Hiç PICK UP sinyali yok\n"
-
-        # TRIP olayları
-        summary_text += "\nTRIP Sinyalleri:\n"
-        if summary['trip_events']:
-            for signal, data in summary['trip_events'].items():
-                summary_text += f"- {signal}: {data['count']} kez tetiklendi, İlk zamanlar: {', '.join([f'{t:.4f}' for t in data['times']])}\n"
-        else:
-            summary_text += "- Hiç TRIP sinyali yok\n"
-
-        # Kritik olaylar
-        summary_text += "\nKritik Olaylar:\n"
-        if summary['critical_events']:
-            for i, event in enumerate(summary['critical_events'][:5]):  # İlk 5 olayı göster
-                summary_text += f"{i + 1}. Zaman: {event['time']:.4f}s\n"
-                summary_text += f"   Akımlar: IL1={event['IL1']:.2f}A, IL2={event['IL2']:.2f}A, IL3={event['IL3']:.2f}A, Io={event['Io']:.2f}A\n"
-                summary_text += f"   PICK UP: {', '.join(event['pickup_signals']) if event['pickup_signals'] else 'Yok'}\n"
-                summary_text += f"   TRIP: {', '.join(event['trip_signals']) if event['trip_signals'] else 'Yok'}\n\n"
-        else:
-            summary_text += "- Kritik olay tespit edilmedi\n"
-
-        return summary_text
-
-    def analyze_with_ollama(self, data_summary):
-        """Ollama API ile arıza analizi yapar"""
+        """Veri özetini metin formatında, prompt token bütçesine sığacak şekilde oluşturur"""
+        return self.prompt_budget.fit(self.fault_analysis_prompt, self.summary_sections(summary))
+
+    def cached_analysis(self, data_summary):
+        """Aynı prompt/model/seçeneklerle daha önce üretilmiş analizi döndürür; yoksa None"""
+        if not self.use_cache:
+            return None
+        full_prompt = self.fault_analysis_prompt.replace("{data_summary}", data_summary)
+        return self.cache.get(self.cache.make_key(full_prompt, self.ollama_model, self.model_options))
+
+    def analyze_with_ollama(self, data_summary, on_token=None, raise_errors=False, metrics_out=None):
+        """Ollama API ile arıza analizi yapar (yanıt akış halinde alınır)"""
         logger.info("Ollama API ile analiz başlatılıyor...")
 
         # Prompt'u hazırla
         full_prompt = self.fault_analysis_prompt.replace("{data_summary}", data_summary)
+        prompt_tokens = self.prompt_budget.count(full_prompt)
+        logger.info(f"Prompt: ~{prompt_tokens} token (num_ctx {self.model_options['num_ctx']})")
+
+        # Aynı prompt/model/seçenekler daha önce analiz edildiyse önbellekten dön
+        cache_key = None
+        if self.use_cache:
+            cache_key = self.cache.make_key(full_prompt, self.ollama_model, self.model_options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if metrics_out is not None:
+                    metrics_out['cache_hit'] = True
+                return cached
 
         try:
-            # Ollama API'sine istek gönder
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    'model': self.ollama_model,
-                    'prompt': full_prompt,
-                    'stream': False,
-                    'options': self.model_options  # Bu satırı ekleyin
-                },
-                timeout=180  # Büyük modeller için daha uzun zaman
-            )
-
-            response.raise_for_status()  # HTTP hatası kontrolü
-            result = response.json()
-
-            logger.info("Ollama analizi tamamlandı")
-            return result['response']
-        except requests.exceptions.ConnectionError:
+            # Ollama API'sine akışlı istek gönder, token'lar geldikçe on_token'a iletilir
+            results, metrics = self.client.generate(self.ollama_model, full_prompt, self.model_options,
+                                                    on_token=on_token)
+
+            logger.info(f"Ollama analizi tamamlandı ({ollama_client.format_metrics(metrics)})")
+            self.prompt_budget.observe(prompt_tokens, metrics.get('prompt_eval_count'))
+            if metrics_out is not None:
+                metrics_out.update(metrics)
+            if cache_key:
+                self.cache.put(cache_key, results, {'model': self.ollama_model})
+            return results
+        except requests.exceptions.ConnectionError as e:
+            if raise_errors:
+                raise
+            if metrics_out is not None:
+                metrics_out['error'] = str(e)
             logger.error(
                 "Ollama'ya bağlanılamadı. Lütfen Ollama'yı ayrı bir terminalde çalıştırdığınızdan emin olun (ollama serve)")
             return "HATA: Ollama'ya bağlanılamadı. Lütfen Ollama'yı ayrı bir terminalde çalıştırdığınızdan emin olun."
         except Exception as e:
+            # Yeniden deneme yapan çağıranlar (async pipeline) hatayı kendisi ele alır
+            if raise_errors:
+                raise
+            if metrics_out is not None:
+                metrics_out['error'] = str(e)
             logger.error(f"Ollama analiz hatası: {str(e)}")
             return f"Analiz hatası: {str(e)}"
 
+    def _write_header(self, f):
+        """Rapor başlığını yazar"""
+        f.write(f"## SCADA Arıza Analiz Raporu\n")
+        f.write(f"## Tarih: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
     def save_results(self, results, file_name="analysis_results.txt"):
         """Analiz sonuçlarını kaydeder"""
         output_path = self.output_dir / file_name
 
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"## SCADA Arıza Analiz Raporu\n")
-            f.write(f"## Tarih: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            self._write_header(f)
             f.write(results)
 
         logger.info(f"Analiz sonuçları kaydedildi: {output_path}")
         return output_path
 
-    def run_analysis(self, file_path):
-        """Tam analiz sürecini çalıştırır"""
-        logger.info(f"Analiz başlıyor: {file_path}")
+    def generate_report(self, file_path, data_summary, raise_errors=False, on_token=None, summary=None):
+        """LLM analizini token'lar geldikçe çıktı dosyasına (ve varsa on_token'a) yazar"""
+        output_path, output_file = self.create_output_file(file_path)
+        streamed = []
+
+        with self.metrics.stage(file_path, 'generate') as llm_metrics, output_file as f:
+            self._write_header(f)
+
+            def write_token(token):
+                streamed.append(token)
+                f.write(token)
+                f.flush()
+                if on_token:
+                    on_token(token)
+
+            # Önce birebir önbellek; benzer imza yalnızca önbellek açıkken ve kaydın kendi eski
+            # analizleri dışında aranır
+            match = None
+            cached = self.cached_analysis(data_summary)
+            if cached is None and summary is not None and self.use_signature_index and self.use_cache:
+                match = self.signature_index.match(summary, self.ollama_model, self.prompt_version,
+                                                   exclude=Path(file_path).stem)
+
+            try:
+                if cached is not None:
+                    results = cached
+                    llm_metrics['cache_hit'] = True
+                elif match:
+                    results = self.reuse_analysis(match, data_summary)
+                    llm_metrics['signature_match'] = {'recording': match['entry']['recording'],
+                                                      'distance': round(match['distance'], 4),
+                                                      'similarity': round(match['similarity'], 4)}
+                else:
+                    results = self.analyze_with_ollama(data_summary, on_token=write_token,
+                                                       raise_errors=raise_errors, metrics_out=llm_metrics)
+            except Exception:
+                # Yarım kalan raporu bırakma
+                f.close()
+                output_path.unlink(missing_ok=True)
+                raise
+
+            # Önbellek isabeti veya bağlantı hatasında hiç token akıtılmamıştır
+            if not streamed:
+                f.write(results)
+            elif results != ''.join(streamed):
+                f.write("\n\n" + results)
 
+        logger.info(f"Analiz sonuçları kaydedildi: {output_path}")
+        # Hata metni içeren raporlar tamamlanmış sayılmaz; --resume ile yeniden denenir
+        if 'error' not in llm_metrics:
+            self.manifest.record(file_path, output_path, self.ollama_model, self.prompt_version)
+            self.store_results(file_path, output_path, results, summary, data_summary, llm_metrics)
+            # Yalnızca LLM'in ürettiği analizler dizine girer; uyarlanmış analizler zincirlenmez
+            if summary is not None and self.use_signature_index and cached is None and not match:
+                self.signature_index.add(summary, Path(file_path).stem, output_path, results,
+                                         self.ollama_model, self.prompt_version)
+        return output_path, results
+
+    def reuse_analysis(self, match, data_summary):
+        """Benzer kaydın saklı analizini bu kaydın veri özetiyle birlikte döndürür"""
+        entry = match['entry']
+        logger.info(f"Benzer arıza imzası bulundu: {entry['recording']} (benzerlik {match['similarity']:.3f}, "
+                    f"uzaklık {match['distance']:.3f}); LLM çağrılmadı")
+        return (f"[Bu analiz, benzer arıza imzalı {entry['recording']} kaydının {entry['created']} tarihli "
+                f"analizinden uyarlanmıştır. Benzerlik: {match['similarity']:.3f} "
+                f"(uzaklık {match['distance']:.3f}).]\n\n"
+                f"{entry['results']}\n\n"
+                f"---\nBu kaydın veri özeti (genlikler ve zamanlar yukarıdaki analizden farklı olabilir):\n"
+                f"{data_summary}")
+
+    def store_results(self, file_path, output_path, results, summary, data_summary, timings):
+        """Tamamlanan analizi sonuç deposuna ekler; depo hatası raporu geçersiz kılmaz"""
+        entry = self.manifest.entries.get(self.manifest.key(file_path), {})
         try:
-            # Veriyi yükle
+            self.results_store.record(Path(file_path).stem, output_path, results, summary=summary,
+                                      data_summary=data_summary, source_path=Path(file_path).resolve(),
+                                      content_hash=entry.get('content_hash'), model=self.ollama_model,
+                                      prompt_version=self.prompt_version, timings=timings)
+        except Exception as e:
+            logger.warning(f"Sonuç deposuna yazılamadı: {output_path}: {str(e)}")
+
+    def analyze_file(self, file_path):
+        """Veriyi yükler ve analiz eder; analiz özetini döndürür"""
+        with self.metrics.stage(file_path, 'load') as extra:
             df = self.load_scada_data(file_path)
+            extra['rows'] = len(df)
+        with self.metrics.stage(file_path, 'analyze'):
+            return self.analyze_fault_scenarios(df)
 
-            # Veriyi analiz et
-            summary = self.analyze_fault_scenarios(df)
+    def fit_summary(self, file_path, summary):
+        """Analiz özetini güncel token düzeltme katsayısıyla LLM metin özetine çevirir"""
+        with self.metrics.stage(file_path, 'summary') as extra:
             data_summary = self.generate_data_summary(summary)
+            extra['summary_chars'] = len(data_summary)
+        return data_summary
+
+    def build_summary(self, file_path):
+        """Veriyi yükler, analiz eder; (analiz özeti, LLM için metin özeti) döndürür"""
+        summary = self.analyze_file(file_path)
+        return summary, self.fit_summary(file_path, summary)
+
+    def prepare_summary(self, file_path):
+        """Veriyi yükler, analiz eder ve LLM için metin özetini döndürür"""
+        return self.build_summary(file_path)[1]
+
+    def output_file_name(self, file_path):
+        """Analiz çıktısı için zaman damgalı (milisaniyeli) dosya adını döndürür"""
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        return f"analysis_{Path(file_path).stem}_{timestamp}.txt"
+
+    def create_output_file(self, file_path):
+        """Çıktı dosyasını yalnızca yoksa oluşturur; (yol, açık dosya) döndürür.
+
+        Aynı adlı iki kayıt (ör. kayit.cfg ve kayit.csv) aynı milisaniyede biterse ikinci rapor sayaçla ayrılır.
+        """
+        name = Path(self.output_file_name(file_path))
+        output_path = self.output_dir / name
+        counter = 1
+        while True:
+            try:
+                return output_path, open(output_path, 'x', encoding='utf-8')
+            except FileExistsError:
+                counter += 1
+                output_path = self.output_dir / f"{name.stem}_{counter}{name.suffix}"
 
-            # Ollama ile analiz yap
-            results = self.analyze_with_ollama(data_summary)
+    def run_analysis(self, file_path):
+        """Tam analiz sürecini çalıştırır"""
+        logger.info(f"Analiz başlıyor: {file_path}")
+
+        try:
+            # Veriyi yükle ve analiz et
+            summary, data_summary = self.build_summary(file_path)
 
-            # Sonuçları kaydet
-            output_path = self.save_results(results,
-                                            f"analysis_{Path(file_path).stem}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+            # Ollama ile analiz yap, sonuçları akış halinde kaydet
+            output_path, results = self.generate_report(file_path, data_summary, summary=summary)
 
             logger.info("Analiz başarıyla tamamlandı")
             return output_path, results
@@ -244,10 +481,45 @@ class SCADAFaultAnalyzer:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="SCADA arıza analizi")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Ayrıştırma/özet için süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--llm-concurrency", type=int, default=batch.DEFAULT_LLM_CONCURRENCY,
+                        help="Aynı anda gönderilecek en fazla Ollama isteği")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ollama yanıt önbelleğini atla")
+    parser.add_argument("--no-data-cache", action="store_true",
+                        help="Ayrıştırılmış veri önbelleğini (data/.cache) atla")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="asyncio hattını kullan (eşzamanlılık: --llm-concurrency)")
+    parser.add_argument("--max-retries", type=int, default=async_pipeline.DEFAULT_MAX_RETRIES,
+                        help="5xx/zaman aşımında en fazla yeniden deneme (--async ile)")
+    parser.add_argument("--follow", metavar="CSV",
+                        help="Büyümekte olan CSV dosyasını izle, yalnızca yeni satırları işle")
+    parser.add_argument("--interval", type=float, default=tail_mode.DEFAULT_POLL_INTERVAL,
+                        help="--follow için yoklama aralığı (saniye)")
+    parser.add_argument("--signature-reuse", action="store_true",
+                        help="Benzer arıza imzalı başka bir kaydın analizini yeniden kullan (LLM çağrılmaz)")
+    parser.add_argument("--signature-distance", type=float, default=signature_index.DEFAULT_MAX_DISTANCE,
+                        help="Analizin yeniden kullanılacağı en büyük imza uzaklığı")
+    parser.add_argument("--resume", action="store_true",
+                        help="Aynı içerik, model ve promptla raporu olan kayıtları atla (output/manifest.json)")
+    args = parser.parse_args()
+    setup_logging()
+
     analyzer = SCADAFaultAnalyzer()
+    analyzer.use_cache = not args.no_cache
+    analyzer.use_data_cache = not args.no_data_cache
+    # Önbellek kapalıyken önceki analizler hiçbir biçimde yeniden kullanılmaz
+    analyzer.use_signature_index = args.signature_reuse and not args.no_cache
+    analyzer.signature_index.max_distance = args.signature_distance
+
+    if args.follow:
+        tail_mode.IncrementalFaultTracker(analyzer, args.follow).follow(interval=args.interval)
+        return
 
-    # Mevcut CSV dosyalarını bul ve analiz et
-    csv_files = list(analyzer.data_dir.glob("*.csv"))
+    # Mevcut CSV ve COMTRADE (.cfg) dosyalarını bul ve analiz et
+    csv_files = list(analyzer.data_dir.glob("*.csv")) + list(analyzer.data_dir.glob("*.cfg"))
 
     if not csv_files:
         logger.error("Analiz edilecek CSV dosyası bulunamadı!")
@@ -255,12 +527,34 @@ def main():
             "HATA: 'data' klasöründe CSV dosyası bulunamadı. Lütfen comtrade40_data.csv ve comtrade41_data.csv dosyalarını data klasörüne kopyalayın.")
         return
 
-    for csv_file in csv_files:
-        logger.info(f"İşleniyor: {csv_file}")
-        output_path, results = analyzer.run_analysis(csv_file)
-
+    if args.resume:
+        pending = [file_path for file_path in csv_files
+                   if not analyzer.manifest.is_current(file_path, analyzer.ollama_model, analyzer.prompt_version)]
+        logger.info(f"Devam modu: {len(csv_files) - len(pending)} kayıt güncel, {len(pending)} kayıt analiz edilecek")
+        if not pending:
+            print("Tüm kayıtlar güncel; analiz edilecek yeni veya değişmiş kayıt yok.")
+            return
+        csv_files = pending
+
+    if args.async_mode:
+        import asyncio
+        pipeline = async_pipeline.AsyncSCADAFaultAnalyzer(analyzer, concurrency=args.llm_concurrency,
+                                                          max_retries=args.max_retries)
+        outcomes = asyncio.run(pipeline.run_many(csv_files))
+    else:
+        outcomes = batch.run_batch(analyzer, csv_files, workers=args.workers, llm_concurrency=args.llm_concurrency)
+    logger.info(analyzer.cache.stats())
+    logger.info(analyzer.metrics.summarize())
+
+    for outcome in outcomes:
         print("\n=== Analiz Sonuçları ===")
-        print(f"Kaydedildi: {output_path}")
+        if outcome['error']:
+            print(f"HATA: {outcome['file']} işlenemedi: {outcome['error']}")
+            print("=======================\n")
+            continue
+
+        results = outcome['results']
+        print(f"Kaydedildi: {outcome['output_path']}")
         print("\nÖnizleme:")
         print(results[:500] + "..." if len(results) > 500 else results)
         print("=======================\n")
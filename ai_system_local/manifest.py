@@ -0,0 +1,109 @@
+"""
+manifest.py
+======================
+Toplu analiz için kalıcı, devam ettirilebilir iş listesi (output/manifest.json):
+ - her kayıt için kaynak içerik özeti (SHA-256), model, prompt sürümü ve rapor yolunu saklar
+ - kayıt, rapor başarıyla yazıldığı anda eklenir; yarıda kalan toplu iş kaldığı yerden sürer
+ - --resume modunda içeriği, modeli ve promptu değişmemiş ve raporu duran kayıtlar atlanır
+ - içerik özeti mtime/boyut imzasıyla saklanır; değişmeyen büyük dosyalar yeniden okunmaz
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import data_cache
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def prompt_version(prompt):
+    """Prompt şablonunun kısa sürüm özetini döndürür"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+
+
+class BatchManifest:
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except ValueError as e:
+            logger.warning(f"Manifest okunamadı, yeniden oluşturulacak: {self.manifest_path}: {str(e)}")
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('entries', {})
+
+    def _save(self):
+        tmp_path = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def key(file_path):
+        return str(Path(file_path).resolve())
+
+    def content_hash(self, file_path):
+        """Kaynağın (COMTRADE için .cfg + .dat) içerik özetini döndürür; imza değişmediyse kayıttakini kullanır"""
+        sources = data_cache.source_files(Path(file_path))
+        signature = [[source.name, source.stat().st_mtime_ns, source.stat().st_size] for source in sources]
+        entry = self.entries.get(self.key(file_path))
+        if entry and entry.get('signature') == signature:
+            return entry['content_hash'], signature
+
+        digest = hashlib.sha256()
+        for source in sources:
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(block)
+        return digest.hexdigest(), signature
+
+    def is_current(self, file_path, model, prompt_version):
+        """Kaydın aynı içerik, model ve prompt ile analiz edilmiş raporu varsa True döndürür"""
+        entry = self.entries.get(self.key(file_path))
+        if not entry or entry['model'] != model or entry['prompt_version'] != prompt_version:
+            return False
+        if not Path(entry['output_path']).exists():
+            return False
+        content_hash, _ = self.content_hash(file_path)
+        return entry['content_hash'] == content_hash
+
+    def record(self, file_path, output_path, model, prompt_version):
+        """Tamamlanan analizi manifeste ekler ve hemen diske yazar"""
+        content_hash, signature = self.content_hash(file_path)
+        with self._lock:
+            self.entries[self.key(file_path)] = {
+                'file': Path(file_path).name,
+                'content_hash': content_hash,
+                'signature': signature,
+                'model': model,
+                'prompt_version': prompt_version,
+                'output_path': str(output_path),
+                'completed': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._save()
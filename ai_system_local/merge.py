@@ -1,45 +1,192 @@
-import torch
-from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import re
+import json
+import math
+import shutil
 import os
+import argparse
+from pathlib import Path
 
 # --- AYARLAR ---
 base_model_name = "meta-llama/Llama-3.2-3B-Instruct"
 adapter_path = "./enerjisa-scada-analyzer-v1"
 merged_model_path = "./enerjisa-scada-analyzer-v1-merged"
 
-# --- BİRLEŞTİRME İŞLEMİ ---
-print(f"Temel model yükleniyor: {base_model_name}")
-base_model = AutoModelForCausalLM.from_pretrained(
-    base_model_name,
-    torch_dtype=torch.bfloat16,
-    device_map="auto",
-    trust_remote_code=True,
-)
-
-print(f"Adaptör yükleniyor: {adapter_path}")
-
-# HATA ÇÖZÜMÜ: 'offload_folder' parametresini ekliyoruz.
-# Bu, belleğe sığmayan parçaların geçici olarak nereye yazılacağını belirtir.
-offload_directory = "./offload_temp"
-os.makedirs(offload_directory, exist_ok=True) # Klasör yoksa oluştur
-
-# Temel modelin üzerine adaptörü (eğitilmiş katmanları) yüklüyoruz
-merged_model = PeftModel.from_pretrained(
-    base_model,
-    adapter_path,
-    offload_folder=offload_directory # Kritik ekleme burada
-)
-
-print("Modeller birleştiriliyor (merge and unload)...")
-# Adaptörü temel modelle kalıcı olarak birleştiriyoruz
-merged_model = merged_model.merge_and_unload()
-
-print(f"Birleştirilmiş model '{merged_model_path}' klasörüne kaydediliyor...")
-# Artık tek parça olan yeni modeli ve tokenizer'ı kaydediyoruz
-merged_model.save_pretrained(merged_model_path)
-tokenizer = AutoTokenizer.from_pretrained(base_model_name)
-tokenizer.save_pretrained(merged_model_path)
-
-print("\n✅ Birleştirme tamamlandı!")
-print(f"Nihai modelin artık '{merged_model_path}' klasöründe kullanıma hazır.")
\ No newline at end of file
+# Akışlı birleştirmede ağırlık dışında hedef klasöre kopyalanan dosyalar
+MODEL_SIDE_FILES = ("*.json", "tokenizer*", "*.model", "*.txt")
+
+
+def merge_with_peft():
+    """Tüm modeli belleğe yükleyip PEFT merge_and_unload ile birleştirir"""
+    import torch
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    # --- BİRLEŞTİRME İŞLEMİ ---
+    print(f"Temel model yükleniyor: {base_model_name}")
+    base_model = AutoModelForCausalLM.from_pretrained(
+        base_model_name,
+        torch_dtype=torch.bfloat16,
+        device_map="auto",
+        trust_remote_code=True,
+    )
+
+    print(f"Adaptör yükleniyor: {adapter_path}")
+
+    # HATA ÇÖZÜMÜ: 'offload_folder' parametresini ekliyoruz.
+    # Bu, belleğe sığmayan parçaların geçici olarak nereye yazılacağını belirtir.
+    offload_directory = "./offload_temp"
+    os.makedirs(offload_directory, exist_ok=True) # Klasör yoksa oluştur
+
+    # Temel modelin üzerine adaptörü (eğitilmiş katmanları) yüklüyoruz
+    merged_model = PeftModel.from_pretrained(
+        base_model,
+        adapter_path,
+        offload_folder=offload_directory # Kritik ekleme burada
+    )
+
+    print("Modeller birleştiriliyor (merge and unload)...")
+    # Adaptörü temel modelle kalıcı olarak birleştiriyoruz
+    merged_model = merged_model.merge_and_unload()
+
+    print(f"Birleştirilmiş model '{merged_model_path}' klasörüne kaydediliyor...")
+    # Artık tek parça olan yeni modeli ve tokenizer'ı kaydediyoruz
+    merged_model.save_pretrained(merged_model_path)
+    tokenizer = AutoTokenizer.from_pretrained(base_model_name)
+    tokenizer.save_pretrained(merged_model_path)
+
+
+def resolve_model_dir(name):
+    """Yerel klasörü veya Hugging Face önbelleğindeki model kopyasını döndürür"""
+    if Path(name).exists():
+        return Path(name)
+    from huggingface_hub import snapshot_download
+    return Path(snapshot_download(name, allow_patterns=["*.safetensors", *MODEL_SIDE_FILES]))
+
+
+def _pattern_value(module_name, patterns, default):
+    """PEFT rank_pattern / alpha_pattern eşleşmesini uygular"""
+    for key, value in patterns.items():
+        if re.match(rf"(.*\.)?{key}$", module_name):
+            return value
+    return default
+
+
+def read_adapter_config(adapter_dir):
+    """Adaptörün adapter_config.json dosyasını okur"""
+    with open(Path(adapter_dir) / "adapter_config.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_streaming_support(config):
+    """Akışlı birleştirmenin desteklemediği adaptör yapılandırmalarında ValueError fırlatır"""
+    if config.get("use_dora"):
+        raise ValueError("DoRA adaptörleri akışlı birleştirmede desteklenmiyor, --mode peft kullanın")
+
+
+def load_lora_deltas(adapter_dir):
+    """Adaptörü okur; hedef ağırlık adı → (A, B, ölçek) ve tam değiştirilen ağırlıkları döndürür"""
+    from safetensors.torch import load_file
+
+    adapter_dir = Path(adapter_dir)
+    config = read_adapter_config(adapter_dir)
+    check_streaming_support(config)
+    fan_in_fan_out = config.get("fan_in_fan_out", False)
+
+    tensors = load_file(adapter_dir / "adapter_model.safetensors")
+    prefix = "base_model.model."
+    lora, replaced = {}, {}
+    for key, tensor in tensors.items():
+        name = key[len(prefix):] if key.startswith(prefix) else key
+        match = re.match(r"(.+)\.lora_([AB])(?:\.[^.]+)?\.weight$", name)
+        if match:
+            lora.setdefault(match.group(1), {})[match.group(2)] = tensor
+        elif "lora_" not in name:
+            # modules_to_save: katmanın tamamı adaptörde saklanır
+            replaced[re.sub(r"\.modules_to_save(\.[^.]+)?(?=\.[^.]+$)", "", name)] = tensor
+
+    deltas = {}
+    for module_name, pair in lora.items():
+        r = _pattern_value(module_name, config.get("rank_pattern") or {}, config["r"])
+        alpha = _pattern_value(module_name, config.get("alpha_pattern") or {}, config["lora_alpha"])
+        scaling = alpha / math.sqrt(r) if config.get("use_rslora") else alpha / r
+        deltas[f"{module_name}.weight"] = (pair["A"], pair["B"], scaling, fan_in_fan_out)
+    return deltas, replaced
+
+
+def merge_streaming(base_dir, adapter_dir, output_dir):
+    """Temel modeli shard shard okuyup LoRA farklarını (B·A·alpha/r) uygular ve hemen yazar"""
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+
+    base_dir, output_dir = Path(base_dir), Path(output_dir)
+    deltas, replaced = load_lora_deltas(adapter_dir)
+    print(f"Adaptör: {len(deltas)} LoRA katmanı, {len(replaced)} tam değiştirilen ağırlık")
+
+    shards = sorted(base_dir.glob("*.safetensors"))
+    if not shards:
+        raise FileNotFoundError(f"'{base_dir}' klasöründe safetensors dosyası bulunamadı")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    applied = set()
+    for shard in shards:
+        print(f"Shard işleniyor: {shard.name}")
+        tensors = {}
+        with safe_open(shard, framework="pt") as f:
+            metadata = f.metadata() or {}
+            for key in f.keys():
+                weight = f.get_tensor(key)
+                if key in replaced:
+                    weight = replaced[key].to(weight.dtype)
+                    applied.add(key)
+                elif key in deltas:
+                    lora_a, lora_b, scaling, fan_in_fan_out = deltas[key]
+                    delta = (lora_b.float() @ lora_a.float()) * scaling
+                    if fan_in_fan_out:
+                        delta = delta.T
+                    weight = (weight.float() + delta).to(weight.dtype)
+                    applied.add(key)
+                tensors[key] = weight
+        # Bir sonraki shard okunmadan önce yazılır; bellekte en fazla bir shard bulunur
+        save_file(tensors, output_dir / shard.name, metadata={**metadata, "format": "pt"})
+        del tensors
+
+    missing = (set(deltas) | set(replaced)) - applied
+    if missing:
+        raise RuntimeError(f"Adaptördeki {len(missing)} ağırlık temel modelde bulunamadı: {sorted(missing)[:5]}")
+
+    # Yapılandırma, shard dizini ve tokenizer dosyaları olduğu gibi kopyalanır
+    for pattern in MODEL_SIDE_FILES:
+        for path in base_dir.glob(pattern):
+            shutil.copy2(path, output_dir / path.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoRA adaptörünü temel modelle birleştirir")
+    parser.add_argument("--mode", choices=("auto", "streaming", "peft"), default="auto",
+                        help="streaming: shard shard, düşük bellek; peft: tüm model bellekte (merge_and_unload); "
+                             "auto: streaming, adaptör desteklenmiyorsa (ör. DoRA) peft")
+    args = parser.parse_args()
+
+    mode = args.mode
+    if mode != "peft":
+        # Temel model indirilmeden önce adaptörün akışlı birleştirmeye uygunluğu kontrol edilir
+        try:
+            check_streaming_support(read_adapter_config(adapter_path))
+        except ValueError as e:
+            if mode == "streaming":
+                raise SystemExit(f"HATA: {e}")
+            print(f"[WARN] {e}; PEFT ile birleştiriliyor")
+            mode = "peft"
+
+    if mode == "peft":
+        merge_with_peft()
+    else:
+        print(f"Temel model shard shard birleştiriliyor: {base_model_name}")
+        merge_streaming(resolve_model_dir(base_model_name), adapter_path, merged_model_path)
+
+    print("\n✅ Birleştirme tamamlandı!")
+    print(f"Nihai modelin artık '{merged_model_path}' klasöründe kullanıma hazır.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,28 +6,214 @@ Gelişmiş ML analiz modülü:
  - hem anomaly detection hem regression modellerini uygular
  - tüm metrikleri hesaplayıp detaylı bir rapor üretir
  - gereksiz .pkl kaydı yapmaz
+ - (veri seti, model) işlerini isteğe bağlı olarak süreç havuzuna dağıtır;
+   train/test bölmesi ve ölçekleme her veri seti için bir kez yapılıp tüm modellerce paylaşılır
+ - büyük veri modu: LARGE_DATA_ROWS satırın üzerinde anomali modelleri bir alt örnek üzerinde
+   eğitilip tüm kayıt parça parça skorlanır, SVR/SVC çekirdek yaklaşımlı doğrusal modele geçer;
+   yaklaşım kullanılan metrikler "sampled" alanıyla işaretlenir
+ - scikit-learn modülleri ilk kullanımda yüklenir; --help ve veri bulunamayan çalıştırmalar hızlı açılır
 """
 
 import os
 import json
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import IsolationForest, RandomForestRegressor, RandomForestClassifier
-from sklearn.neighbors import LocalOutlierFactor
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.svm import SVR, SVC
-from sklearn.metrics import (
-    r2_score, mean_squared_error, accuracy_score,
-    precision_score, recall_score, f1_score
-)
 from datetime import datetime
 
+import data_cache
+
+# Büyük veri modu: bu satır sayısının üzerinde süper-doğrusal modeller yaklaşımla çalışır
+LARGE_DATA_ROWS = 50_000
+FIT_SAMPLE_SIZE = 20_000   # anomali modellerinin eğitildiği alt örnek boyutu
+SCORE_CHUNK_SIZE = 50_000  # skorlama parça boyutu (bellek sınırı)
+NYSTROEM_COMPONENTS = 300
+
+
+def sk(module, name):
+    """scikit-learn nesnesini ilk kullanımda içe aktarır (ör. sk("svm", "SVR"))"""
+    return getattr(importlib.import_module(f"sklearn.{module}"), name)
+
+
+# Model fabrikaları modül seviyesinde: süreç havuzuna yalnızca model adı gönderilir
+ANOMALY_MODELS = {
+    "IsolationForest": lambda: sk("ensemble", "IsolationForest")(contamination=0.05, random_state=42),
+    "LocalOutlierFactor": lambda: sk("neighbors", "LocalOutlierFactor")(n_neighbors=20, contamination=0.05),
+}
+REGRESSION_MODELS = {
+    "LinearRegression": lambda: sk("linear_model", "LinearRegression")(),
+    "RandomForestRegressor": lambda: sk("ensemble", "RandomForestRegressor")(n_estimators=100, random_state=42),
+    "SVR": lambda: sk("svm", "SVR")(kernel="rbf", C=1.0, gamma="scale"),
+}
+CLASSIFICATION_MODELS = {
+    "LogisticRegression": lambda: sk("linear_model", "LogisticRegression")(max_iter=1000),
+    "RandomForestClassifier": lambda: sk("ensemble", "RandomForestClassifier")(n_estimators=100, random_state=42),
+    "SVM_Classifier": lambda: sk("svm", "SVC")(kernel="rbf", C=1.0, gamma="scale"),
+}
+# Büyük veride kullanılan karşılıklar: RBF çekirdeğinin Nyström yaklaşımı + doğrusal SVM
+LARGE_DATA_MODELS = {
+    "LocalOutlierFactor": lambda: sk("neighbors", "LocalOutlierFactor")(n_neighbors=20, contamination=0.05,
+                                                                        novelty=True),
+    "SVR": lambda: sk("pipeline", "make_pipeline")(
+        sk("kernel_approximation", "Nystroem")(n_components=NYSTROEM_COMPONENTS, random_state=42),
+        sk("svm", "LinearSVR")(C=1.0, max_iter=5000, random_state=42)),
+    "SVM_Classifier": lambda: sk("pipeline", "make_pipeline")(
+        sk("kernel_approximation", "Nystroem")(n_components=NYSTROEM_COMPONENTS, random_state=42),
+        sk("svm", "LinearSVC")(C=1.0, max_iter=5000, random_state=42)),
+}
+
+
+def sample_indices(n, size, seed=42):
+    """n satırdan en fazla size satırlık, zaman sırası korunmuş rastgele alt örnek seçer"""
+    if n <= size:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n, size, replace=False))
+
+
+def score_in_chunks(model, X, score, chunk_size=SCORE_CHUNK_SIZE):
+    """Tüm kaydı parça parça tahmin eder ve skorlar; (tahminler, anomali skorları) döndürür"""
+    preds, scores = [], []
+    for start in range(0, len(X), chunk_size):
+        chunk = X[start:start + chunk_size]
+        preds.append(model.predict(chunk))
+        scores.append(score(model, chunk))
+    return np.concatenate(preds), np.concatenate(scores)
+
+
+def prepare_split(df):
+    """Veri setini bir kez böler ve ölçekler; regresyon ve sınıflandırma aynı bölmeyi kullanır"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    target_col = df.columns[-1]
+    X = df.drop(columns=[target_col])
+    y = df[target_col]
+
+    # Hedef binary değilse, basitleştir
+    y_class = y
+    if len(np.unique(y)) > 5:
+        y_class = (y > np.median(y)).astype(int)
+
+    # Aynı random_state ve satır sayısı → iki modül için de aynı indeksler
+    X_train, X_test, y_train, y_test, y_class_train, y_class_test = train_test_split(
+        X, y, y_class, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    return {
+        "X_train": scaler.fit_transform(X_train),
+        "X_test": scaler.transform(X_test),
+        "y_train": y_train,
+        "y_test": y_test,
+        "y_class_train": y_class_train,
+        "y_class_test": y_class_test,
+    }
+
+
+def run_anomaly_job(dataset_name, name, df):
+    sampled = len(df) > LARGE_DATA_ROWS
+    if sampled:
+        # Alt örnek üzerinde eğit, tüm kaydı parça parça skorla (LOF novelty modunda)
+        model = LARGE_DATA_MODELS.get(name, ANOMALY_MODELS[name])()
+        X = df.to_numpy()
+        model.fit(X[sample_indices(len(X), FIT_SAMPLE_SIZE)])
+        if name == "LocalOutlierFactor":
+            # Tam veri yolundaki -negative_outlier_factor_ ile aynı ölçek
+            preds, scores = score_in_chunks(model, X, lambda m, chunk: -m.score_samples(chunk))
+        else:
+            preds, scores = score_in_chunks(model, X, lambda m, chunk: m.decision_function(chunk))
+    elif name == "LocalOutlierFactor":
+        model = ANOMALY_MODELS[name]()
+        preds = model.fit_predict(df)
+        scores = -model.negative_outlier_factor_
+    else:
+        model = ANOMALY_MODELS[name]()
+        model.fit(df)
+        preds = model.predict(df)
+        scores = model.decision_function(df)
+
+    anomalies = (preds == -1).sum()
+    anomaly_ratio = anomalies / len(df)
+    threshold = np.percentile(scores, 5)
+
+    return {
+        "dataset": dataset_name,
+        "type": "Anomaly Detection",
+        "model": name,
+        "threshold": round(float(threshold), 6),
+        "anomaly_count": int(anomalies),
+        "anomaly_ratio": round(float(anomaly_ratio), 4),
+        "sampled": sampled,
+    }
+
+
+def build_model(name, factories, train_rows):
+    """Modeli üretir; satır sayısı eşiği aşarsa yaklaşık karşılığına geçer"""
+    if train_rows > LARGE_DATA_ROWS and name in LARGE_DATA_MODELS:
+        return LARGE_DATA_MODELS[name](), True
+    return factories[name](), False
+
+
+def run_regression_job(dataset_name, name, split):
+    from sklearn.metrics import r2_score, mean_squared_error
+
+    model, sampled = build_model(name, REGRESSION_MODELS, len(split["X_train"]))
+    model.fit(split["X_train"], split["y_train"])
+    y_pred = model.predict(split["X_test"])
+
+    r2 = r2_score(split["y_test"], y_pred)
+    mse = mean_squared_error(split["y_test"], y_pred)
+
+    return {
+        "dataset": dataset_name,
+        "type": "Regression",
+        "model": name,
+        "R2_Score": round(float(r2), 4),
+        "MSE": round(float(mse), 6),
+        "sampled": sampled,
+    }
+
+
+def run_classification_job(dataset_name, name, split):
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+    model, sampled = build_model(name, CLASSIFICATION_MODELS, len(split["X_train"]))
+    model.fit(split["X_train"], split["y_class_train"])
+    y_pred = model.predict(split["X_test"])
+    y_test = split["y_class_test"]
+
+    acc = accuracy_score(y_test, y_pred)
+    prec = precision_score(y_test, y_pred, zero_division=0)
+    rec = recall_score(y_test, y_pred, zero_division=0)
+    f1 = f1_score(y_test, y_pred, zero_division=0)
+
+    return {
+        "dataset": dataset_name,
+        "type": "Classification",
+        "model": name,
+        "Accuracy": round(float(acc), 4),
+        "Precision": round(float(prec), 4),
+        "Recall": round(float(rec), 4),
+        "F1_Score": round(float(f1), 4),
+        "sampled": sampled,
+    }
+
+
+def run_job(job):
+    """Tek bir (veri seti, model) işini çalıştırır; hata durumunda None döner"""
+    func, dataset_name, name, data = job
+    try:
+        return func(dataset_name, name, data)
+    except Exception as e:
+        print(f"[ERROR] {dataset_name} - {name}: {e}")
+        return None
+
+
 class MLProjectAnalyzer:
-    def __init__(self, data_dir="data", report_dir="reports"):
+    def __init__(self, data_dir="data", report_dir="reports", workers=1):
         self.data_dir = data_dir
         self.report_dir = report_dir
+        self.workers = workers
         os.makedirs(report_dir, exist_ok=True)
         self.results = []
 
@@ -37,7 +223,8 @@ class MLProjectAnalyzer:
         for f in csv_files:
             path = os.path.join(self.data_dir, f)
             try:
-                df = pd.read_csv(path)
+                # Ayrıştırılmış veri önbelleği main.py ile ortaktır
+                df = data_cache.load_scada_frame(path)
                 df = df.select_dtypes(include=[np.number]).dropna()
                 if len(df.columns) >= 2:
                     datasets.append((f, df))
@@ -45,118 +232,31 @@ class MLProjectAnalyzer:
                 print(f"[WARN] {f} okunamadı: {e}")
         return datasets
 
+    def dataset_jobs(self, df, dataset_name):
+        """Veri setinin tüm (model) işlerini, paylaşılan bölme/ölçekleme ile üretir"""
+        jobs = [(run_anomaly_job, dataset_name, name, df) for name in ANOMALY_MODELS]
+        try:
+            split = prepare_split(df)
+        except Exception as e:
+            print(f"[ERROR] {dataset_name} - bölme/ölçekleme hatası: {e}")
+            return jobs
+        jobs += [(run_regression_job, dataset_name, name, split) for name in REGRESSION_MODELS]
+        jobs += [(run_classification_job, dataset_name, name, split) for name in CLASSIFICATION_MODELS]
+        return jobs
+
     def detect_anomalies(self, df, dataset_name):
-        results = []
-        models = {
-            "IsolationForest": IsolationForest(contamination=0.05, random_state=42),
-            "LocalOutlierFactor": LocalOutlierFactor(n_neighbors=20, contamination=0.05)
-        }
+        results = [run_job((run_anomaly_job, dataset_name, name, df)) for name in ANOMALY_MODELS]
+        return [r for r in results if r is not None]
 
-        for name, model in models.items():
-            try:
-                if name == "LocalOutlierFactor":
-                    preds = model.fit_predict(df)
-                    scores = -model.negative_outlier_factor_
-                else:
-                    model.fit(df)
-                    preds = model.predict(df)
-                    scores = model.decision_function(df)
-
-                anomalies = (preds == -1).sum()
-                anomaly_ratio = anomalies / len(df)
-                threshold = np.percentile(scores, 5)
-
-                results.append({
-                    "dataset": dataset_name,
-                    "type": "Anomaly Detection",
-                    "model": name,
-                    "threshold": round(float(threshold), 6),
-                    "anomaly_count": int(anomalies),
-                    "anomaly_ratio": round(float(anomaly_ratio), 4),
-                })
-            except Exception as e:
-                print(f"[ERROR] {dataset_name} - {name} hata: {e}")
-        return results
-
-    def regression_models(self, df, dataset_name):
-        results = []
-        target_col = df.columns[-1]
-        X = df.drop(columns=[target_col])
-        y = df[target_col]
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        scaler = StandardScaler()
-        X_train = scaler.fit_transform(X_train)
-        X_test = scaler.transform(X_test)
-
-        models = {
-            "LinearRegression": LinearRegression(),
-            "RandomForestRegressor": RandomForestRegressor(n_estimators=100, random_state=42),
-            "SVR": SVR(kernel="rbf", C=1.0, gamma="scale")
-        }
-
-        for name, model in models.items():
-            try:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-
-                r2 = r2_score(y_test, y_pred)
-                mse = mean_squared_error(y_test, y_pred)
-
-                results.append({
-                    "dataset": dataset_name,
-                    "type": "Regression",
-                    "model": name,
-                    "R2_Score": round(float(r2), 4),
-                    "MSE": round(float(mse), 6)
-                })
-            except Exception as e:
-                print(f"[ERROR] {dataset_name} - {name}: {e}")
-        return results
-
-    def classification_models(self, df, dataset_name):
-        results = []
-        target_col = df.columns[-1]
-        X = df.drop(columns=[target_col])
-        y = df[target_col]
-
-        # Hedef binary değilse, basitleştir
-        if len(np.unique(y)) > 5:
-            y = (y > np.median(y)).astype(int)
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        scaler = StandardScaler()
-        X_train = scaler.fit_transform(X_train)
-        X_test = scaler.transform(X_test)
-
-        models = {
-            "LogisticRegression": LogisticRegression(max_iter=1000),
-            "RandomForestClassifier": RandomForestClassifier(n_estimators=100, random_state=42),
-            "SVM_Classifier": SVC(kernel="rbf", C=1.0, gamma="scale")
-        }
-
-        for name, model in models.items():
-            try:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-
-                acc = accuracy_score(y_test, y_pred)
-                prec = precision_score(y_test, y_pred, zero_division=0)
-                rec = recall_score(y_test, y_pred, zero_division=0)
-                f1 = f1_score(y_test, y_pred, zero_division=0)
-
-                results.append({
-                    "dataset": dataset_name,
-                    "type": "Classification",
-                    "model": name,
-                    "Accuracy": round(float(acc), 4),
-                    "Precision": round(float(prec), 4),
-                    "Recall": round(float(rec), 4),
-                    "F1_Score": round(float(f1), 4)
-                })
-            except Exception as e:
-                print(f"[ERROR] {dataset_name} - {name}: {e}")
-        return results
+    def regression_models(self, df, dataset_name, split=None):
+        split = split or prepare_split(df)
+        results = [run_job((run_regression_job, dataset_name, name, split)) for name in REGRESSION_MODELS]
+        return [r for r in results if r is not None]
+
+    def classification_models(self, df, dataset_name, split=None):
+        split = split or prepare_split(df)
+        results = [run_job((run_classification_job, dataset_name, name, split)) for name in CLASSIFICATION_MODELS]
+        return [r for r in results if r is not None]
 
     def run(self):
         datasets = self.load_datafiles()
@@ -164,11 +264,21 @@ class MLProjectAnalyzer:
             print("[ERROR] Hiç veri bulunamadı.")
             return
 
+        jobs = []
         for name, df in datasets:
             print(f"\n[INFO] {name} analizi başlatılıyor...")
-            self.results.extend(self.detect_anomalies(df, name))
-            self.results.extend(self.regression_models(df, name))
-            self.results.extend(self.classification_models(df, name))
+            jobs.extend(self.dataset_jobs(df, name))
+
+        if self.workers > 1:
+            # Sonuçlar işlerin verildiği sırayla döner, rapor sırası sıralı modla aynı kalır
+            print(f"[INFO] {len(jobs)} iş {self.workers} süreçte çalıştırılıyor...")
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(run_job, jobs))
+        else:
+            results = [run_job(job) for job in jobs]
+        self.results.extend(r for r in results if r is not None)
+
+        import pandas as pd
 
         df_results = pd.DataFrame(self.results)
 
@@ -189,6 +299,16 @@ class MLProjectAnalyzer:
         print(best_by_dataset.to_string(index=False))
         print(f"\n[INFO] Rapor kaydedildi: {report_path}")
 
-if __name__ == "__main__":
-    analyzer = MLProjectAnalyzer()
+
+def main():
+    parser = argparse.ArgumentParser(description="SCADA ML analizi")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="(veri seti, model) işleri için süreç sayısı (0: çekirdek sayısı)")
+    args = parser.parse_args()
+
+    analyzer = MLProjectAnalyzer(workers=args.workers or os.cpu_count() or 1)
     analyzer.run()
+
+
+if __name__ == "__main__":
+    main()
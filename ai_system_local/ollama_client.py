@@ -0,0 +1,162 @@
+"""
+ollama_client.py
+======================
+Akışlı (streaming) Ollama istemcisi:
+ - tek bir requests.Session üzerinden bağlantı havuzu kullanır (her istekte yeni TCP bağlantısı açılmaz)
+ - /api/generate NDJSON akışını satır satır okur, gelen her token'ı geri çağırıma iletir
+ - ilk token süresi, token/s ve toplam süreyi ölçer
+ - sabit toplam zaman aşımı yerine token'lar arası bekleme süresiyle takılmaları yakalar; ilk parça
+   için (model yükleme + prompt işleme) ayrı, daha uzun bir süre beklenir
+ - isteğe bağlı keep_alive ile modelin istekler arasında bellekte kalmasını sağlar
+"""
+
+import json
+import time
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_CONNECT_TIMEOUT = 10  # saniye
+DEFAULT_FIRST_TOKEN_TIMEOUT = 180  # ilk parçaya kadar (soğuk model yükleme + prompt işleme) beklenecek süre
+DEFAULT_STALL_TIMEOUT = 60  # iki parça arasında beklenecek en uzun süre (saniye)
+DEFAULT_POOL_SIZE = 8
+
+
+class OllamaStallError(Exception):
+    """Akış belirlenen süre boyunca yeni token üretmediğinde fırlatılır"""
+
+
+class OllamaClient:
+    def __init__(self, host, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 first_token_timeout=DEFAULT_FIRST_TOKEN_TIMEOUT, stall_timeout=DEFAULT_STALL_TIMEOUT,
+                 keep_alive=None):
+        self.host = host
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.stall_timeout = stall_timeout
+        self.keep_alive = keep_alive  # ör. "30m"; None ise Ollama varsayılanı (5 dakika)
+        self._session = None
+
+    def __getstate__(self):
+        # Oturum süreçler arasında taşınmaz, gerektiğinde yeniden açılır
+        state = self.__dict__.copy()
+        state['_session'] = None
+        return state
+
+    @property
+    def session(self):
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def _payload(self, payload):
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        return payload
+
+    @staticmethod
+    def _set_read_timeout(response, timeout):
+        """Açık akışın soket okuma zaman aşımını değiştirir; soket erişilemezse mevcut süre kalır"""
+        connection = getattr(response.raw, 'connection', None) or getattr(response.raw, '_connection', None)
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            sock.settimeout(timeout)
+
+    def preload(self, model):
+        """Modeli boş bir istekle belleğe yükler (keep_alive süresince yüklü kalır)"""
+        response = self.session.post(f"{self.host}/api/generate",
+                                     json=self._payload({'model': model, 'stream': False}),
+                                     timeout=(self.connect_timeout, None))
+        response.raise_for_status()
+
+    def generate(self, model, prompt, options, on_token=None):
+        """Prompt'u akışlı olarak üretir, (metin, metrikler) döndürür"""
+        started = time.perf_counter()
+        first_token_at = None
+        last_chunk_at = started
+        pieces = []
+        final = {}
+
+        try:
+            with self.session.post(
+                    f"{self.host}/api/generate",
+                    json=self._payload({
+                        'model': model,
+                        'prompt': prompt,
+                        'stream': True,
+                        'options': options
+                    }),
+                    stream=True,
+                    timeout=(self.connect_timeout, max(self.first_token_timeout, self.stall_timeout))
+            ) as response:
+                response.raise_for_status()
+                receiving = False
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    if not receiving:
+                        # Model yüklendi ve prompt işlendi: bundan sonra parçalar arası süre sınırlanır
+                        receiving = True
+                        self._set_read_timeout(response, self.stall_timeout)
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise RuntimeError(chunk['error'])
+
+                    token = chunk.get('response', '')
+                    if token:
+                        last_chunk_at = time.perf_counter()
+                        if first_token_at is None:
+                            first_token_at = last_chunk_at
+                        pieces.append(token)
+                        if on_token:
+                            on_token(token)
+
+                    if chunk.get('done'):
+                        final = chunk
+                        break
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+            # Akış sırasındaki okuma zaman aşımını iter_lines ConnectionError içine sarar
+            if not isinstance(e, requests.exceptions.ReadTimeout) and \
+                    not (e.args and isinstance(e.args[0], ReadTimeoutError)):
+                raise
+            waited = time.perf_counter() - last_chunk_at
+            if first_token_at is None and not pieces:
+                raise OllamaStallError(
+                    f"Ollama {waited:.0f} saniyede ilk token'ı üretmedi (model yükleme / prompt işleme)") from e
+            raise OllamaStallError(
+                f"Ollama {waited:.0f} saniyedir yeni token üretmiyor ({len(pieces)} token alındı)") from e
+
+        total = time.perf_counter() - started
+        token_count = final.get('eval_count', len(pieces))
+        generation_time = final['eval_duration'] / 1e9 if final.get('eval_duration') else \
+            total - ((first_token_at or started) - started)
+        metrics = {
+            'time_to_first_token': (first_token_at - started) if first_token_at else None,
+            'total_latency': total,
+            'token_count': token_count,
+            'tokens_per_second': token_count / generation_time if generation_time > 0 else 0.0,
+            'prompt_eval_count': final.get('prompt_eval_count'),
+            # Ollama'nın kendi ölçümleri (nanosaniye → saniye)
+            'eval_count': final.get('eval_count'),
+            'eval_duration_s': final['eval_duration'] / 1e9 if final.get('eval_duration') else None,
+            'prompt_eval_duration_s': final['prompt_eval_duration'] / 1e9 if final.get('prompt_eval_duration') else None,
+            'load_duration_s': final['load_duration'] / 1e9 if final.get('load_duration') else None,
+        }
+        return ''.join(pieces), metrics
+
+
+def format_metrics(metrics):
+    """Metrikleri log satırı olarak biçimlendirir"""
+    ttft = metrics['time_to_first_token']
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+    return (f"ilk token: {ttft_text}, {metrics['token_count']} token, "
+            f"{metrics['tokens_per_second']:.1f} token/s, toplam: {metrics['total_latency']:.2f}s")
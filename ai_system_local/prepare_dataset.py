@@ -0,0 +1,164 @@
+"""
+prepare_dataset.py
+======================
+fine_tune.py için önceden tokenize edilmiş, paketlenmiş eğitim verisi önbelleği:
+ - fault_analysis_dataset.jsonl kayıtlarını Llama-3 sohbet biçimine (run_finetuned.py ile aynı) çevirir
+ - tüm örnekleri bir kez tokenize eder ve sabit uzunluklu dizilere paketler
+ - her örneğin position_ids değeri sıfırdan başlar ve bir örneğin ilk tokenı önceki örnekten tahmin edilmez
+ - örnek sınırları dikkatte korunur: flash-attention 2 varsa position_ids ile (transformers
+   >= MIN_TRANSFORMERS_VERSION), yoksa sdpa için blok köşegen 4B dikkat maskesiyle
+ - sonucu dataset_cache/<anahtar>/ altına Arrow (bellek eşlemeli) olarak kaydeder; anahtar veri
+   dosyasının içeriği, tokenizer ve dizi uzunluğundan üretilir, değişmeyen veri yeniden işlenmez
+
+Kullanım:
+    python prepare_dataset.py --seq-len 2048
+"""
+
+import json
+import hashlib
+import argparse
+import importlib.util
+from pathlib import Path
+
+CACHE_DIR = "dataset_cache"
+CACHE_VERSION = 1
+DEFAULT_SEQ_LEN = 2048
+IGNORE_INDEX = -100  # kayıp hesabına girmeyen etiket
+# position_ids ile paketlenmiş örnek sınırlarını flash-attention yolunda dikkate alan ve
+# SFTTrainer(processing_class=...) ile uyumlu en eski sürüm
+MIN_TRANSFORMERS_VERSION = "4.46.0"
+
+
+def format_dataset_entry(entry):
+    """Kaydı modelin eğitildiği Llama-3 sohbet biçimine çevirir"""
+    return f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\n### Talimat:\n{entry['instruction']}\n\n### Veri Özeti:\n{entry['input']}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n{entry['output']}<|eot_id|>"
+
+
+def read_entries(dataset_path):
+    """JSONL veri setini okur"""
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def cache_key(dataset_path, tokenizer, seq_len):
+    """Veri içeriği, tokenizer ve dizi uzunluğundan önbellek anahtarı üretir"""
+    digest = hashlib.sha256()
+    digest.update(Path(dataset_path).read_bytes())
+    digest.update(json.dumps({'version': CACHE_VERSION, 'tokenizer': tokenizer.name_or_path,
+                              'vocab_size': len(tokenizer), 'seq_len': seq_len}).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def pack_examples(token_lists, seq_len, pad_token_id):
+    """Tokenize edilmiş örnekleri sabit uzunluklu dizilere paketler (örnekler bölünmez)"""
+    packed = {'input_ids': [], 'labels': [], 'position_ids': []}
+    current = {'input_ids': [], 'labels': [], 'position_ids': []}
+    truncated = 0
+
+    def flush():
+        padding = seq_len - len(current['input_ids'])
+        packed['input_ids'].append(current['input_ids'] + [pad_token_id] * padding)
+        packed['labels'].append(current['labels'] + [IGNORE_INDEX] * padding)
+        # Dolgu ayrı bir dizi gibi davranır, gerçek örneklere dikkat etmez
+        packed['position_ids'].append(current['position_ids'] + list(range(padding)))
+        for values in current.values():
+            values.clear()
+
+    for ids in token_lists:
+        if len(ids) > seq_len:
+            ids = ids[:seq_len]
+            truncated += 1
+        if len(current['input_ids']) + len(ids) > seq_len:
+            flush()
+        current['input_ids'].extend(ids)
+        # İlk token önceki örnekten tahmin edilmesin
+        current['labels'].extend([IGNORE_INDEX] + ids[1:])
+        current['position_ids'].extend(range(len(ids)))
+    if current['input_ids']:
+        flush()
+    return packed, truncated
+
+
+def build_packed_dataset(dataset_path, tokenizer, seq_len=DEFAULT_SEQ_LEN, cache_dir=CACHE_DIR):
+    """Paketlenmiş veri setini önbellekten döndürür; yoksa bir kez üretip kaydeder"""
+    from datasets import Dataset, load_from_disk
+
+    path = Path(cache_dir) / cache_key(dataset_path, tokenizer, seq_len)
+    if (path / "dataset_info.json").exists():
+        print(f"Paketlenmiş veri seti önbellekten okunuyor: {path}")
+        return load_from_disk(str(path))
+
+    entries = read_entries(dataset_path)
+    texts = [format_dataset_entry(entry) for entry in entries]
+    # Metin <|begin_of_text|> içerdiği için tokenizer ayrıca özel token eklemez
+    token_lists = tokenizer(texts, add_special_tokens=False)['input_ids']
+    packed, truncated = pack_examples(token_lists, seq_len, tokenizer.pad_token_id)
+
+    total_tokens = sum(len(ids) for ids in token_lists)
+    print(f"{len(entries)} örnek, {total_tokens} token → {len(packed['input_ids'])} × {seq_len} dizi "
+          f"(doluluk %{100 * total_tokens / max(1, len(packed['input_ids']) * seq_len):.1f})")
+    if truncated:
+        print(f"[WARN] {truncated} örnek {seq_len} tokendan uzun olduğu için kırpıldı")
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    Dataset.from_dict(packed).save_to_disk(str(tmp_path))
+    tmp_path.rename(path)
+    return load_from_disk(str(path))
+
+
+def check_transformers_version():
+    """Yüklü transformers sürümü paketlenmiş eğitim için yeterli değilse hata fırlatır"""
+    import transformers
+    from packaging.version import Version
+
+    if Version(transformers.__version__) < Version(MIN_TRANSFORMERS_VERSION):
+        raise RuntimeError(f"Paketlenmiş eğitim transformers>={MIN_TRANSFORMERS_VERSION} gerektirir "
+                           f"(yüklü: {transformers.__version__})")
+
+
+def attention_implementation():
+    """flash-attention 2 kuruluysa onu, değilse sdpa'yı döndürür"""
+    return "flash_attention_2" if importlib.util.find_spec("flash_attn") else "sdpa"
+
+
+def packed_collator(features):
+    """Paketlenmiş dizileri yığınlar; flash-attention 2'de örnek sınırlarını position_ids belirtir"""
+    import torch
+
+    return {key: torch.tensor([feature[key] for feature in features], dtype=torch.long)
+            for key in ('input_ids', 'labels', 'position_ids')}
+
+
+def block_diagonal_collator(dtype):
+    """sdpa / eager dikkat için: her örnek yalnızca kendi önceki tokenlarına dikkat eder (4B ek maske)"""
+    import torch
+
+    def collate(features):
+        batch = packed_collator(features)
+        # position_ids sıfıra döndüğünde yeni örnek başlar
+        segments = torch.cumsum(batch['position_ids'] == 0, dim=1)
+        same_example = segments[:, :, None] == segments[:, None, :]
+        causal = torch.ones(same_example.shape[1:], dtype=torch.bool).tril()
+        mask = torch.full(same_example.shape, torch.finfo(dtype).min, dtype=dtype)
+        batch['attention_mask'] = mask.masked_fill(same_example & causal, 0.0)[:, None]
+        return batch
+    return collate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eğitim verisini tokenize edip paketler")
+    parser.add_argument("--dataset", default="fault_analysis_dataset.jsonl", help="JSONL veri seti")
+    parser.add_argument("--model", default="meta-llama/Llama-3.2-3B-Instruct", help="Tokenizer'ın alınacağı model")
+    parser.add_argument("--seq-len", type=int, default=DEFAULT_SEQ_LEN, help="Paketlenmiş dizi uzunluğu")
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    tokenizer.pad_token = tokenizer.eos_token
+    dataset = build_packed_dataset(args.dataset, tokenizer, args.seq_len)
+    print(f"Hazır: {len(dataset)} dizi")
+
+
+if __name__ == "__main__":
+    main()
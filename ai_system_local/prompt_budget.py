@@ -0,0 +1,136 @@
+"""
+prompt_budget.py
+======================
+LLM bağlam penceresi (num_ctx) için token bütçeli prompt oluşturucu:
+ - Llama-3 ön-tokenizasyon kurallarına yakın bir sezgisel ile prompt token sayısını tahmin eder
+ - Ollama'nın döndürdüğü prompt_eval_count ile tahmini düzeltir (yalnızca yukarı yönde); düzeltme
+   katsayısı model başına cache/prompt_calibration.json dosyasında saklanır, sonraki çalıştırmalar
+   kaldığı yerden başlar
+ - veri özeti bölümlerini tanı değerine göre sıralar; bütçe aşılırsa en düşük değerli bölümden
+   başlayarak önce kısaltır, gerekirse çıkarır — Ollama'nın promptu sessizce kesmesini önler
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_RESPONSE_RESERVE = 1024  # yanıt için ayrılan token sayısı
+MAX_CALIBRATION = 2.0
+
+# Harf dizileri, en fazla 3 haneli sayı grupları (Llama-3 sayıları 3'erli böler),
+# noktalama dizileri ve boşluklar
+_PRETOKEN = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]+|_+|\s+")
+
+
+def estimate_tokens(text):
+    """Metnin Llama-3 tokenizer'ındaki yaklaşık token sayısını döndürür"""
+    count = 0
+    for piece in _PRETOKEN.findall(text):
+        first = piece[0]
+        if first.isspace():
+            # Tek boşluk sonraki kelimeye katılır; satır sonları ayrı token olur
+            count += 1 if "\n" in piece else 0
+        elif first.isdigit():
+            count += 1
+        elif first.isalpha():
+            # Türkçe karakterli kelimeler daha fazla parçaya bölünür
+            count += math.ceil(len(piece) / (4.0 if piece.isascii() else 2.5))
+        else:
+            count += math.ceil(len(piece) / 2)
+    return count
+
+
+class PromptBudget:
+    def __init__(self, num_ctx, response_reserve=DEFAULT_RESPONSE_RESERVE, state_path=None, model=None):
+        self.num_ctx = num_ctx
+        self.response_reserve = response_reserve
+        self.state_path = Path(state_path) if state_path else None
+        self.model = model
+        self._lock = threading.Lock()
+        self.calibration = self._load()
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        """Modelin kayıtlı düzeltme katsayısını okur; yoksa 1.0"""
+        if self.state_path is None:
+            return 1.0
+        try:
+            return min(MAX_CALIBRATION, max(1.0, float(self._read_state().get(self.model, 1.0))))
+        except (TypeError, ValueError):
+            return 1.0
+
+    def _save(self):
+        """Düzeltme katsayısını (diğer modellerinkini koruyarak) diske yazar"""
+        state = self._read_state()
+        state[self.model] = self.calibration
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def count(self, text):
+        """Prompt token sayısını (düzeltme katsayısıyla) tahmin eder"""
+        return math.ceil(estimate_tokens(text) * self.calibration)
+
+    def observe(self, estimated, actual):
+        """Gerçek prompt_eval_count tahmini aşıyorsa düzeltme katsayısını büyütür"""
+        if not estimated or not actual or actual <= estimated:
+            return
+        # Ollama önbellekten gelen tokenları saymayabilir; katsayı yalnızca büyür
+        with self._lock:
+            self.calibration = min(MAX_CALIBRATION, self.calibration * actual / estimated)
+            if self.state_path is not None:
+                try:
+                    self._save()
+                except OSError as e:
+                    logger.warning(f"Token düzeltme katsayısı kaydedilemedi: {str(e)}")
+        logger.info(f"Token tahmini düzeltildi: katsayı {self.calibration:.2f}")
+
+    def fit(self, template, sections, placeholder="{data_summary}"):
+        """Bölümleri bütçeye sığacak şekilde (gerekirse kısaltarak) birleştirir.
+
+        Her bölüm {'name', 'priority', 'variants'} sözlüğüdür; variants tam metinden en kısa
+        metne doğru sıralıdır, priority küçüldükçe tanı değeri artar.
+        """
+        budget = self.num_ctx - self.response_reserve - self.count(template.replace(placeholder, ""))
+        levels = [0] * len(sections)
+
+        def render():
+            return "".join(section['variants'][level] for section, level in zip(sections, levels))
+
+        text = render()
+        for i in sorted(range(len(sections)), key=lambda i: -sections[i]['priority']):
+            while self.count(text) > budget and levels[i] < len(sections[i]['variants']) - 1:
+                levels[i] += 1
+                text = render()
+
+        shortened = [section['name'] for section, level in zip(sections, levels) if level]
+        if shortened:
+            logger.info(f"Veri özeti bağlam bütçesine sığdırıldı ({budget} token): "
+                        f"kısaltılan bölümler: {', '.join(shortened)}")
+        if self.count(text) > budget:
+            logger.warning(f"Veri özeti kısaltmaya rağmen bütçeyi aşıyor: ~{self.count(text)} > {budget} token")
+        return text
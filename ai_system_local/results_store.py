@@ -0,0 +1,385 @@
+"""
+results_store.py
+======================
+Analiz sonuçları için gömülü, indeksli sonuç deposu (SQLite, results.db):
+ - her rapor için yapılandırılmış özet (summary), sinyal aralıkları, kritik olaylar, LLM metni,
+   model / prompt sürümü ve LLM adımı ölçümlerini saklar
+ - kayıt adı, sinyal, analiz zamanı ve önem derecesi üzerinde indeksler: "geçen ay hangi kayıtlarda
+   67-N1 TRIP vardı" sorusu TXT dosyalarını taramadan milisaniyeler içinde yanıtlanır
+ - mevcut output/ ve new_output/ klasörlerindeki TXT raporları toplu olarak içe aktarır; kaynak kayıt
+   data/ altında duruyorsa özet yeniden hesaplanır, model/prompt bilgisi manifest.json'dan alınır
+
+Kullanım:
+    python results_store.py import output new_output
+    python results_store.py query --signal "67-N1 TRIP" --since 2025-07-01
+    python results_store.py query --min-severity critical
+"""
+
+import re
+import json
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import manifest
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+SCHEMA_VERSION = 1
+SQLITE_TIMEOUT = 30  # saniye; toplu analizde aynı anda yazan iş parçacıkları beklesin
+SEVERITY_LEVELS = ('normal', 'pickup', 'critical', 'trip')
+DEFAULT_QUERY_LIMIT = 100
+
+# Eski raporlarda saniye, yenilerde milisaniye ve (aynı milisaniyedeki raporlar için) sayaç bulunur
+REPORT_NAME_PATTERN = re.compile(
+    r"^analysis_(?P<recording>.+)_(?P<timestamp>\d{8}_\d{6})(?:_\d{3})?(?:_\d+)?$")
+REPORT_DATE_PATTERN = re.compile(r"^## Tarih: (?P<date>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})$", re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    recording TEXT NOT NULL,
+    source_path TEXT,
+    content_hash TEXT,
+    output_path TEXT NOT NULL UNIQUE,
+    created TEXT NOT NULL,
+    model TEXT,
+    prompt_version TEXT,
+    severity INTEGER,
+    total_records INTEGER,
+    time_range TEXT,
+    critical_event_count INTEGER,
+    summary_json TEXT,
+    data_summary TEXT,
+    llm_text TEXT,
+    timings_json TEXT
+);
+CREATE TABLE IF NOT EXISTS signal_events (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    signal TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    duration_ms REAL,
+    samples INTEGER,
+    ongoing INTEGER
+);
+CREATE TABLE IF NOT EXISTS critical_events (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    start_time REAL,
+    end_time REAL,
+    duration_ms REAL,
+    IL1 REAL,
+    IL2 REAL,
+    IL3 REAL,
+    Io REAL,
+    I0 REAL,
+    I1 REAL,
+    I2 REAL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_recording ON analyses(recording, created);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created);
+CREATE INDEX IF NOT EXISTS idx_analyses_severity ON analyses(severity, created);
+CREATE INDEX IF NOT EXISTS idx_signal_events_signal ON signal_events(signal, kind, analysis_id);
+CREATE INDEX IF NOT EXISTS idx_signal_events_analysis ON signal_events(analysis_id);
+CREATE INDEX IF NOT EXISTS idx_critical_events_analysis ON critical_events(analysis_id);
+CREATE INDEX IF NOT EXISTS idx_critical_events_start ON critical_events(start_time);
+"""
+
+
+def severity(summary):
+    """Özetin önem derecesini döndürür: 0 normal, 1 PICK UP, 2 kritik olay, 3 TRIP"""
+    if summary is None:
+        return None
+    if summary['trip_events'] or any(iv['kind'] == 'trip' for iv in summary.get('signal_intervals', [])):
+        return 3
+    if summary['critical_events']:
+        return 2
+    if summary['pickup_events'] or any(iv['kind'] == 'pickup' for iv in summary.get('signal_intervals', [])):
+        return 1
+    return 0
+
+
+def severity_level(name_or_level):
+    """'trip' gibi bir adı veya sayıyı önem derecesi sayısına çevirir"""
+    if isinstance(name_or_level, str) and not name_or_level.isdigit():
+        return SEVERITY_LEVELS.index(name_or_level.lower())
+    return int(name_or_level)
+
+
+def _signal_groups(signal):
+    """'67-N1 TRIP' → [['67', 'N1'], ['TRIP']]: kelime içindeki parçalar sütun adında bitişik olmalı"""
+    groups = [[token for token in re.split(r"[_()\-]+", word) if token] for word in signal.split()]
+    return [group for group in groups if group]
+
+
+def signal_pattern(signal):
+    """'67-N1 TRIP' gibi bir ifadeyi LIKE ön süzgecine çevirir (ESCAPE '\\'): '%67\\_N1%TRIP%'"""
+    def escape(token):
+        return token.replace('\\', '\\\\').replace('%', '\\%')
+    return "%" + "%".join("\\_".join(escape(token) for token in group) for group in _signal_groups(signal)) + "%"
+
+
+def signal_matches(name, signal):
+    """Sütun adının, ifadenin parçalarını sırayla ve tam parça olarak içerip içermediğini döndürür
+
+    LIKE parça sınırlarını bilmez: '67-1 TRIP' deseni 67_10_..._TRIP adıyla da eşleşir.
+    """
+    tokens = name.upper().split('_')
+    position = 0
+    for group in _signal_groups(signal.upper()):
+        for start in range(position, len(tokens) - len(group) + 1):
+            if tokens[start:start + len(group)] == group:
+                position = start + len(group)
+                break
+        else:
+            return False
+    return True
+
+
+def parse_report(report_path):
+    """TXT raporun adından kayıt adını, başlığından tarihini ve LLM metnini çıkarır"""
+    report_path = Path(report_path)
+    match = REPORT_NAME_PATTERN.match(report_path.stem)
+    if not match:
+        return None
+    text = report_path.read_text(encoding='utf-8')
+    date = REPORT_DATE_PATTERN.search(text)
+    if date:
+        created = datetime.strptime(date.group('date'), '%Y-%m-%d %H:%M:%S')
+        text = text[date.end():].lstrip("\n")
+    else:
+        created = datetime.strptime(match.group('timestamp'), '%Y%m%d_%H%M%S')
+    return {'recording': match.group('recording'), 'created': created.isoformat(timespec='seconds'),
+            'llm_text': text}
+
+
+class ResultsStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        """İşlem (transaction) içinde bir bağlantı açar; çıkışta kaydeder ve kapatır"""
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_TIMEOUT)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            if not self._initialized:
+                self._init_schema(conn)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self, conn):
+        # WAL: rapor yazılırken panodan gelen okumalar beklemez
+        conn.execute("PRAGMA journal_mode = WAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"Desteklenmeyen sonuç deposu şeması: {version} ({self.db_path})")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._initialized = True
+
+    def record(self, recording, output_path, llm_text, summary=None, data_summary=None, source_path=None,
+               content_hash=None, model=None, prompt_version=None, timings=None, created=None):
+        """Bir analizi (aynı rapor yolu varsa üzerine yazarak) depoya ekler, analiz kimliğini döndürür"""
+        summary_json = json.dumps(summary, ensure_ascii=False) if summary is not None else None
+        row = (recording, str(source_path) if source_path else None, content_hash, str(output_path),
+               created or datetime.now().isoformat(timespec='seconds'), model, prompt_version, severity(summary),
+               summary['total_records'] if summary else None, summary['time_range'] if summary else None,
+               len(summary['critical_events']) if summary else None, summary_json, data_summary, llm_text,
+               json.dumps(timings, ensure_ascii=False) if timings is not None else None)
+
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM analyses WHERE output_path = ?", (str(output_path),))
+            analysis_id = conn.execute(
+                "INSERT INTO analyses (recording, source_path, content_hash, output_path, created, model, "
+                "prompt_version, severity, total_records, time_range, critical_event_count, summary_json, "
+                "data_summary, llm_text, timings_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row).lastrowid
+            if summary is not None:
+                conn.executemany(
+                    "INSERT INTO signal_events (analysis_id, signal, kind, start_time, end_time, duration_ms, "
+                    "samples, ongoing) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(analysis_id, iv['signal'], iv['kind'], iv['start'], iv['end'], iv['duration_ms'],
+                      iv['samples'], int(iv['ongoing'])) for iv in summary.get('signal_intervals', [])])
+                conn.executemany(
+                    "INSERT INTO critical_events (analysis_id, start_time, end_time, duration_ms, "
+                    "IL1, IL2, IL3, Io, I0, I1, I2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(analysis_id, event['time'], event.get('end'), event.get('duration_ms'), event['IL1'],
+                      event['IL2'], event['IL3'], event['Io'], event.get('I0'), event.get('I1'), event.get('I2'))
+                     for event in summary['critical_events']])
+        return analysis_id
+
+    def known_reports(self):
+        """Depodaki rapor yollarını döndürür"""
+        with self._connection() as conn:
+            return {row[0] for row in conn.execute("SELECT output_path FROM analyses")}
+
+    def import_reports(self, output_dirs, sources=None, summarize=None):
+        """Klasörlerdeki TXT raporları içe aktarır; içe aktarılan rapor sayısını döndürür.
+
+        sources kayıt adından kaynak dosyaya eşleme, summarize ise kaynak dosyadan
+        (summary, data_summary) üreten çağrıdır; verilmezse yalnızca metin saklanır.
+        """
+        sources = sources or {}
+        known = self.known_reports()
+        imported = 0
+        for output_dir in map(Path, output_dirs):
+            manifest_path = output_dir / "manifest.json"
+            entries = manifest.BatchManifest(manifest_path).entries if manifest_path.exists() else {}
+            by_report = {entry['output_path']: (key, entry) for key, entry in entries.items()}
+
+            for report_path in sorted(output_dir.resolve().glob("analysis_*.txt")):
+                if str(report_path) in known:
+                    continue
+                report = parse_report(report_path)
+                if report is None:
+                    continue
+                source_key, entry = by_report.get(str(report_path), (None, {}))
+                source_path = source_key or sources.get(report['recording'])
+
+                summary = data_summary = None
+                if summarize and source_path and Path(source_path).exists():
+                    try:
+                        summary, data_summary = summarize(source_path)
+                    except Exception as e:
+                        logger.warning(f"Özet yeniden hesaplanamadı: {source_path}: {str(e)}")
+
+                self.record(report['recording'], report_path, report['llm_text'], summary=summary,
+                            data_summary=data_summary, source_path=source_path,
+                            content_hash=entry.get('content_hash'), model=entry.get('model'),
+                            prompt_version=entry.get('prompt_version'), created=report['created'])
+                imported += 1
+        logger.info(f"Sonuç deposuna {imported} rapor aktarıldı: {self.db_path}")
+        return imported
+
+    def find_signal(self, signal, kind=None, since=None, until=None, limit=DEFAULT_QUERY_LIMIT):
+        """Sinyalin ('67-N1 TRIP' gibi) aktif olduğu kayıtları, en yeni analiz önce, döndürür"""
+        with self._connection() as conn:
+            # Önce eşleşen sinyal adları (indeks taraması + parça sınırı kontrolü), sonra indeksli eşitlik sorgusu
+            signals = [row[0] for row in conn.execute(
+                "SELECT DISTINCT signal FROM signal_events WHERE signal LIKE ? ESCAPE '\\'",
+                (signal_pattern(signal),)) if signal_matches(row[0], signal)]
+            if not signals:
+                return []
+            query = (f"SELECT a.id, a.recording, a.created, a.output_path, a.severity, e.signal, e.kind, "
+                     f"MIN(e.start_time) AS first_start, MAX(e.duration_ms) AS max_duration_ms, COUNT(*) AS intervals "
+                     f"FROM signal_events e JOIN analyses a ON a.id = e.analysis_id "
+                     f"WHERE e.signal IN ({', '.join('?' * len(signals))})")
+            params = list(signals)
+            if kind:
+                query += " AND e.kind = ?"
+                params.append(kind)
+            query, params = self._time_filter(query, params, since, until)
+            query += " GROUP BY a.id, e.signal ORDER BY a.created DESC LIMIT ?"
+            return [dict(row) for row in conn.execute(query, params + [limit])]
+
+    def list_analyses(self, recording=None, since=None, until=None, min_severity=None, limit=DEFAULT_QUERY_LIMIT):
+        """Analizleri (özet alanları, metin hariç) en yeni önce listeler"""
+        query = ("SELECT id, recording, created, output_path, model, prompt_version, severity, total_records, "
+                 "time_range, critical_event_count FROM analyses WHERE 1 = 1")
+        params = []
+        if recording:
+            query += " AND recording = ?"
+            params.append(recording)
+        if min_severity is not None:
+            query += " AND severity >= ?"
+            params.append(severity_level(min_severity))
+        query, params = self._time_filter(query, params, since, until, column="created")
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(query, params + [limit])]
+
+    def get_analysis(self, analysis_id):
+        """Tek bir analizi özet, olaylar ve LLM metniyle birlikte döndürür"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+            if row is None:
+                return None
+            analysis = dict(row)
+            analysis['summary'] = json.loads(analysis.pop('summary_json') or 'null')
+            analysis['timings'] = json.loads(analysis.pop('timings_json') or 'null')
+            analysis['critical_events'] = [dict(event) for event in conn.execute(
+                "SELECT * FROM critical_events WHERE analysis_id = ? ORDER BY start_time", (analysis_id,))]
+        return analysis
+
+    @staticmethod
+    def _time_filter(query, params, since, until, column="a.created"):
+        if since:
+            query += f" AND {column} >= ?"
+            params.append(str(since))
+        if until:
+            query += f" AND {column} < ?"
+            params.append(str(until))
+        return query, params
+
+
+def _print_rows(rows):
+    for row in rows:
+        if row.get('severity') is not None:
+            row['severity'] = SEVERITY_LEVELS[row['severity']]
+        print(json.dumps(row, ensure_ascii=False))
+    print(f"({len(rows)} sonuç)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SCADA analiz sonuç deposu")
+    parser.add_argument("--db", default="results.db", help="SQLite veritabanı yolu")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Mevcut TXT raporları depoya aktar")
+    import_parser.add_argument("output_dirs", nargs="*", default=["output", "new_output"],
+                               help="Raporların bulunduğu klasörler")
+    import_parser.add_argument("--no-summary", action="store_true",
+                               help="Kaynak kayıtlardan özeti yeniden hesaplama (yalnızca metni aktar)")
+
+    query_parser = commands.add_parser("query", help="Depoyu sorgula")
+    query_parser.add_argument("--signal", help="Sinyal adı, ör. '67-N1 TRIP'")
+    query_parser.add_argument("--kind", choices=["pickup", "trip", "breaker"], help="Sinyal türü")
+    query_parser.add_argument("--recording", help="Kayıt adı (uzantısız)")
+    query_parser.add_argument("--min-severity", help=f"En düşük önem: {', '.join(SEVERITY_LEVELS)}")
+    query_parser.add_argument("--since", help="Bu tarihten (YYYY-AA-GG) sonraki analizler")
+    query_parser.add_argument("--until", help="Bu tarihten önceki analizler")
+    query_parser.add_argument("--limit", type=int, default=DEFAULT_QUERY_LIMIT)
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == "import":
+        summarize, sources = None, {}
+        if not args.no_summary:
+            from main import SCADAFaultAnalyzer, setup_logging
+            setup_logging()
+            analyzer = SCADAFaultAnalyzer()
+            summarize = analyzer.build_summary
+            sources = {path.stem: path for path in
+                       list(analyzer.data_dir.glob("*.csv")) + list(analyzer.data_dir.glob("*.cfg"))}
+        store.import_reports([d for d in args.output_dirs if Path(d).is_dir()], sources, summarize)
+    elif args.signal:
+        _print_rows(store.find_signal(args.signal, kind=args.kind, since=args.since, until=args.until,
+                                      limit=args.limit))
+    else:
+        _print_rows(store.list_analyses(recording=args.recording, since=args.since, until=args.until,
+                                        min_severity=args.min_severity, limit=args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,90 @@
-import torch
-import pandas as pd
+import os
+import copy
+import time
+import argparse
 import datetime
 import logging
 from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-
-# --- Logging Ayarları ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s (Local Model) - %(message)s',
-    handlers=[
-        logging.FileHandler("local_model_analysis.log"),
-        logging.StreamHandler()
-    ]
-)
+
+import data_cache
+from instrumentation import peak_rss_mb
+
 logger = logging.getLogger("Local_Model_Analyzer")
 
+DEFAULT_BATCH_SIZE = 4
+MAX_NEW_TOKENS = 1024
+
+# GPU'suz sunucular için int8 dinamik nicemlenmiş CPU arka ucu
+BACKENDS = ("auto", "cpu-int8")
+QUANTIZED_SUFFIX = "-int8-cpu"
+# Yalnızca tensörler (state_dict) saklanır: weights_only=True ile güvenle ve sürümler arası yüklenir
+QUANTIZED_MODEL_FILE = "model_int8_state.pt"
+
+
+def setup_logging():
+    """Logging ayarları; içe aktarmada değil giriş noktasında çağrılır"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s (Local Model) - %(message)s',
+        handlers=[
+            logging.FileHandler("local_model_analysis.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def quantized_model_path(model_path):
+    """Birleştirilmiş modelin nicemlenmiş kopyasının klasörünü döndürür"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.name + QUANTIZED_SUFFIX)
+
+
+def _replace_linears(module, convert):
+    """Tüm nn.Linear katmanlarını tek tek convert(katman) sonucuyla değiştirir"""
+    import torch
+
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear):
+            setattr(module, name, convert(child))
+        else:
+            _replace_linears(child, convert)
+
+
+def convert_to_int8(model_path, output_path=None):
+    """Birleştirilmiş modeli bir kez CPU için int8 (dinamik nicemleme) biçimine dönüştürür"""
+    output_path = Path(output_path or quantized_model_path(model_path))
+    if not Path(model_path).exists():
+        raise FileNotFoundError(
+            f"Model klasörü bulunamadı: '{model_path}'. Lütfen merge_model.py'yi çalıştırdığınızdan emin olun.")
+    # torch / transformers yalnızca model klasörü doğrulandıktan sonra yüklenir (birkaç saniye sürer)
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    logger.info(f"'{model_path}' int8 CPU biçimine dönüştürülüyor (tek seferlik)...")
+    # Model bfloat16 yüklenir; dinamik nicemlemenin istediği fp32'ye yalnızca sırası gelen Linear katmanı
+    # çevrilir, böylece tüm modelin fp32 kopyası (3B için ~12 GB) hiç oluşmaz
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.bfloat16, low_cpu_mem_usage=True)
+    model.eval()
+    _replace_linears(model, lambda linear: torch.ao.quantization.quantize_dynamic(
+        torch.nn.Sequential(linear.float()), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)[0])
+    # Nicemlenmiş Linear çıktısı fp32'dir; kalan katmanlar (gömme, normalizasyon) da fp32 olmalı
+    model.float()
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    state = model.state_dict()
+    # Kalıcı olmayan tamponlar (ör. rotary inv_freq) state_dict'e girmez; yüklemede iskelet
+    # meta cihazda kurulduğu için ayrıca saklanır
+    buffers = {name: buffer for name, buffer in model.named_buffers() if name not in state}
+    torch.save({'state_dict': state, 'buffers': buffers}, output_path / QUANTIZED_MODEL_FILE)
+    model.config.save_pretrained(output_path)
+    model.generation_config.save_pretrained(output_path)
+    AutoTokenizer.from_pretrained(model_path).save_pretrained(output_path)
+    logger.info(f"Nicemlenmiş model kaydedildi: {output_path}")
+    return output_path
+
 
 class LocalAnalyzer:
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend="auto", threads=None):
         self.base_dir = Path.cwd()
         self.prompts_dir = self.base_dir / "prompts"
         self.data_dir = self.base_dir / "data"
@@ -28,25 +94,61 @@ class LocalAnalyzer:
         self.fault_analysis_prompt = self._load_prompt("fault_analysis_prompt.txt")
 
         # --- Model ve Tokenizer'ı Doğrudan Yükleme ---
-        logger.info(f"Uzman model '{model_path}' klasöründen yükleniyor...")
-        if not Path(model_path).exists():
-            raise FileNotFoundError(
-                f"Model klasörü bulunamadı: '{model_path}'. Lütfen merge_model.py'yi çalıştırdığınızdan emin olun.")
+        self.backend = backend
+        if backend == "cpu-int8":
+            self.model = self._load_int8(model_path, threads)
+            model_path = quantized_model_path(model_path)
+        else:
+            logger.info(f"Uzman model '{model_path}' klasöründen yükleniyor...")
+            if not Path(model_path).exists():
+                raise FileNotFoundError(
+                    f"Model klasörü bulunamadı: '{model_path}'. Lütfen merge_model.py'yi çalıştırdığınızdan emin olun.")
+            import torch
+            from transformers import AutoModelForCausalLM
 
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                torch_dtype=torch.bfloat16,
+                device_map="auto",  # Modeli otomatik olarak GPU'ya yükle
+            )
+        self.model.eval()
+
+        from transformers import AutoTokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            torch_dtype=torch.bfloat16,
-            device_map="auto",  # Modeli otomatik olarak GPU'ya yükle
-        )
-
-        # Metin üretimi için bir pipeline oluşturuyoruz
-        self.pipe = pipeline(
-            "text-generation",
-            model=self.model,
-            tokenizer=self.tokenizer,
-        )
-        logger.info("Uzman model başarıyla yüklendi ve kullanıma hazır.")
+        # Toplu üretimde istemler sola hizalanır; yeni tokenlar hepsinde aynı konumdan başlar
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        # Tüm kayıtlarda ortak olan talimat önekinin KV önbelleği bir kez hesaplanır
+        self.prefix_ids, self.prefix_cache = self._build_prefix_cache()
+        logger.info(f"Uzman model başarıyla yüklendi ve kullanıma hazır (önek: {self.prefix_ids.shape[1]} token).")
+
+    def _load_int8(self, model_path, threads):
+        """int8 CPU modelini yükler; gerekirse önce tek seferlik dönüşümü yapar"""
+        quantized_path = quantized_model_path(model_path)
+        if not (quantized_path / QUANTIZED_MODEL_FILE).exists():
+            convert_to_int8(model_path, quantized_path)
+        import torch
+        from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+        torch.set_num_threads(threads or os.cpu_count() or 1)
+        logger.info(f"int8 CPU modeli '{quantized_path}' klasöründen yükleniyor ({torch.get_num_threads()} iş parçacığı)...")
+        checkpoint = torch.load(quantized_path / QUANTIZED_MODEL_FILE, map_location="cpu", weights_only=True)
+
+        # İskelet bellek ayırmadan (meta) kurulur, Linear katmanları boş int8 katmanlarla değiştirilir;
+        # ağırlıklar state_dict'ten atanır
+        config = AutoConfig.from_pretrained(quantized_path)
+        with torch.device("meta"):
+            model = AutoModelForCausalLM.from_config(config, torch_dtype=torch.float32)
+        _replace_linears(model, lambda linear: torch.ao.nn.quantized.dynamic.Linear(
+            linear.in_features, linear.out_features, bias_=linear.bias is not None, dtype=torch.qint8))
+        model.load_state_dict(checkpoint['state_dict'], assign=True)
+        for name, buffer in checkpoint['buffers'].items():
+            module_name, _, buffer_name = name.rpartition('.')
+            model.get_submodule(module_name).register_buffer(buffer_name, buffer, persistent=False)
+        model.generation_config = GenerationConfig.from_pretrained(quantized_path)
+        return model
 
     def _load_prompt(self, prompt_name):
         prompt_path = self.prompts_dir / prompt_name
@@ -56,12 +158,8 @@ class LocalAnalyzer:
             return f.read()
 
     def load_scada_data(self, file_path):
-        df = pd.read_csv(file_path)
-        df.columns = [col.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_') for col in df.columns]
-        if 'time' in df.columns:
-            df['time'] = pd.to_numeric(df['time'], errors='coerce')
-            df = df.sort_values('time')
-        return df
+        # main.py ile aynı ayrıştırılmış veri önbelleğini kullanır
+        return data_cache.load_scada_frame(file_path)
 
     def generate_data_summary(self, df):
         # Bu fonksiyon main.py'deki ile aynı
@@ -74,36 +172,94 @@ class LocalAnalyzer:
         # ... (Daha detaylı özet eklenebilir) ...
         return summary_text
 
-    def analyze(self, data_summary):
-        logger.info(f"Yerel model ile analiz başlatılıyor...")
-
+    def _prompt_prefix(self):
         # Prompt'u, modeli eğittiğimiz formatla %100 aynı yapıyoruz.
         prompt_start = self.fault_analysis_prompt.split('### Veri Özeti')[0].strip()
-        full_prompt = f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\n### Talimat:\n{prompt_start}\n\n### Veri Özeti:\n{data_summary}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
+        return f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\n### Talimat:\n{prompt_start}\n\n### Veri Özeti:\n"
 
-        # Pipeline'ı kullanarak metin üretiyoruz
-        outputs = self.pipe(
-            full_prompt,
-            max_new_tokens=1024,  # Ne kadar uzun bir cevap istediğimiz
-            do_sample=False,  # Daha deterministik sonuçlar için
-            temperature=0.1,
-            top_p=0.9,
-            eos_token_id=self.tokenizer.eos_token_id
-        )
+    def _prompt_suffix(self, data_summary):
+        return f"{data_summary}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
 
-        # Pipeline'ın çıktısından sadece üretilen yeni metni alıyoruz
-        generated_text = outputs[0]['generated_text']
-        # Prompt'u sonuçtan çıkarıp sadece modelin cevabını döndürüyoruz
-        response = generated_text.split("<|end_header_id|>\n\n")[-1]
+    def _build_prefix_cache(self):
+        """Ortak talimat önekini bir kez kodlar ve KV önbelleğini döndürür"""
+        import torch
+        from transformers import DynamicCache
 
-        return response.strip()
+        prefix_ids = self.tokenizer(self._prompt_prefix(), return_tensors="pt",
+                                    add_special_tokens=False).input_ids.to(self.model.device)
+        with torch.inference_mode():
+            cache = self.model(prefix_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+        return prefix_ids, cache
+
+    def analyze_batch(self, data_summaries, batch_size=DEFAULT_BATCH_SIZE, max_new_tokens=MAX_NEW_TOKENS):
+        """Birden çok veri özetini toplu olarak analiz eder; yanıtları giriş sırasıyla döndürür"""
+        import torch
+
+        responses = []
+        for start in range(0, len(data_summaries), batch_size):
+            batch = data_summaries[start:start + batch_size]
+            logger.info(f"Yerel model ile toplu analiz: {start + 1}-{start + len(batch)} / {len(data_summaries)}")
+
+            # Yalnızca kayda özgü '### Veri Özeti' kısmı kodlanır; önek önbellekten gelir
+            suffix = self.tokenizer([self._prompt_suffix(s) for s in batch], return_tensors="pt",
+                                    padding=True, add_special_tokens=False).to(self.model.device)
+            input_ids = torch.cat([self.prefix_ids.expand(len(batch), -1), suffix.input_ids], dim=1)
+            # Dolgu tokenları önek ile özet arasında kalır ve maskelenir
+            attention_mask = torch.cat([torch.ones_like(self.prefix_ids).expand(len(batch), -1),
+                                        suffix.attention_mask], dim=1)
+
+            # generate önbelleği yerinde büyüttüğü için her toplu çağrı kendi kopyasını alır
+            cache = copy.deepcopy(self.prefix_cache)
+            cache.batch_repeat_interleave(len(batch))
+
+            started = time.perf_counter()
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    past_key_values=cache,
+                    max_new_tokens=max_new_tokens,  # Ne kadar uzun bir cevap istediğimiz
+                    do_sample=False,  # Daha deterministik sonuçlar için
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                )
+
+            # Prompt'u sonuçtan çıkarıp sadece modelin cevabını döndürüyoruz
+            generated = outputs[:, input_ids.shape[1]:]
+            elapsed = time.perf_counter() - started
+            token_count = int((generated != self.tokenizer.pad_token_id).sum())
+            logger.info(f"Üretim ({self.backend}): {token_count} token, {elapsed:.1f}s, "
+                        f"{token_count / elapsed:.2f} token/s, tepe RSS {peak_rss_mb()} MB")
+            responses.extend(text.strip() for text in
+                             self.tokenizer.batch_decode(generated, skip_special_tokens=True))
+        return responses
+
+    def analyze(self, data_summary):
+        logger.info(f"Yerel model ile analiz başlatılıyor...")
+        return self.analyze_batch([data_summary], batch_size=1)[0]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Yerel finetuned model ile SCADA analizi")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Aynı anda üretilecek kayıt sayısı")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="auto: bfloat16, device_map=auto; cpu-int8: GPU'suz sunucular için nicemlenmiş model")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="cpu-int8 arka ucu için iş parçacığı sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--convert", action="store_true",
+                        help="Yalnızca int8 CPU dönüşümünü yap ve çık")
+    args = parser.parse_args()
+    setup_logging()
+
     # Eğitilmiş ve birleştirilmiş modelimizin bulunduğu klasörün yolu
     finetuned_model_path = "./enerjisa-scada-analyzer-v1-merged"
 
-    analyzer = LocalAnalyzer(finetuned_model_path)
+    if args.convert:
+        convert_to_int8(finetuned_model_path)
+        return
+
+    analyzer = LocalAnalyzer(finetuned_model_path, backend=args.backend, threads=args.threads)
 
     csv_files = list(analyzer.data_dir.glob("*.csv"))
     if not csv_files:
@@ -112,13 +268,27 @@ def main():
 
     logger.info(f"Yerel uzman model ile {len(csv_files)} adet dosya analiz edilecek.")
 
+    # Önce tüm özetler hazırlanır, ardından model kayıtları toplu olarak işler
+    prepared = []
     for csv_file in csv_files:
         try:
             logger.info(f"İşleniyor: {csv_file.name}")
             df = analyzer.load_scada_data(csv_file)
-            data_summary = analyzer.generate_data_summary(df)
-            results = analyzer.analyze(data_summary)
+            prepared.append((csv_file, analyzer.generate_data_summary(df)))
+        except Exception as e:
+            logger.error(f"{csv_file.name} işlenirken bir hata oluştu: {e}")
+            print(f"\n❌ HATA: {csv_file.name} işlenemedi.")
 
+    for start in range(0, len(prepared), args.batch_size):
+        batch = prepared[start:start + args.batch_size]
+        try:
+            batch_results = analyzer.analyze_batch([summary for _, summary in batch], batch_size=args.batch_size)
+        except Exception as e:
+            logger.error(f"Toplu analiz sırasında bir hata oluştu: {e}")
+            print(f"\n❌ HATA: {', '.join(csv_file.name for csv_file, _ in batch)} işlenemedi.")
+            continue
+
+        for (csv_file, _), results in zip(batch, batch_results):
             # Sonucu yeni klasöre kaydet
             output_filename = f"analysis_{csv_file.stem}_LOCAL_FINETUNED.txt"
             output_path = analyzer.output_dir / output_filename
@@ -131,10 +301,6 @@ def main():
             logger.info(f"Sonuçlar kaydedildi: {output_path}")
             print(f"\n✅ Analiz tamamlandı -> {output_path.name}")
 
-        except Exception as e:
-            logger.error(f"{csv_file.name} işlenirken bir hata oluştu: {e}")
-            print(f"\n❌ HATA: {csv_file.name} işlenemedi.")
-
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
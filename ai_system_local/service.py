@@ -0,0 +1,376 @@
+"""
+service.py
+======================
+React arayüzü için yerel HTTP analiz servisi (yalnızca standart kütüphane):
+ - tek bir SCADAFaultAnalyzer örneğini sıcak tutar (prompt, pandas, Ollama bağlantı havuzu)
+ - Ollama'ya keep_alive gönderir ve açılışta modeli önceden yükler; etkileşimli isteklerde
+   gecikme yalnızca üretim süresinden oluşur
+ - yüklenen kayıtları sınırlı kuyruklu, sabit sayıda işçiden oluşan bir havuza gönderir
+ - iş durumu, analiz özeti (JSON) ve token'lar geldikçe akan raporu sunar
+ - sunucudaki dosyalar yalnızca data/, uploads/ ve --data-dir ile verilen klasörlerden okunur;
+   CORS başlığı yalnızca --allow-origin ile izin verilen kaynağa gönderilir
+ - biten işler --job-ttl süresinden sonra, iş sayısı --max-jobs'u aşınca da en eskiden başlayarak silinir
+
+Uç noktalar:
+    POST /jobs?name=kayit.csv     gövde: ham dosya içeriği  → {"id": ...}
+    POST /jobs                    gövde: {"path": "data/kayit.cfg"} (izinli klasördeki dosya, ör. COMTRADE)
+    GET  /jobs                    tüm işlerin durumu
+    GET  /jobs/<id>               iş durumu
+    GET  /jobs/<id>/summary       analiz özeti (JSON) ve LLM'e giden metin özeti
+    GET  /jobs/<id>/report        rapor metni (chunked, üretim sürerken akar)
+    GET  /health
+
+Kullanım:
+    python service.py --port 8000 --workers 2 --keep-alive 30m --allow-origin http://localhost:3000
+"""
+
+import re
+import json
+import time
+import queue
+import uuid
+import logging
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from main import SCADAFaultAnalyzer, setup_logging
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_PORT = 8000
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_MAX_JOBS = 1000
+DEFAULT_JOB_TTL = 3600  # saniye; biten işler bu süreden sonra listeden silinir
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024  # 512 MB
+UPLOAD_SUFFIXES = ('.csv',)
+
+
+class AnalysisJob:
+    def __init__(self, file_path):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = Path(file_path)
+        self.status = 'queued'
+        self.created = datetime.now().isoformat(timespec='seconds')
+        self.started = None
+        self.finished = None
+        self.finished_at = None  # time.monotonic(); süre dolumu için
+        self.output_path = None
+        self.error = None
+        self.summary = None
+        self.data_summary = None
+        self.tokens = []
+        self.changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'error')
+
+    def add_token(self, token):
+        with self.changed:
+            self.tokens.append(token)
+            self.changed.notify_all()
+
+    def update(self, **fields):
+        with self.changed:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.changed.notify_all()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file': self.file_path.name,
+            'status': self.status,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'output_path': str(self.output_path) if self.output_path else None,
+            'error': self.error,
+        }
+
+
+class AnalysisService:
+    def __init__(self, analyzer, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, data_dirs=(),
+                 allowed_origin=None, max_jobs=DEFAULT_MAX_JOBS, job_ttl=DEFAULT_JOB_TTL):
+        self.analyzer = analyzer
+        self.upload_dir = analyzer.base_dir / "uploads"
+        self.upload_dir.mkdir(exist_ok=True)
+        # POST /jobs {"path": ...} yalnızca bu klasörlerin altındaki dosyaları kabul eder
+        self.data_dirs = [Path(d).resolve() for d in (analyzer.data_dir, self.upload_dir, *data_dirs)]
+        self.allowed_origin = allowed_origin
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [threading.Thread(target=self._worker, name=f"analysis-worker-{i + 1}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def warm_up(self):
+        """Ollama modelini arka planda belleğe yükler"""
+        def preload():
+            try:
+                self.analyzer.client.preload(self.analyzer.ollama_model)
+                logger.info(f"Ollama modeli yüklendi: {self.analyzer.ollama_model} "
+                            f"(keep_alive={self.analyzer.client.keep_alive})")
+            except Exception as e:
+                logger.warning(f"Ollama modeli önceden yüklenemedi: {str(e)}")
+        threading.Thread(target=preload, daemon=True).start()
+
+    def resolve_path(self, path):
+        """İstemcinin verdiği yolu çözümler; izinli klasörlerin dışındaysa veya dosya yoksa None döndürür"""
+        path = Path(path)
+        if not path.is_absolute():
+            path = self.analyzer.base_dir / path
+        path = path.resolve()
+        if not any(path.is_relative_to(directory) for directory in self.data_dirs) or not path.is_file():
+            return None
+        return path
+
+    def get_job(self, job_id):
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._jobs_lock:
+            return list(self.jobs.values())
+
+    def _evict(self):
+        """Süresi dolan biten işleri, iş sayısı sınırı aşılırsa en eski biten işleri siler (kilit tutulurken)"""
+        now = time.monotonic()
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        expired = [job for job in finished if now - job.finished_at > self.job_ttl]
+        # Yeni iş için yer aç: sözlük ekleme sırasını koruduğu için kalan biten işlerin ilkleri en eskidir
+        excess = len(self.jobs) - len(expired) + 1 - self.max_jobs
+        if excess > 0:
+            expired += [job for job in finished if job not in expired][:excess]
+        for job in expired:
+            del self.jobs[job.id]
+
+    def submit(self, file_path):
+        """İşi kuyruğa ekler; kuyruk doluysa queue.Full fırlatır"""
+        job = AnalysisJob(file_path)
+        with self._jobs_lock:
+            self._evict()
+            self._queue.put_nowait(job)
+            self.jobs[job.id] = job
+        logger.info(f"İş kuyruğa eklendi: {job.id} ({job.file_path.name}), kuyrukta {self._queue.qsize()} iş")
+        return job
+
+    def save_upload(self, name, body):
+        """Yüklenen dosyayı uploads/ altına benzersiz adla kaydeder"""
+        name = re.sub(r"[^\w.\-]", "_", Path(name).name)
+        path = self.upload_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}_{name}"
+        path.write_bytes(body)
+        return path
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        job.update(status='running', started=datetime.now().isoformat(timespec='seconds'))
+        try:
+            summary, data_summary = self.analyzer.build_summary(job.file_path)
+            job.update(summary=summary, data_summary=data_summary)
+            output_path, results = self.analyzer.generate_report(job.file_path, data_summary,
+                                                                 raise_errors=True, on_token=job.add_token,
+                                                                 summary=summary)
+            # Önbellek isabetinde token akıtılmaz; rapor tek parça olarak eklenir
+            if not job.tokens:
+                job.add_token(results)
+            job.update(status='done', output_path=output_path)
+        except Exception as e:
+            logger.error(f"İş başarısız: {job.id} ({job.file_path.name}): {str(e)}")
+            job.update(status='error', error=str(e))
+        finally:
+            job.update(finished=datetime.now().isoformat(timespec='seconds'), finished_at=time.monotonic())
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None  # make_server tarafından atanır
+
+    def log_message(self, format, *args):
+        logger.info(f"HTTP {self.address_string()} {format % args}")
+
+    def _send_cors(self):
+        # Yalnızca yapılandırılan kaynak (ör. React geliştirme sunucusu) yanıtları okuyabilir
+        if self.service.allowed_origin:
+            self.send_header("Access-Control-Allow-Origin", self.service.allowed_origin)
+            self.send_header("Vary", "Origin")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self._send_cors()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _job(self, job_id):
+        job = self.service.get_job(job_id)
+        if job is None:
+            self._send_json(404, {'error': f"İş bulunamadı: {job_id}"})
+        return job
+
+    def do_OPTIONS(self):
+        # Geliştirme sunucusundaki React arayüzünün CORS ön isteği
+        self.send_response(204)
+        self._send_cors()
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        if parts == ['health']:
+            self._send_json(200, {'status': 'ok', 'model': self.service.analyzer.ollama_model,
+                                  'queued': self.service._queue.qsize()})
+        elif parts == ['jobs']:
+            self._send_json(200, [job.to_dict() for job in self.service.list_jobs()])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job:
+                self._send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'summary':
+            job = self._job(parts[1])
+            if job and job.summary is None:
+                self._send_json(409, {'error': "Özet henüz hazır değil", 'status': job.status})
+            elif job:
+                self._send_json(200, {'summary': job.summary, 'data_summary': job.data_summary})
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'report':
+            job = self._job(parts[1])
+            if job:
+                self._stream_report(job)
+        else:
+            self._send_json(404, {'error': "Bilinmeyen uç nokta"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': "Bilinmeyen uç nokta"})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_UPLOAD_BYTES:
+            self._send_json(413, {'error': f"Dosya çok büyük (en fazla {MAX_UPLOAD_BYTES // 2 ** 20} MB)"})
+            return
+        body = self.rfile.read(length)
+
+        name = parse_qs(url.query).get('name', [None])[0]
+        try:
+            if name:
+                if Path(name).suffix.lower() not in UPLOAD_SUFFIXES:
+                    self._send_json(400, {'error': f"Desteklenmeyen dosya türü: {name}"})
+                    return
+                file_path = self.service.save_upload(name, body)
+            else:
+                requested = json.loads(body or b"{}")['path']
+                file_path = self.service.resolve_path(requested)
+                if file_path is None:
+                    self._send_json(404, {'error': f"Dosya izinli klasörlerde bulunamadı: {requested}"})
+                    return
+        except (ValueError, KeyError):
+            self._send_json(400, {'error': "Gövde ham dosya (?name=) veya {\"path\": ...} olmalı"})
+            return
+
+        try:
+            job = self.service.submit(file_path)
+        except queue.Full:
+            self.send_response(503)
+            self.send_header("Retry-After", "10")
+            self.send_header("Content-Length", "0")
+            self._send_cors()
+            self.end_headers()
+            return
+        self._send_json(202, job.to_dict())
+
+    def _stream_report(self, job):
+        """Rapor token'larını üretildikçe chunked yanıt olarak gönderir"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self._send_cors()
+        self.end_headers()
+
+        sent = 0
+        while True:
+            with job.changed:
+                job.changed.wait_for(lambda: len(job.tokens) > sent or job.done)
+                pending = ''.join(job.tokens[sent:])
+                sent = len(job.tokens)
+                finished = job.done and sent == len(job.tokens)
+            if pending:
+                self._send_chunk(pending)
+            if finished:
+                break
+        if job.status == 'error':
+            self._send_chunk(f"\n\nHATA: {job.error}\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(service, host, port):
+    """Servise bağlı çok iş parçacıklı HTTP sunucusunu oluşturur"""
+    handler = type("BoundServiceHandler", (ServiceHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SCADA analiz HTTP servisi")
+    parser.add_argument("--host", default="127.0.0.1", help="Dinlenecek adres")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Dinlenecek port")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Aynı anda çalışan analiz işi sayısı (Ollama OLLAMA_NUM_PARALLEL ile uyumlu)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Bekleyen en fazla iş; dolunca 503 döner")
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE,
+                        help="Ollama modelinin bellekte kalma süresi (ör. 30m, -1: süresiz)")
+    parser.add_argument("--data-dir", action="append", default=[],
+                        help="POST /jobs {\"path\": ...} ile okunabilecek ek klasör (data/ ve uploads/ her zaman izinli)")
+    parser.add_argument("--allow-origin", default=None,
+                        help="CORS ile yanıtları okuyabilecek arayüz kaynağı (ör. http://localhost:3000); verilmezse CORS kapalı")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help="Bellekte tutulan en fazla iş")
+    parser.add_argument("--job-ttl", type=float, default=DEFAULT_JOB_TTL,
+                        help="Biten işlerin listede kalma süresi (saniye)")
+    args = parser.parse_args()
+    setup_logging()
+
+    analyzer = SCADAFaultAnalyzer()
+    analyzer.client.keep_alive = args.keep_alive
+    service = AnalysisService(analyzer, workers=args.workers, queue_size=args.queue_size, data_dirs=args.data_dir,
+                              allowed_origin=args.allow_origin, max_jobs=args.max_jobs, job_ttl=args.job_ttl)
+    service.warm_up()
+
+    server = make_server(service, args.host, args.port)
+    logger.info(f"SCADA analiz servisi dinliyor: http://{args.host}:{args.port} ({args.workers} işçi)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Servis durduruluyor...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
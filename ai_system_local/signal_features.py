@@ -0,0 +1,152 @@
+"""
+signal_features.py
+======================
+Arıza karakterizasyonu için periyot bazlı analog özellikler (NumPy, satır döngüsüz):
+ - örnekleme hızından bir periyottaki örnek sayısını bulur (nominal 50 Hz)
+ - IL1–IL3/Io ve U1–U3/Uo için bir periyotluk kayan pencere RMS değeri
+ - periyot başına kayan DFT ile temel bileşen fazörleri (RMS ölçeğinde, kümülatif toplamla O(n))
+ - simetrili bileşenler: I0/I1/I2 ve U0/U1/U2
+ - RMS pencereleri sliding_window_view ile kopyasız oluşturulur; değerler pencerenin son örneğine
+   hizalanır (röle gibi nedensel), ilk periyot NaN kalır
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NOMINAL_FREQUENCY = 50.0  # Hz
+MIN_SAMPLES_PER_CYCLE = 4
+CURRENT_CHANNELS = ['IL1', 'IL2', 'IL3', 'Io']
+VOLTAGE_CHANNELS = ['U1', 'U2', 'U3', 'Uo']
+UNBALANCE_MIN_FRACTION = 0.1  # I2/I1 yalnızca I1 tepe değerinin %10'unu aştığında hesaplanır
+
+# Simetrili bileşen operatörü a = 1∠120°
+_A = np.exp(2j * np.pi / 3)
+
+
+def samples_per_cycle(times, frequency=NOMINAL_FREQUENCY):
+    """Bir periyottaki örnek sayısını döndürür; örnekleme hızı belirlenemezse None"""
+    if len(times) < 2:
+        return None
+    step = np.nanmedian(np.diff(times))
+    if not step > 0:
+        return None
+    n = int(round(1.0 / (step * frequency)))
+    if n < MIN_SAMPLES_PER_CYCLE or n > len(times):
+        return None
+    return n
+
+
+def _finite_windows(values, n):
+    """Sonlu olmayan örnekleri 0 yapar; her pencerenin (son örneğine hizalı) geçerli olup olmadığını döndürür"""
+    invalid = ~np.isfinite(values)
+    if not invalid.any():
+        return values, None
+    counts = np.concatenate(([0], np.cumsum(invalid)))
+    return np.where(invalid, 0.0, values), (counts[n:] - counts[:-n]) == 0
+
+
+def sliding_rms(values, n):
+    """Bir periyotluk kayan pencere RMS değeri; NaN içeren pencereler NaN kalır"""
+    values, valid = _finite_windows(values, n)
+    result = np.full(len(values), np.nan)
+    windows = sliding_window_view(values, n)
+    result[n - 1:] = np.sqrt(np.einsum('ij,ij->i', windows, windows) / n)
+    if valid is not None:
+        result[n - 1:][~valid] = np.nan
+    return result
+
+
+def sliding_phasor(values, n):
+    """Periyot başına kayan DFT ile temel bileşen fazörü (genlik RMS ölçeğinde)"""
+    # Kümülatif toplam tek bir NaN'ı sonraki tüm pencerelere taşır: NaN yalnızca onu içeren pencerelerde kalır
+    values, valid = _finite_windows(values, n)
+    # Dönen referans mutlak örnek indeksine bağlı: sabit sinüs için fazör açısı sabit kalır
+    rotated = values * np.exp(-2j * np.pi * (np.arange(len(values)) % n) / n)
+    sums = np.concatenate(([0], np.cumsum(rotated)))
+    result = np.full(len(values), np.nan, dtype=complex)
+    result[n - 1:] = (sums[n:] - sums[:-n]) * np.sqrt(2) / n
+    if valid is not None:
+        result[n - 1:][~valid] = np.nan
+    return result
+
+
+def sequence_components(a, b, c):
+    """Üç faz fazöründen sıfır, pozitif ve negatif bileşenleri döndürür"""
+    zero = (a + b + c) / 3
+    positive = (a + _A * b + _A ** 2 * c) / 3
+    negative = (a + _A ** 2 * b + _A * c) / 3
+    return zero, positive, negative
+
+
+def compute_features(df, frequency=NOMINAL_FREQUENCY):
+    """Analog kanalların RMS, fazör ve simetrili bileşen dizilerini döndürür; hesaplanamazsa None"""
+    if 'time' not in df.columns:
+        return None
+    n = samples_per_cycle(df['time'].to_numpy(dtype=float), frequency)
+    if n is None:
+        return None
+
+    features = {'samples_per_cycle': n, 'rms': {}, 'phasor': {}, 'sequence': {}}
+    for channel in CURRENT_CHANNELS + VOLTAGE_CHANNELS:
+        if channel in df.columns:
+            values = df[channel].to_numpy(dtype=float)
+            features['rms'][channel] = sliding_rms(values, n)
+            features['phasor'][channel] = sliding_phasor(values, n)
+
+    for prefix, phases in (('I', CURRENT_CHANNELS[:3]), ('U', VOLTAGE_CHANNELS[:3])):
+        if all(phase in features['phasor'] for phase in phases):
+            components = sequence_components(*(features['phasor'][phase] for phase in phases))
+            for index, component in enumerate(components):
+                features['sequence'][f"{prefix}{index}"] = np.abs(component)
+    return features
+
+
+def trim_features(features, rows):
+    """Baştaki bağlam satırlarını (ör. önceki parçanın son örnekleri) özellik dizilerinden atar"""
+    trimmed = {'samples_per_cycle': features['samples_per_cycle']}
+    for key in ('rms', 'phasor', 'sequence'):
+        trimmed[key] = {name: values[rows:] for name, values in features[key].items()}
+    return trimmed
+
+
+def _nan_stat(func, values):
+    valid = values[~np.isnan(values)]
+    return round(float(func(valid)), 4) if len(valid) else None
+
+
+def feature_summary(features, times):
+    """Özellik dizilerini LLM özetine girecek birkaç sayıya indirger"""
+    if features is None:
+        return None
+
+    channels = {}
+    for channel, phasor in features['phasor'].items():
+        magnitude = np.abs(phasor)
+        # İlk tam periyot penceresi (kırpılmış dizilerde ilk geçerli değer)
+        valid = np.flatnonzero(~np.isnan(magnitude))
+        channels[channel] = {
+            'pre': round(float(magnitude[valid[0]]), 4) if len(valid) else None,
+            'max': _nan_stat(np.max, magnitude),
+            'min': _nan_stat(np.min, magnitude),
+            'rms_max': _nan_stat(np.max, features['rms'][channel]),
+        }
+
+    sequence = {}
+    for name, magnitude in features['sequence'].items():
+        if np.isnan(magnitude).all():
+            continue
+        peak = int(np.nanargmax(magnitude))
+        sequence[name] = {'max': round(float(magnitude[peak]), 4), 'time': float(times[peak]),
+                          'min': _nan_stat(np.min, magnitude)}
+
+    unbalance = None
+    if 'I1' in features['sequence'] and 'I2' in features['sequence']:
+        positive = features['sequence']['I1']
+        # Akım yokken (kesici açık) oran anlamsız: pozitif bileşenin belirgin olduğu anlar
+        with np.errstate(invalid='ignore'):
+            significant = positive > UNBALANCE_MIN_FRACTION * np.nanmax(positive)
+        if significant.any():
+            unbalance = _nan_stat(np.max, features['sequence']['I2'][significant] / positive[significant])
+
+    return {'samples_per_cycle': features['samples_per_cycle'], 'channels': channels,
+            'sequence': sequence, 'I2_I1_max': unbalance}
@@ -0,0 +1,192 @@
+"""
+signature_index.py
+======================
+Arıza imzası benzerlik dizini (cache/signatures/):
+ - her kaydın analiz özetini (sinyal aralıkları, RMS seviyeleri, simetrili bileşenler, kritik olaylar,
+   PICK UP → TRIP → açma gecikmeleri) sabit uzunluklu bir vektöre gömer
+ - yalnızca aktif sinyal kümesi (sinyal adı + PICK UP/TRIP/kesici türü) birebir aynı olan kayıtlar
+   karşılaştırılır; her sinyalin ilk başlangıcı kayıt süresine oranlanır, toplam süresi log ölçeğindedir
+ - büyüklükler log10(1 + x) ölçeğindedir: yalnızca akım genliği biraz farklı olan kayıtlar yakın düşer
+ - vektörler vectors.npy, analiz metinleri ve kimlik bilgileri entries.json içinde saklanır; en yakın
+   komşu aynı model ve prompt sürümüyle üretilmiş kayıtlar arasında NumPy ile aranır
+ - yeni kayıt eşik uzaklık içindeyse saklı analiz, benzerlik skoruyla birlikte yeniden kullanılır
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import signal_features
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+INDEX_VERSION = 2
+DEFAULT_MAX_DISTANCE = 0.25
+ANALOG_CHANNELS = signal_features.CURRENT_CHANNELS + signal_features.VOLTAGE_CHANNELS
+SEQUENCE_COMPONENTS = ('I0', 'I1', 'I2', 'U0', 'U1', 'U2')
+
+# Vektör düzeni: [tepe | ön-arıza] × analog kanal, simetrili bileşen tepeleri, I2/I1,
+# [kritik olay sayısı, ilk zaman (kayıt süresine oranla), toplam süre], [PICK UP→TRIP, TRIP→açma].
+# Sinyal zamanlamaları kayda göre değişen uzunlukta olduğundan kayıt bilgisiyle birlikte saklanır.
+_ANALOGS = 0
+_SEQUENCE = _ANALOGS + 2 * len(ANALOG_CHANNELS)
+_UNBALANCE = _SEQUENCE + len(SEQUENCE_COMPONENTS)
+_CRITICAL = _UNBALANCE + 1
+_DELAYS = _CRITICAL + 3
+VECTOR_SIZE = _DELAYS + 2
+
+
+def _log(value):
+    return float(np.log10(1.0 + abs(value))) if value is not None else 0.0
+
+
+def _relative_time(summary, time):
+    """Mutlak zamanı kaydın başlangıcına göre [0, 1] aralığına taşır"""
+    start, end = summary.get('time_start'), summary.get('time_end')
+    if start is None or end is None or not end > start:
+        return 0.0
+    return (time - start) / (end - start)
+
+
+def signal_signature(summary):
+    """Aktif sinyal kümesini (sıralı 'tür:sinyal' listesi) ve her sinyal için [ilk başlangıç, log süre] döndürür"""
+    onsets, durations = {}, {}
+    for iv in summary.get('signal_intervals', []):
+        key = f"{iv['kind']}:{iv['signal']}"
+        onsets[key] = min(onsets.get(key, iv['start']), iv['start'])
+        durations[key] = durations.get(key, 0.0) + iv['duration_ms']
+    signals = sorted(onsets)
+    timing = [[_relative_time(summary, onsets[key]), _log(durations[key])] for key in signals]
+    return signals, timing
+
+
+def signature_vector(summary):
+    """Analiz özetinin sinyal kümesinden bağımsız kısmını sabit uzunluklu imza vektörüne çevirir"""
+    vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+
+    features = summary.get('features')
+    if features:
+        for i, channel in enumerate(ANALOG_CHANNELS):
+            values = features['channels'].get(channel)
+            if values:
+                vector[_ANALOGS + 2 * i] = _log(values['max'])
+                vector[_ANALOGS + 2 * i + 1] = _log(values['pre'])
+        for i, name in enumerate(SEQUENCE_COMPONENTS):
+            if name in features['sequence']:
+                vector[_SEQUENCE + i] = _log(features['sequence'][name]['max'])
+        vector[_UNBALANCE] = features['I2_I1_max'] or 0.0
+
+    events = summary['critical_events']
+    if events:
+        vector[_CRITICAL] = _log(len(events))
+        vector[_CRITICAL + 1] = _relative_time(summary, events[0]['time'])
+        vector[_CRITICAL + 2] = _log(sum(event.get('duration_ms', 0.0) for event in events))
+
+    sequences = summary.get('fault_sequences', [])
+    for offset, key in enumerate(('pickup_to_trip_ms', 'trip_to_open_ms')):
+        delays = [sequence[key] for sequence in sequences if sequence[key] is not None]
+        if delays:
+            vector[_DELAYS + offset] = _log(min(delays))
+    return vector
+
+
+def similarity(distance):
+    """Uzaklığı (0, 1] aralığında benzerlik skoruna çevirir"""
+    return 1.0 / (1.0 + distance)
+
+
+class SignatureIndex:
+    def __init__(self, index_dir, max_distance=DEFAULT_MAX_DISTANCE):
+        self.index_dir = Path(index_dir)
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self.vectors, self.entries = self._load()
+
+    def __getstate__(self):
+        # Süreç havuzuna gönderilirken kilit kopyalanamaz
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        empty = np.zeros((0, VECTOR_SIZE), dtype=np.float32), []
+        entries_path = self.index_dir / "entries.json"
+        vectors_path = self.index_dir / "vectors.npy"
+        if not entries_path.exists() or not vectors_path.exists():
+            return empty
+        try:
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            vectors = np.load(vectors_path)
+        except (ValueError, OSError) as e:
+            logger.warning(f"İmza dizini okunamadı, yeniden oluşturulacak: {self.index_dir}: {str(e)}")
+            return empty
+        if index.get('version') != INDEX_VERSION or vectors.ndim != 2 or vectors.shape[1] != VECTOR_SIZE:
+            return empty
+        # Yazma yarıda kaldıysa iki dosyanın ortak kısmı geçerlidir
+        count = min(len(vectors), len(index['entries']))
+        return vectors[:count], index['entries'][:count]
+
+    def _save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        vectors_tmp = self.index_dir / f"vectors{suffix}.npy"
+        entries_tmp = self.index_dir / f"entries.json{suffix}"
+        np.save(vectors_tmp, self.vectors, allow_pickle=False)
+        with open(entries_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(vectors_tmp, self.index_dir / "vectors.npy")
+        os.replace(entries_tmp, self.index_dir / "entries.json")
+
+    def nearest(self, summary, model, prompt_version, exclude=None):
+        """Aynı sinyal kümesine sahip, aynı model ve prompt sürümüyle analiz edilmiş en yakın kaydı
+        (kayıt, uzaklık) döndürür; exclude adlı kaydın kendi analizleri aday olmaz"""
+        vector = signature_vector(summary)
+        signals, timing = signal_signature(summary)
+        with self._lock:
+            candidates = [i for i, entry in enumerate(self.entries)
+                          if entry['model'] == model and entry['prompt_version'] == prompt_version
+                          and entry['signals'] == signals and entry['recording'] != exclude]
+            if not candidates:
+                return None, None
+            squared = np.sum((self.vectors[candidates] - vector) ** 2, axis=1)
+            if signals:
+                stored = np.array([self.entries[i]['timing'] for i in candidates], dtype=np.float32)
+                squared += np.sum((stored - np.array(timing, dtype=np.float32)) ** 2, axis=(1, 2))
+            distances = np.sqrt(squared)
+            best = int(np.argmin(distances))
+            return self.entries[candidates[best]], float(distances[best])
+
+    def match(self, summary, model, prompt_version, exclude=None):
+        """Eşik uzaklık içindeki en yakın analizi {'entry', 'distance', 'similarity'} olarak döndürür"""
+        entry, distance = self.nearest(summary, model, prompt_version, exclude)
+        if entry is None or distance > self.max_distance:
+            return None
+        return {'entry': entry, 'distance': distance, 'similarity': similarity(distance)}
+
+    def add(self, summary, recording, output_path, results, model, prompt_version):
+        """LLM ile üretilmiş analizi dizine ekler ve hemen diske yazar"""
+        signals, timing = signal_signature(summary)
+        entry = {
+            'recording': recording,
+            'signals': signals,
+            'timing': timing,
+            'output_path': str(output_path),
+            'model': model,
+            'prompt_version': prompt_version,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'results': results,
+        }
+        with self._lock:
+            self.vectors = np.vstack([self.vectors, signature_vector(summary)[np.newaxis]])
+            self.entries.append(entry)
+            self._save()
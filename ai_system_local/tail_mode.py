@@ -0,0 +1,253 @@
+"""
+tail_mode.py
+======================
+Büyümekte olan (veri kaydedicinin hâlâ yazdığı) SCADA CSV dosyaları için artımlı izleme:
+ - okunan bayt konumunu hatırlar, her yoklamada yalnızca yeni eklenen satırları ayrıştırır
+ - PICK UP / TRIP / kritik olay özetini satır satır değil, yeni parça üzerinden günceller
+ - periyot pencereleri için önceki parçanın son n-1 örneğini saklar: parça sınırını kesen pencereler ve
+   kritik olaylar tüm dosya tek seferde analiz edilmiş gibi hesaplanır
+ - LLM analizini yalnızca yeni bir PICK UP veya TRIP geçişi (0→1) ya da kritik olay
+   başlangıcı görüldüğünde tetikler; yoklama maliyeti dosya büyüdükçe artmaz
+
+Kullanım:
+    python main.py --follow data/canli_kayit.csv --interval 2
+"""
+
+import io
+import csv
+import time
+import logging
+from pathlib import Path
+
+import numpy as np
+
+import data_cache
+import fault_engine
+
+logger = logging.getLogger("SCADA_Analyzer")
+
+DEFAULT_POLL_INTERVAL = 2.0  # saniye
+MAX_STORED_CRITICAL_EVENTS = 100  # özet yalnızca ilk 5 olayı kullanır; bellek sınırlı kalsın
+MAX_LOOKBACK_ROWS = 4096  # örnekleme hızı bu kadar satırda belirlenemezse anlık değerlere geçilir
+PEAK_KEYS = fault_engine.PHASE_COLUMNS + [fault_engine.NEUTRAL_COLUMN, 'I0', 'I1', 'I2']
+
+
+class IncrementalFaultTracker:
+    def __init__(self, analyzer, file_path):
+        self.analyzer = analyzer
+        self.file_path = Path(file_path)
+        self.reset()
+
+    def reset(self):
+        """İzleme durumunu sıfırlar (dosya kesildiğinde veya değiştirildiğinde)"""
+        self.offset = 0
+        self.columns = None
+        self.signal_columns = []
+        self.last_values = {}
+        self.last_critical = False
+        self.lookback = None
+        self.samples_per_cycle = None
+        self.time_min = None
+        self.time_max = None
+        self.critical_event_count = 0
+        self.summary = {
+            'total_records': 0,
+            'time_range': "",
+            'time_start': None,
+            'time_end': None,
+            'pickup_events': {},
+            'trip_events': {},
+            'critical_events': [],
+            'signal_intervals': [],
+            'fault_sequences': [],
+            'features': None
+        }
+
+    def _read_new_lines(self):
+        """Son konumdan itibaren tamamlanmış satırları okur; yarım satırı sonraki yoklamaya bırakır"""
+        size = self.file_path.stat().st_size
+        if size < self.offset:
+            logger.warning(f"Dosya küçüldü, izleme baştan başlıyor: {self.file_path}")
+            self.reset()
+        if size == self.offset:
+            return b""
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+
+        end = data.rfind(b"\n")
+        if end < 0:
+            return b""
+        self.offset += end + 1
+        return data[:end + 1]
+
+    def _parse_header(self, data):
+        """İlk satırdaki başlığı ayrıştırır, kalan baytları döndürür"""
+        header_end = data.find(b"\n")
+        header = next(csv.reader([data[:header_end].decode('utf-8-sig').strip()]))
+        self.columns = [data_cache.clean_column_name(col) for col in header]
+        pickup_columns, trip_columns = fault_engine.signal_columns(self.columns)
+        self.signal_columns = pickup_columns + trip_columns
+        self.last_values = {col: 0 for col in self.signal_columns}
+        return data[header_end + 1:]
+
+    def _merge_intervals(self, chunk_intervals, first_time):
+        """Parça aralıklarını ekler; parça sınırında süren aralıkları birleştirir"""
+        intervals = self.summary['signal_intervals']
+        open_intervals = {iv['signal']: iv for iv in intervals if iv['ongoing']}
+        for iv in chunk_intervals:
+            previous = open_intervals.get(iv['signal'])
+            if previous is not None and iv['start'] == first_time:
+                previous.update(end=iv['end'], samples=previous['samples'] + iv['samples'], ongoing=iv['ongoing'])
+                previous['duration_ms'] = (previous['end'] - previous['start']) * 1000
+                del open_intervals[iv['signal']]
+            else:
+                intervals.append(iv)
+
+        # Devam etmeyen açık aralıklar bu parçanın ilk örneğinde sona ermiştir
+        for previous in open_intervals.values():
+            previous.update(end=first_time, ongoing=False)
+            previous['duration_ms'] = (previous['end'] - previous['start']) * 1000
+
+        self.summary['fault_sequences'] = fault_engine.fault_sequences(intervals)
+
+    def _merge(self, chunk_summary, first_time):
+        """Parça özetini birikmiş özete ekler; yeni bir kritik olay başladıysa True döndürür"""
+        self.summary['total_records'] += chunk_summary['total_records']
+        for key in ('pickup_events', 'trip_events'):
+            for signal, data in chunk_summary[key].items():
+                event = self.summary[key].setdefault(signal, {'count': 0, 'times': []})
+                event['count'] += data['count']
+                event['times'] = (event['times'] + data['times'])[:3]  # İlk 3 zaman damgası
+
+        if chunk_summary.get('features'):
+            self._merge_features(chunk_summary['features'])
+
+        return self._merge_critical(chunk_summary['critical_events'], first_time)
+
+    def _merge_critical(self, events, first_time):
+        """Parçanın kritik olaylarını ekler; parça sınırında süren olayı öncekiyle birleştirir"""
+        stored = self.summary['critical_events']
+        previous = stored[-1] if stored and stored[-1]['ongoing'] else None
+        continued = self.last_critical and bool(events) and events[0]['time'] == first_time
+        self.last_critical = bool(events) and events[-1]['ongoing']
+
+        if previous is not None:
+            if continued:
+                event = events[0]
+                previous.update(end=event['end'], ongoing=event['ongoing'])
+                for key in PEAK_KEYS:
+                    if key in event:
+                        previous[key] = max(previous.get(key, 0.0), event[key])
+                for key in ('pickup_signals', 'trip_signals'):
+                    previous[key] += [signal for signal in event[key] if signal not in previous[key]]
+            else:
+                # Olay önceki parçanın son örneğine kadar sürdü, bu parçanın ilk örneğinde sona erdi
+                previous.update(end=first_time, ongoing=False)
+            previous['duration_ms'] = (previous['end'] - previous['time']) * 1000
+
+        new_events = events[1:] if continued else events
+        self.critical_event_count += len(new_events)
+        room = MAX_STORED_CRITICAL_EVENTS - len(stored)
+        if room > 0:
+            stored.extend(new_events[:room])
+        return bool(new_events)
+
+    def _merge_features(self, chunk_features):
+        """Parçanın RMS / simetrili bileşen özetini birikmiş özetle birleştirir (maksimumlar)"""
+        features = self.summary['features']
+        if features is None:
+            self.summary['features'] = chunk_features
+            return
+
+        for channel, values in chunk_features['channels'].items():
+            current = features['channels'].setdefault(channel, dict(values))
+            for key, func in (('max', max), ('rms_max', max), ('min', min)):
+                if values[key] is not None:
+                    current[key] = values[key] if current[key] is None else func(current[key], values[key])
+        for name, values in chunk_features['sequence'].items():
+            current = features['sequence'].setdefault(name, dict(values))
+            if values['max'] > current['max']:
+                current.update(max=values['max'], time=values['time'])
+            if values['min'] is not None:
+                current['min'] = values['min'] if current['min'] is None else min(current['min'], values['min'])
+        ratios = [r for r in (features['I2_I1_max'], chunk_features['I2_I1_max']) if r is not None]
+        features['I2_I1_max'] = max(ratios) if ratios else None
+
+    def _new_transitions(self, chunk, critical_started):
+        """Parçadaki yeni PICK UP/TRIP yükselen kenarlarını ve kritik olay başlangıcını bulur"""
+        triggers = []
+        for col in self.signal_columns:
+            values = np.concatenate(([self.last_values[col]], chunk[col].to_numpy()))
+            active = values == 1
+            if (active[1:] & ~active[:-1]).any():
+                triggers.append(col)
+            self.last_values[col] = values[-1]
+
+        if critical_started:
+            triggers.append('kritik olay')
+        return triggers
+
+    def _analyze(self, chunk):
+        """Parçayı önceki parçanın son örnekleriyle birlikte tek seferde analiz eder"""
+        import pandas as pd
+
+        frame = chunk if self.lookback is None else pd.concat([self.lookback, chunk], ignore_index=True)
+        # Örnekleme hızı henüz belirlenemediyse (ilk periyot dolmadı) anlık değerlere geçilmez
+        chunk_summary = fault_engine.analyze_fault_scenarios(
+            frame, lookback=len(frame) - len(chunk), instantaneous_fallback=len(frame) >= MAX_LOOKBACK_ROWS)
+        if chunk_summary['features']:
+            self.samples_per_cycle = chunk_summary['features']['samples_per_cycle']
+        keep = self.samples_per_cycle - 1 if self.samples_per_cycle else MAX_LOOKBACK_ROWS
+        self.lookback = frame.iloc[-keep:] if keep > 0 else None
+        return chunk_summary
+
+    def poll(self):
+        """Yeni satırları işler; analiz tetiklenmesi gerekiyorsa tetikleyicileri döndürür"""
+        import pandas as pd
+
+        data = self._read_new_lines()
+        if self.columns is None and data:
+            data = self._parse_header(data)
+        if not data.strip():
+            return []
+
+        chunk = pd.read_csv(io.BytesIO(data), header=None, names=self.columns)
+        if 'time' in chunk.columns:
+            chunk['time'] = pd.to_numeric(chunk['time'], errors='coerce')
+            low, high = chunk['time'].min(), chunk['time'].max()
+            self.time_min = low if self.time_min is None else min(self.time_min, low)
+            self.time_max = high if self.time_max is None else max(self.time_max, high)
+            self.summary['time_range'] = f"{self.time_min:.6f} - {self.time_max:.6f} saniye"
+            self.summary['time_start'] = float(self.time_min)
+            self.summary['time_end'] = float(self.time_max)
+
+        first_time = float(chunk['time'].iloc[0]) if 'time' in chunk.columns else None
+        chunk_summary = self._analyze(chunk)
+        critical_started = self._merge(chunk_summary, first_time)
+        if first_time is not None:
+            self._merge_intervals(chunk_summary['signal_intervals'], first_time)
+        triggers = self._new_transitions(chunk, critical_started)
+        logger.info(f"{self.file_path.name}: {len(chunk)} yeni satır, toplam {self.summary['total_records']}")
+        return triggers
+
+    def follow(self, interval=DEFAULT_POLL_INTERVAL, max_polls=None):
+        """Dosyayı izler; yeni geçiş görüldüğünde LLM analizini çalıştırır"""
+        logger.info(f"İzleme başladı: {self.file_path} (her {interval}s)")
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            try:
+                triggers = self.poll()
+            except FileNotFoundError:
+                logger.warning(f"Dosya bulunamadı, bekleniyor: {self.file_path}")
+                triggers = []
+
+            if triggers:
+                logger.info(f"Yeni olay(lar): {', '.join(triggers)} → analiz başlatılıyor")
+                data_summary = self.analyzer.generate_data_summary(self.summary)
+                self.analyzer.generate_report(self.file_path, data_summary, summary=self.summary)
+
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
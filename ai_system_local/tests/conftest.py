@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modüller düz betikler olarak çalışır: testler ai_system_local/ içinden içe aktarır
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
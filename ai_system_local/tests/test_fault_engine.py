@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fault_engine
+import signal_features
+
+FREQUENCY = 50.0
+SAMPLES_PER_CYCLE = 20
+CURRENTS = ['IL1', 'IL2', 'IL3', 'Io']
+
+
+def _cycles(start, end):
+    return slice(start * SAMPLES_PER_CYCLE, end * SAMPLES_PER_CYCLE)
+
+
+def _recording(cycles=20, step=None):
+    n = cycles * SAMPLES_PER_CYCLE
+    times = np.arange(n) / (FREQUENCY * SAMPLES_PER_CYCLE)
+    df = pd.DataFrame({'time': times if step is None else np.arange(n) * step})
+    for i, phase in enumerate(('IL1', 'IL2', 'IL3')):
+        df[phase] = 2.0 * np.sin(2 * np.pi * FREQUENCY * times - i * 2 * np.pi / 3)
+    df['Io'] = 0.0
+    # IL1 faz arızası (8-12. periyot) ve ayrı bir toprak arızası (15-17. periyot)
+    df.loc[df.index[_cycles(8, 12)], 'IL1'] *= 20.0
+    df.loc[df.index[_cycles(15, 17)], 'Io'] = 10.0 * np.sin(2 * np.pi * FREQUENCY * times[_cycles(15, 17)])
+
+    for col in ('67_1_faz_PICK_UP', '67_1_faz_TRIP', '67_N1_toprak_PICK_UP', '50_diger_PICK_UP'):
+        df[col] = 0
+    df.loc[df.index[_cycles(8, 13)], '67_1_faz_PICK_UP'] = 1
+    df.loc[df.index[_cycles(10, 12)], '67_1_faz_TRIP'] = 1
+    df.loc[df.index[_cycles(15, 17)], '67_N1_toprak_PICK_UP'] = 1
+    df.loc[df.index[_cycles(15, 17)], '50_diger_PICK_UP'] = 1
+    return df
+
+
+def _reference(df, lookback=0, instantaneous=False):
+    """Satır satır (iterrows) başvuru uygulaması: eşik aşan ardışık satırlar tek olaydır"""
+    if instantaneous:
+        magnitudes = {col: df[col].abs().to_numpy() for col in CURRENTS}
+    else:
+        features = signal_features.compute_features(df)
+        magnitudes = {col: np.abs(features['phasor'][col]) for col in CURRENTS}
+    pickup_columns = [col for col in df.columns if 'PICK_UP' in col and '67' in col]
+    trip_columns = [col for col in df.columns if 'TRIP' in col and '67' in col]
+
+    events = {'pickup_events': {}, 'trip_events': {}}
+    critical, current = [], None
+    for position, (_, row) in enumerate(df.iloc[lookback:].iterrows(), start=lookback):
+        for columns, key in ((pickup_columns, 'pickup_events'), (trip_columns, 'trip_events')):
+            for col in columns:
+                if row[col] == 1:
+                    event = events[key].setdefault(col, {'count': 0, 'times': []})
+                    event['count'] += 1
+                    if len(event['times']) < 3:
+                        event['times'].append(row['time'])
+
+        values = {col: magnitudes[col][position] for col in CURRENTS}
+        high = (any(values[phase] > fault_engine.PHASE_CURRENT_THRESHOLD for phase in CURRENTS[:3])
+                or values['Io'] > fault_engine.NEUTRAL_CURRENT_THRESHOLD)
+        if not high:
+            if current is not None:
+                current['end'] = row['time']
+            current = None
+            continue
+        if current is None:
+            current = {'time': row['time'], 'end': row['time'], 'pickup_signals': [], 'trip_signals': [],
+                       **{col: 0.0 for col in CURRENTS}}
+            critical.append(current)
+        else:
+            current['end'] = row['time']
+        for col in CURRENTS:
+            if not np.isnan(values[col]):
+                current[col] = max(current[col], values[col])
+        for columns, key in ((pickup_columns, 'pickup_signals'), (trip_columns, 'trip_signals')):
+            current[key] += [col for col in columns if row[col] == 1 and col not in current[key]]
+    return events, critical
+
+
+def _assert_matches(summary, events, critical):
+    assert summary['pickup_events'] == events['pickup_events']
+    assert summary['trip_events'] == events['trip_events']
+    assert len(summary['critical_events']) == len(critical)
+    for actual, expected in zip(summary['critical_events'], critical):
+        assert actual['time'] == pytest.approx(expected['time'])
+        assert actual['end'] == pytest.approx(expected['end'])
+        for col in CURRENTS:
+            assert actual[col] == pytest.approx(expected[col])
+        assert sorted(actual['pickup_signals']) == sorted(expected['pickup_signals'])
+        assert sorted(actual['trip_signals']) == sorted(expected['trip_signals'])
+
+
+def test_matches_iterrows_reference():
+    df = _recording()
+    summary = fault_engine.analyze_fault_scenarios(df)
+    events, critical = _reference(df)
+
+    assert len(critical) == 2
+    assert critical[0]['pickup_signals'] == ['67_1_faz_PICK_UP']
+    assert critical[0]['trip_signals'] == ['67_1_faz_TRIP']
+    assert critical[1]['pickup_signals'] == ['67_N1_toprak_PICK_UP']
+    assert '50_diger_PICK_UP' not in summary['pickup_events']
+    _assert_matches(summary, events, critical)
+
+
+def test_lookback_matches_reference():
+    df = _recording()
+    # Bağlam IL1 arızasının ortasında biter: ilk olay ilk değerlendirilen satırda başlar
+    lookback = 9 * SAMPLES_PER_CYCLE
+    summary = fault_engine.analyze_fault_scenarios(df, lookback=lookback)
+    events, critical = _reference(df, lookback=lookback)
+
+    assert summary['total_records'] == len(df) - lookback
+    assert critical[0]['time'] == df['time'].iloc[lookback]
+    _assert_matches(summary, events, critical)
+
+
+def test_instantaneous_fallback_matches_reference():
+    # Örnekleme adımı periyottan uzun: periyot bazlı özellikler hesaplanamaz
+    df = _recording(step=0.05)
+    assert signal_features.compute_features(df) is None
+
+    summary = fault_engine.analyze_fault_scenarios(df)
+    events, critical = _reference(df, instantaneous=True)
+    assert critical
+    _assert_matches(summary, events, critical)
+
+
+def test_without_instantaneous_fallback_only_signals_are_counted():
+    df = _recording(step=0.05)
+    summary = fault_engine.analyze_fault_scenarios(df, instantaneous_fallback=False)
+    events, _ = _reference(df, instantaneous=True)
+
+    assert summary['critical_events'] == []
+    assert summary['pickup_events'] == events['pickup_events']
+    assert summary['trip_events'] == events['trip_events']
@@ -0,0 +1,17 @@
+import pickle
+
+from prompt_budget import PromptBudget
+
+
+def test_calibration_persists_per_model(tmp_path):
+    state_path = tmp_path / "cache" / "prompt_calibration.json"
+    budget = PromptBudget(4096, state_path=state_path, model="llama3.1:8b")
+    assert budget.calibration == 1.0
+
+    budget.observe(1000, 1250)
+    assert budget.calibration == 1.25
+    assert PromptBudget(4096, state_path=state_path, model="llama3.1:8b").calibration == 1.25
+    assert PromptBudget(4096, state_path=state_path, model="diger-model").calibration == 1.0
+
+    # İşçi süreçlere gönderilen kopya katsayıyı taşır
+    assert pickle.loads(pickle.dumps(budget)).calibration == 1.25
@@ -0,0 +1,28 @@
+from results_store import ResultsStore, signal_matches, signal_pattern
+
+SIGNALS = ('67_1_faz_asiri_akim_TRIP', '67_N1_toprak_yonlu_koruma_TRIP', '67_10_faz_asiri_akim_TRIP')
+
+
+def _summary(signal):
+    interval = {'signal': signal, 'kind': 'trip', 'start': 0.6, 'end': 0.65, 'duration_ms': 50.0,
+                'samples': 80, 'ongoing': False}
+    return {'total_records': 100, 'time_range': "0.000000 - 1.000000 saniye", 'pickup_events': {},
+            'trip_events': {signal: {'count': 80, 'times': [0.6]}}, 'critical_events': [],
+            'signal_intervals': [interval], 'fault_sequences': [], 'features': None}
+
+
+def test_signal_pattern_escapes_underscores():
+    assert signal_pattern("67-1 TRIP") == "%67\\_1%TRIP%"
+    assert signal_matches('67_1_faz_asiri_akim_TRIP', "67-1 TRIP")
+    assert not signal_matches('67_N1_toprak_yonlu_koruma_TRIP', "67-1 TRIP")
+    assert not signal_matches('67_10_faz_asiri_akim_TRIP', "67-1 TRIP")
+
+
+def test_find_signal_separates_67_1_from_67_n1(tmp_path):
+    store = ResultsStore(tmp_path / "results.db")
+    for signal in SIGNALS:
+        store.record(f"kayit_{signal}", tmp_path / f"{signal}.txt", "rapor", summary=_summary(signal))
+
+    assert [row['signal'] for row in store.find_signal("67-1 TRIP")] == ['67_1_faz_asiri_akim_TRIP']
+    assert [row['signal'] for row in store.find_signal("67-N1 TRIP")] == ['67_N1_toprak_yonlu_koruma_TRIP']
+    assert len(store.find_signal("TRIP", kind='trip')) == 3
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import fault_engine
+import signal_features
+
+FREQUENCY = 50.0
+SAMPLES_PER_CYCLE = 20
+
+
+def _recording(cycles=20, fault=(8, 12), amplitude=2.0, fault_amplitude=40.0):
+    n = cycles * SAMPLES_PER_CYCLE
+    times = np.arange(n) / (FREQUENCY * SAMPLES_PER_CYCLE)
+    df = pd.DataFrame({'time': times})
+    for i, phase in enumerate(('IL1', 'IL2', 'IL3')):
+        df[phase] = amplitude * np.sin(2 * np.pi * FREQUENCY * times - i * 2 * np.pi / 3)
+    # Tek faz (IL1) arızası
+    df.loc[fault[0] * SAMPLES_PER_CYCLE:fault[1] * SAMPLES_PER_CYCLE - 1, 'IL1'] *= fault_amplitude / amplitude
+    df['Io'] = 0.0
+    return df
+
+
+def test_nan_only_affects_windows_containing_it():
+    n = SAMPLES_PER_CYCLE
+    values = _recording()['IL1'].to_numpy().copy()
+    values[50] = np.nan
+
+    rms = signal_features.sliding_rms(values, n)
+    phasor = signal_features.sliding_phasor(values, n)
+
+    affected = np.arange(50, 50 + n)
+    assert np.isnan(rms[affected]).all()
+    assert np.isnan(phasor[affected]).all()
+    # Pencereden çıktıktan sonra değerler yeniden sonlu ve doğru ölçekte
+    later = np.arange(50 + n, 7 * n)
+    assert np.isfinite(rms[later]).all()
+    assert np.isfinite(phasor[later]).all()
+    np.testing.assert_allclose(np.abs(phasor[later]), 2.0 / np.sqrt(2), rtol=1e-6)
+
+
+def test_injected_nan_keeps_critical_event():
+    clean = _recording()
+    dirty = clean.copy()
+    dirty.loc[30, 'IL1'] = np.nan
+
+    clean_events = fault_engine.analyze_fault_scenarios(clean)['critical_events']
+    dirty_events = fault_engine.analyze_fault_scenarios(dirty)['critical_events']
+
+    assert len(clean_events) == 1
+    assert len(dirty_events) == 1
+    assert dirty_events[0]['time'] == clean_events[0]['time']
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fault_engine
+from tail_mode import IncrementalFaultTracker
+
+
+def _recording(path):
+    times = np.arange(400) / 1000.0  # 1 kHz, periyotta 20 örnek
+    il1 = 2.0 * np.sin(2 * np.pi * 50 * times)
+    il1[160:240] *= 20
+    df = pd.DataFrame({'time': times, 'IL1': il1, 'IL2': 0.0, 'IL3': 0.0, 'Io': 0.0})
+    df.to_csv(path, index=False)
+    return df
+
+
+def _follow(source, path, rows):
+    lines = source.read_bytes().splitlines(keepends=True)
+    path.write_bytes(lines[0])
+    tracker = IncrementalFaultTracker(None, path)
+    triggers = []
+    for start in range(1, len(lines), rows):
+        with open(path, 'ab') as f:
+            f.write(b"".join(lines[start:start + rows]))
+        triggers += tracker.poll()
+    return tracker, triggers
+
+
+def test_chunked_polls_match_whole_file(tmp_path):
+    source = tmp_path / "source.csv"
+    whole = fault_engine.analyze_fault_scenarios(_recording(source))['critical_events']
+    assert len(whole) == 1
+
+    for rows in (40, 20, 7):
+        tracker, triggers = _follow(source, tmp_path / f"live_{rows}.csv", rows)
+        events = tracker.summary['critical_events']
+        assert tracker.critical_event_count == 1
+        assert triggers.count('kritik olay') == 1
+        assert events[0]['time'] == whole[0]['time']
+        assert events[0]['end'] == whole[0]['end']
+        assert events[0]['IL1'] == pytest.approx(whole[0]['IL1'])